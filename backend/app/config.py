@@ -22,7 +22,8 @@ class Settings:
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "neondb")
 
 
-    DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
+    # A full DATABASE_URL (e.g. from docker-compose, or sqlite:/// for benchmarks) takes precedence
+    DATABASE_URL: str = os.getenv("DATABASE_URL") or f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
     
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
     ALGORITHM: str = "HS256"
@@ -31,6 +32,21 @@ class Settings:
     # File upload settings
     UPLOAD_DIR: str = "app/static/uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+
+    # Object storage for uploaded files: "local" (UPLOAD_DIR) or "s3" (any S3-compatible service, e.g. MinIO)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "")  # e.g. http://localhost:9000 for MinIO
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    S3_PUBLIC_URL: str = os.getenv("S3_PUBLIC_URL", "")  # Public bucket/CDN base URL; presigned GETs are used if empty
+    S3_PRESIGN_EXPIRES: int = int(os.getenv("S3_PRESIGN_EXPIRES", 15 * 60))  # 15 minutes
+
+    # Files only superadmins may read (kept Excel uploads, profiles): a directory outside /static,
+    # or a private bucket when STORAGE_BACKEND=s3. They are served by GET /admin/files/{key}
+    PRIVATE_UPLOAD_DIR: str = os.getenv("PRIVATE_UPLOAD_DIR", "private_uploads")
+    S3_PRIVATE_BUCKET: str = os.getenv("S3_PRIVATE_BUCKET", "")
     
     # Income distribution percentages
     INCOME_PERCENTAGES = {
@@ -44,4 +60,45 @@ class Settings:
     # Minimum withdrawal amount
     MIN_WITHDRAWAL_AMOUNT: float = 10.0
 
+    # List endpoint page sizes
+    DEFAULT_PAGE_SIZE: int = int(os.getenv("DEFAULT_PAGE_SIZE", 50))
+    MAX_PAGE_SIZE: int = int(os.getenv("MAX_PAGE_SIZE", 500))
+    EXACT_COUNT_THRESHOLD: int = int(os.getenv("EXACT_COUNT_THRESHOLD", 1000))  # Below this, total counts are exact
+
+    # Monthly income partitions created ahead of time, and where archived months are exported
+    INCOME_PARTITION_MONTHS_AHEAD: int = int(os.getenv("INCOME_PARTITION_MONTHS_AHEAD", 3))
+    INCOME_ARCHIVE_DIR: str = os.getenv("INCOME_ARCHIVE_DIR", "archives/incomes")
+
+    # SQL instrumentation: with SQL_DEBUG on, requests that run the same statement shape
+    # more than SQL_REPEAT_THRESHOLD times are logged as likely N+1 queries
+    SQL_DEBUG: bool = os.getenv("SQL_DEBUG", "false").lower() in ("1", "true", "yes")
+    SQL_REPEAT_THRESHOLD: int = int(os.getenv("SQL_REPEAT_THRESHOLD", 10))
+
+    # On-demand request profiler for superadmins: sampling interval (seconds) and
+    # at most PROFILER_RATE_LIMIT profiles per user every PROFILER_RATE_WINDOW seconds
+    PROFILER_INTERVAL: float = float(os.getenv("PROFILER_INTERVAL", 0.001))
+    PROFILER_RATE_LIMIT: int = int(os.getenv("PROFILER_RATE_LIMIT", 10))
+    PROFILER_RATE_WINDOW: int = int(os.getenv("PROFILER_RATE_WINDOW", 60 * 60))
+
+    # Most ids one bulk approve/reject request may carry
+    MAX_BULK_IDS: int = int(os.getenv("MAX_BULK_IDS", 1000))
+
+    # Usernames and referral codes each process reserves per counter round trip
+    ALLOCATION_BLOCK_SIZE: int = int(os.getenv("ALLOCATION_BLOCK_SIZE", 20))
+
+    # Load shedding (per worker process): requests handled at once and requests allowed to
+    # wait for a slot, per route class (see middleware/load_shedding.py); 0 concurrency means no limit
+    INTERACTIVE_CONCURRENCY: int = int(os.getenv("INTERACTIVE_CONCURRENCY", 32))
+    INTERACTIVE_QUEUE: int = int(os.getenv("INTERACTIVE_QUEUE", 64))
+    ADMIN_HEAVY_CONCURRENCY: int = int(os.getenv("ADMIN_HEAVY_CONCURRENCY", 4))
+    ADMIN_HEAVY_QUEUE: int = int(os.getenv("ADMIN_HEAVY_QUEUE", 8))
+    BACKGROUND_CONCURRENCY: int = int(os.getenv("BACKGROUND_CONCURRENCY", 2))
+    BACKGROUND_QUEUE: int = int(os.getenv("BACKGROUND_QUEUE", 4))
+    # Seconds a queued request waits before it is shed, and the Retry-After sent with the 503
+    LOAD_SHED_QUEUE_TIMEOUT: float = float(os.getenv("LOAD_SHED_QUEUE_TIMEOUT", 5))
+    LOAD_SHED_RETRY_AFTER: int = int(os.getenv("LOAD_SHED_RETRY_AFTER", 5))
+
+    # Seconds to cache /deposit/admin/stats (0 disables the cache)
+    DEPOSIT_STATS_CACHE_TTL: int = int(os.getenv("DEPOSIT_STATS_CACHE_TTL", 10))
+
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""Usernames and referral codes without lookup-and-retry loops.
+
+Each code sequence draws numbers from a counter row in allocation_counters and
+maps them through a keyed Feistel permutation of its code space. Distinct
+numbers always give distinct codes, so nothing is looked up before use; the
+permutation only keeps consecutive sign-ups from getting guessable codes.
+Counters are advanced ALLOCATION_BLOCK_SIZE numbers at a time, in one upsert
+in a transaction of their own, and the block is handed out from memory.
+Numbers reserved by a process that exits are skipped, never reused.
+
+Codes issued before the allocator (random ones) can still clash with a new
+code. The unique constraints on users catch that: callers insert, and on a
+conflict roll back and retry with fresh codes (see create_with_codes).
+"""
+import hashlib
+import re
+import string
+import threading
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+
+counters = models.AllocationCounter.__table__
+
+REFERRAL_ALPHABET = string.ascii_uppercase + string.digits
+REFERRAL_LENGTH = 8
+
+# Inserts tried before a code conflict is given up on
+ALLOCATION_ATTEMPTS = 5
+
+# Unique violations on the allocated columns, as PostgreSQL and SQLite word them
+CODE_CONFLICT = re.compile(r"Key \((username|referral_code)\)|users\.(username|referral_code)\b")
+
+
+class FeistelPermutation:
+    """A keyed bijection of range(size): a balanced Feistel network, cycle-walked into range"""
+
+    def __init__(self, size: int, key: str, rounds: int = 4):
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self.mask = (1 << self.half_bits) - 1
+        self.keys = [hashlib.blake2b(f"{key}:{i}".encode(), digest_size=16).digest() for i in range(rounds)]
+
+    def _round(self, value: int, key: bytes) -> int:
+        digest = hashlib.blake2b(value.to_bytes(8, "big"), key=key, digest_size=8).digest()
+        return int.from_bytes(digest, "big") & self.mask
+
+    def __call__(self, number: int) -> int:
+        if not 0 <= number < self.size:
+            raise ValueError(f"{number} is outside range({self.size})")
+        # The network permutes 2 * half_bits bits, at most 4x size; re-applying it
+        # until the value lands back in range keeps it a bijection of range(size)
+        while True:
+            left, right = number >> self.half_bits, number & self.mask
+            for key in self.keys:
+                left, right = right, left ^ self._round(right, key)
+            number = (left << self.half_bits) | right
+            if number < self.size:
+                return number
+
+
+def _upsert(dialect: str):
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert
+
+
+class CounterBlocks:
+    """Numbers of each counter reserved by this process and not handed out yet"""
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self.blocks: Dict[str, Tuple[int, int]] = {}
+        self.lock = threading.Lock()
+
+    def _reserve(self, db: Session, name: str, count: int) -> int:
+        """Advance counter `name` by `count` and return the first number reserved"""
+        bind = db.get_bind()
+        insert = _upsert(bind.dialect.name)
+        stmt = insert(counters).values(name=name, next_value=count)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[counters.c.name],
+            set_={"next_value": counters.c.next_value + stmt.excluded.next_value}
+        ).returning(counters.c.next_value)
+        # Its own transaction, so the counter row is not locked until the caller commits
+        with bind.begin() as conn:
+            return conn.execute(stmt).scalar_one() - count
+
+    def take(self, db: Session, name: str, count: int) -> List[int]:
+        """`count` unused numbers of counter `name`"""
+        with self.lock:
+            start, end = self.blocks.get(name, (0, 0))
+            numbers = list(range(start, min(end, start + count)))
+            missing = count - len(numbers)
+            if missing:
+                reserved = max(missing, self.block_size)
+                start = self._reserve(db, name, reserved)
+                numbers.extend(range(start, start + missing))
+                end = start + reserved
+                start += missing
+            else:
+                start += count
+            self.blocks[name] = (start, end)
+        return numbers
+
+
+blocks = CounterBlocks(settings.ALLOCATION_BLOCK_SIZE)
+
+_permutations: Dict[Tuple[int, str], FeistelPermutation] = {}
+
+
+def _permutation(size: int, purpose: str) -> FeistelPermutation:
+    key = (size, purpose)
+    if key not in _permutations:
+        _permutations[key] = FeistelPermutation(size, f"{settings.SECRET_KEY}:{purpose}")
+    return _permutations[key]
+
+
+def username_for(date_part: str, number: int) -> str:
+    """The `number`th username of a day: YYMMDD + 4 digits for the first 9000, then 5 digits, and so on"""
+    digits = 4
+    while number >= 9 * 10 ** (digits - 1):
+        number -= 9 * 10 ** (digits - 1)
+        digits += 1
+    size = 9 * 10 ** (digits - 1)
+    return f"{date_part}{10 ** (digits - 1) + _permutation(size, f'username:{date_part}')(number)}"
+
+
+def referral_code_for(number: int) -> str:
+    """The `number`th referral code: 8 letters and digits"""
+    size = len(REFERRAL_ALPHABET) ** REFERRAL_LENGTH
+    value = _permutation(size, "referral_code")(number % size)
+    code = []
+    for _ in range(REFERRAL_LENGTH):
+        value, digit = divmod(value, len(REFERRAL_ALPHABET))
+        code.append(REFERRAL_ALPHABET[digit])
+    return "".join(code)
+
+
+def allocate_usernames(db: Session, count: int = 1) -> List[str]:
+    """`count` unused usernames of today's form (YYMMDD + digits)"""
+    date_part = datetime.now().strftime("%y%m%d")
+    return [username_for(date_part, number) for number in blocks.take(db, f"username:{date_part}", count)]
+
+
+def allocate_referral_codes(db: Session, count: int = 1) -> List[str]:
+    """`count` unused referral codes"""
+    return [referral_code_for(number) for number in blocks.take(db, "referral_code", count)]
+
+
+def is_code_conflict(error: Exception) -> bool:
+    """Whether an IntegrityError (SQLAlchemy's or the driver's) is on users.username or users.referral_code"""
+    return CODE_CONFLICT.search(str(getattr(error, "orig", error))) is not None
+
+
+def create_with_codes(db: Session, user: models.User) -> models.User:
+    """Give `user` a username and referral code, insert it and commit.
+
+    A clash with an older code rolls back and retries with the next codes.
+    Other integrity errors are raised as they are.
+    """
+    for attempt in range(1, ALLOCATION_ATTEMPTS + 1):
+        user.username = allocate_usernames(db)[0]
+        user.referral_code = allocate_referral_codes(db)[0]
+        db.add(user)
+        try:
+            db.commit()
+        except IntegrityError as e:
+            db.rollback()
+            if attempt == ALLOCATION_ATTEMPTS or not is_code_conflict(e):
+                raise
+        else:
+            db.refresh(user)
+            return user
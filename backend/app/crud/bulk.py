@@ -0,0 +1,42 @@
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import Dict, List, Sequence, Tuple
+
+def transition(
+    db: Session,
+    model,
+    ids: Sequence[int],
+    from_statuses: Sequence,
+    values: Dict,
+    returning: Sequence = ()
+) -> Tuple[List, List[dict]]:
+    """Move every row in `ids` whose status is one of `from_statuses` with one UPDATE ... RETURNING.
+
+    Rows whose status does not allow the move, and rows moved concurrently,
+    are left alone. Nothing is committed. Returns the updated rows (id plus
+    the `returning` columns) and one outcome per distinct id, in request order:
+    processed, skipped (with the current status) or not_found.
+    """
+    ids = list(dict.fromkeys(ids))
+    table = model.__table__
+    rows = db.execute(
+        update(table)
+        .where(table.c.id.in_(ids), table.c.status.in_(from_statuses))
+        .values(**values)
+        .returning(table.c.id, *returning)
+    ).all()
+
+    processed = {row[0] for row in rows}
+    remaining = [id_ for id_ in ids if id_ not in processed]
+    current = dict(db.query(model.id, model.status).filter(model.id.in_(remaining)).all()) if remaining else {}
+
+    outcomes = []
+    for id_ in ids:
+        if id_ in processed:
+            outcomes.append({"id": id_, "outcome": "processed"})
+        elif id_ in current:
+            status = getattr(current[id_], "value", current[id_])
+            outcomes.append({"id": id_, "outcome": "skipped", "detail": f"status is {status}"})
+        else:
+            outcomes.append({"id": id_, "outcome": "not_found"})
+    return rows, outcomes
@@ -1,7 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func
 from typing import List, Optional
 from .. import models, schemas
+from ..utils.pagination import Page, paginate
 from datetime import datetime
 
 def create_deduction(
@@ -44,15 +45,17 @@ def get_user_deductions(
     db: Session,
     user_id: int,
     skip: int = 0,
-    limit: int = 100
-) -> List[models.Deduction]:
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     """Get all deductions for a user"""
-    return db.query(models.Deduction)\
-        .filter(models.Deduction.user_id == user_id)\
-        .order_by(desc(models.Deduction.created_at))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    query = db.query(models.Deduction)\
+        .filter(models.Deduction.user_id == user_id)
+    return paginate(
+        db, query, models.Deduction.created_at, models.Deduction.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
 
 def get_deductions_by_deposit(
     db: Session,
@@ -69,8 +72,33 @@ def get_total_deductions(
     user_id: int
 ) -> float:
     """Get total amount deducted for a user"""
-    from sqlalchemy import func
     total = db.query(func.sum(models.Deduction.amount))\
         .filter(models.Deduction.user_id == user_id)\
         .scalar()
     return total or 0.0
+
+def get_user_deduction_summary(
+    db: Session,
+    user_id: int,
+    recent_limit: int = 10
+) -> dict:
+    """Get deduction totals per type plus the most recent deductions for a user"""
+    rows = db.query(
+        models.Deduction.deduction_type,
+        func.count(models.Deduction.id),
+        func.coalesce(func.sum(models.Deduction.amount), 0.0)
+    ).filter(
+        models.Deduction.user_id == user_id
+    ).group_by(models.Deduction.deduction_type).all()
+    
+    by_type = {}
+    for deduction_type, count, amount in rows:
+        key = deduction_type.value if hasattr(deduction_type, "value") else deduction_type
+        by_type[key] = {"count": count, "amount": amount}
+    
+    return {
+        "total_deducted": sum(item["amount"] for item in by_type.values()),
+        "deduction_count": sum(item["count"] for item in by_type.values()),
+        "by_type": by_type,
+        "recent_deductions": get_user_deductions(db, user_id, limit=recent_limit).items
+    }
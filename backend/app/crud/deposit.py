@@ -2,7 +2,24 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import desc, func
 from typing import List, Optional
 from .. import crud, models, schemas
-from datetime import datetime
+from .bulk import transition
+from ..models.deposit import DepositStatus
+from ..config import settings
+from ..utils.cache import TTLCache
+from ..utils.pagination import Page, paginate
+from datetime import datetime, date, time, timedelta
+
+# Admin dashboard polls the stats endpoint; cache it briefly and drop it whenever a deposit changes state
+deposit_stats_cache = TTLCache(ttl=settings.DEPOSIT_STATS_CACHE_TTL)
+
+# Statuses a deposit may be bulk-processed from, per target status
+OPEN_DEPOSIT_STATUSES = [DepositStatus.PENDING, DepositStatus.CONFIRMING]
+BULK_TRANSITIONS = {
+    DepositStatus.CONFIRMING: [DepositStatus.PENDING],
+    DepositStatus.COMPLETED: OPEN_DEPOSIT_STATUSES,
+    DepositStatus.FAILED: OPEN_DEPOSIT_STATUSES,
+    DepositStatus.EXPIRED: OPEN_DEPOSIT_STATUSES,
+}
 
 def create_deposit(
     db: Session, 
@@ -18,6 +35,7 @@ def create_deposit(
     db.add(db_deposit)
     db.commit()
     db.refresh(db_deposit)
+    deposit_stats_cache.invalidate()
     return db_deposit
 
 def get_deposit(
@@ -33,9 +51,11 @@ def get_user_deposits(
     db: Session,
     user_id: int,
     skip: int = 0,
-    limit: int = 100,
-    status: Optional[str] = None
-) -> List[models.DepositTransaction]:
+    limit: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     """Get deposits for a specific user"""
     query = db.query(models.DepositTransaction)\
         .filter(models.DepositTransaction.user_id == user_id)
@@ -43,17 +63,19 @@ def get_user_deposits(
     if status:
         query = query.filter(models.DepositTransaction.status == status)
     
-    return query.order_by(desc(models.DepositTransaction.created_at))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    return paginate(
+        db, query, models.DepositTransaction.created_at, models.DepositTransaction.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
 
 def get_all_deposits(
     db: Session,
     skip: int = 0,
-    limit: int = 100,
-    status: Optional[str] = None
-) -> List[models.DepositTransaction]:
+    limit: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     """Get all deposits (admin only)"""
     query = db.query(models.DepositTransaction)\
         .options(joinedload(models.DepositTransaction.user))
@@ -61,27 +83,31 @@ def get_all_deposits(
     if status:
         query = query.filter(models.DepositTransaction.status == status)
     
-    return query.order_by(desc(models.DepositTransaction.created_at))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+    return paginate(
+        db, query, models.DepositTransaction.created_at, models.DepositTransaction.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
 
 def update_deposit_screenshot(
     db: Session,
     deposit_id: int,
-    screenshot_path: str,
+    screenshot_key: str,
     transaction_hash: Optional[str] = None
 ) -> Optional[models.DepositTransaction]:
-    """Update deposit with screenshot after payment"""
+    """Update deposit with screenshot after payment.
+
+    Only the storage object key (or an external URL) is stored; URLs are resolved when the deposit is returned.
+    """
     deposit = get_deposit(db, deposit_id)
     if deposit:
-        deposit.payment_screenshot = screenshot_path
+        deposit.payment_screenshot = screenshot_key
         if transaction_hash:
             deposit.transaction_hash = transaction_hash
         deposit.status = "CONFIRMING"
         deposit.updated_at = datetime.now()
         db.commit()
         db.refresh(deposit)
+        deposit_stats_cache.invalidate()
     return deposit
 
 def process_deposit(
@@ -115,38 +141,94 @@ def process_deposit(
     # REMOVED: processed_by reference
     db.commit()
     db.refresh(deposit)
+    deposit_stats_cache.invalidate()
     return deposit
 
+def process_deposits(
+    db: Session,
+    update_data: schemas.DepositBulkUpdate
+) -> List[dict]:
+    """Move many deposits to one status with a single UPDATE (admin only).
+
+    Like process_deposit, completing a deposit only records confirmed_at; no
+    wallet changes. Returns an outcome per id (see crud.bulk.transition).
+    """
+    now = datetime.now()
+    values = {"status": update_data.status, "updated_at": now}
+    if update_data.status == DepositStatus.COMPLETED:
+        values["confirmed_at"] = now
+    if update_data.admin_notes is not None:
+        values["admin_notes"] = update_data.admin_notes
+    
+    _, outcomes = transition(
+        db, models.DepositTransaction, update_data.ids, BULK_TRANSITIONS[update_data.status], values
+    )
+    db.commit()
+    deposit_stats_cache.invalidate()
+    return outcomes
+
+def compute_deposit_stats(db: Session) -> dict:
+    """Compute admin deposit statistics in a single scan using conditional aggregates"""
+    Deposit = models.DepositTransaction
+    completed = Deposit.status == "COMPLETED"
+    
+    # Time windows as plain range predicates so the (status, confirmed_at) index can be used
+    now = datetime.now()
+    today_start = datetime.combine(date.today(), time.min)
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+    
+    statuses = ["PENDING", "CONFIRMING", "COMPLETED", "FAILED", "EXPIRED"]
+    
+    row = db.query(
+        func.coalesce(func.sum(Deposit.amount).filter(completed), 0.0).label("total_deposits"),
+        func.coalesce(func.sum(Deposit.amount).filter(Deposit.status == "PENDING"), 0.0).label("pending_amount"),
+        func.coalesce(func.sum(Deposit.amount).filter(Deposit.status == "CONFIRMING"), 0.0).label("confirming_amount"),
+        func.coalesce(func.sum(Deposit.amount).filter(completed, Deposit.confirmed_at >= today_start), 0.0).label("today_deposits"),
+        func.coalesce(func.sum(Deposit.amount).filter(completed, Deposit.confirmed_at >= week_ago), 0.0).label("week_deposits"),
+        func.coalesce(func.sum(Deposit.amount).filter(completed, Deposit.confirmed_at >= month_ago), 0.0).label("month_deposits"),
+        *[func.count(Deposit.id).filter(Deposit.status == status).label(status) for status in statuses]
+    ).one()
+    
+    status_counts = {status: getattr(row, status) for status in statuses}
+    
+    return {
+        "total_deposits": row.total_deposits,
+        "pending_amount": row.pending_amount,
+        "confirming_amount": row.confirming_amount,
+        "status_counts": status_counts,
+        "today_deposits": row.today_deposits,
+        "week_deposits": row.week_deposits,
+        "month_deposits": row.month_deposits,
+        "total_transactions": sum(status_counts.values())
+    }
+
+def get_deposit_stats(db: Session) -> dict:
+    """Admin deposit statistics, served from a short-lived cache when enabled"""
+    return deposit_stats_cache.get_or_set("deposit_stats", lambda: compute_deposit_stats(db))
+
 def get_user_deposit_summary(db: Session, user_id: int) -> dict:
     """Get deposit summary for a user - treats deposits as fuel, not wallet money"""
-    # Total deposits (completed only) - for tracking purposes
-    total_deposited = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(
-            models.DepositTransaction.user_id == user_id,
-            models.DepositTransaction.status == "COMPLETED"
-        ).scalar() or 0.0
-    
-    # Pending deposits amount
-    pending_amount = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(
-            models.DepositTransaction.user_id == user_id,
-            models.DepositTransaction.status.in_(["PENDING", "CONFIRMING"])
-        ).scalar() or 0.0
+    # One grouped scan of the user's deposits gives both counts and amounts per status
+    rows = db.query(
+        models.DepositTransaction.status,
+        func.count(models.DepositTransaction.id),
+        func.coalesce(func.sum(models.DepositTransaction.amount), 0.0)
+    ).filter(
+        models.DepositTransaction.user_id == user_id
+    ).group_by(models.DepositTransaction.status).all()
     
-    # Count by status
-    status_counts = {}
-    for status in ["PENDING", "CONFIRMING", "COMPLETED", "FAILED", "EXPIRED"]:
-        count = db.query(models.DepositTransaction)\
-            .filter(
-                models.DepositTransaction.user_id == user_id,
-                models.DepositTransaction.status == status
-            ).count()
-        status_counts[status] = count
+    status_counts = {status: 0 for status in ["PENDING", "CONFIRMING", "COMPLETED", "FAILED", "EXPIRED"]}
+    status_amounts = {status: 0.0 for status in status_counts}
+    for status, count, amount in rows:
+        key = status.value if hasattr(status, "value") else status
+        status_counts[key] = count
+        status_amounts[key] = amount
     
     return {
-        "total_deposited": total_deposited,  # Total fuel deposited
-        "pending_amount": pending_amount,     # Fuel pending confirmation
+        "total_deposited": status_amounts["COMPLETED"],  # Total fuel deposited
+        "pending_amount": status_amounts["PENDING"] + status_amounts["CONFIRMING"],  # Fuel pending confirmation
         "status_counts": status_counts,
         "total_transactions": sum(status_counts.values())
         # REMOVED: Any wallet balance references
-    }
\ No newline at end of file
+    }
@@ -1,24 +1,125 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import func, cast, literal, select, text, Date
 from typing import List, Optional
 from .. import models, schemas
-from datetime import datetime, date
+from ..utils.pagination import Page, paginate
+from datetime import datetime, date, timedelta
 
-def create_income(db: Session, income_data: dict) -> models.Income:
+def create_income(db: Session, income_data: dict, commit: bool = True) -> models.Income:
+    """Add an income row and its rollup. With commit=False the caller commits (e.g. with wallet updates)."""
     db_income = models.Income(**income_data)
     db.add(db_income)
-    db.commit()
-    db.refresh(db_income)
+    
+    # Keep the daily rollup in step, in the same transaction as the income row
+    add_to_daily_rollup(
+        db,
+        user_id=income_data["user_id"],
+        created_at=income_data.get("created_at"),
+        income_type=income_data["income_type"],
+        level=income_data["level"],
+        amount=income_data["amount"]
+    )
+    
+    if commit:
+        db.commit()
+        db.refresh(db_income)
     return db_income
 
+def income_day(dialect_name: str, created_at):
+    """SQL for the rollup day of an income created at `created_at`.
+
+    Both the incremental path and rebuild_daily_rollup use this, so their rows
+    line up: on PostgreSQL the date in the session time zone, on SQLite the date
+    of the stored timestamp (CAST(... AS DATE) there keeps only the year).
+    """
+    if dialect_name == "sqlite":
+        return func.date(created_at)
+    return cast(created_at, Date)
+
+def add_to_daily_rollup(
+    db: Session,
+    user_id: int,
+    created_at: Optional[datetime],
+    income_type: str,
+    level: int,
+    amount: float,
+    count: int = 1
+) -> None:
+    """Add income to the user's rollup row for the day of `created_at`, creating it if needed.
+
+    `created_at` defaults to now(), matching the created_at default on incomes.
+    """
+    table = models.IncomeDailyRollup.__table__
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    
+    created = func.now() if created_at is None else literal(created_at, models.Income.created_at.type)
+    stmt = insert(table).values(
+        user_id=user_id,
+        day=income_day(dialect_name, created),
+        income_type=income_type,
+        level=level,
+        amount_sum=amount,
+        count=count
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id, table.c.day, table.c.income_type, table.c.level],
+        set_={
+            "amount_sum": table.c.amount_sum + stmt.excluded.amount_sum,
+            "count": table.c.count + stmt.excluded.count
+        }
+    )
+    db.execute(stmt)
+
+def rebuild_daily_rollup(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute the daily rollup from the incomes table (all users or one user). Returns rows written."""
+    Rollup = models.IncomeDailyRollup
+    Income = models.Income
+    dialect_name = db.get_bind().dialect.name
+    day = income_day(dialect_name, Income.created_at)
+    
+    if dialect_name == "postgresql":
+        # Block concurrent income writes from touching the rollup until the rebuild commits
+        db.execute(text("LOCK TABLE income_daily_rollup IN EXCLUSIVE MODE"))
+    
+    delete_query = db.query(Rollup)
+    source = select(
+        Income.user_id,
+        day,
+        Income.income_type,
+        Income.level,
+        func.sum(Income.amount),
+        func.count(Income.id)
+    )
+    if user_id is not None:
+        delete_query = delete_query.filter(Rollup.user_id == user_id)
+        source = source.where(Income.user_id == user_id)
+    source = source.group_by(Income.user_id, day, Income.income_type, Income.level)
+    
+    delete_query.delete(synchronize_session=False)
+    result = db.execute(
+        Rollup.__table__.insert().from_select(
+            ["user_id", "day", "income_type", "level", "amount_sum", "count"],
+            source
+        )
+    )
+    db.commit()
+    return result.rowcount
+
 def get_user_incomes(
     db: Session, 
     user_id: int, 
     skip: int = 0, 
-    limit: int = 0,
+    limit: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    income_type: Optional[str] = None
-) -> List[models.Income]:
+    income_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     query = db.query(models.Income).filter(models.Income.user_id == user_id)
     
     if start_date:
@@ -28,31 +129,57 @@ def get_user_incomes(
     if income_type:
         query = query.filter(models.Income.income_type == income_type)
     
-    return query.order_by(models.Income.created_at.desc()).offset(skip).limit(limit).all()
+    return paginate(
+        db, query, models.Income.created_at, models.Income.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
 
 def get_total_income_by_period(
     db: Session, 
     user_id: int,
     period: str = "DAILY"
 ) -> float:
-    from sqlalchemy import func
-    
+    """Total income for today, the last 7 days or the current month, read from the daily rollup"""
+    today = date.today()
     if period == "DAILY":
-        date_filter = func.date(models.Income.created_at) == date.today()
+        start_day = today
     elif period == "WEEKLY":
         # Last 7 days
-        date_filter = models.Income.created_at >= datetime.now().date()
+        start_day = today - timedelta(days=6)
     elif period == "MONTHLY":
         # Current month
-        today = date.today()
-        date_filter = func.extract('month', models.Income.created_at) == today.month
-        date_filter &= func.extract('year', models.Income.created_at) == today.year
+        start_day = today.replace(day=1)
     else:
         return 0.0
     
-    result = db.query(func.sum(models.Income.amount)).filter(
-        models.Income.user_id == user_id,
-        date_filter
+    result = db.query(func.sum(models.IncomeDailyRollup.amount_sum)).filter(
+        models.IncomeDailyRollup.user_id == user_id,
+        models.IncomeDailyRollup.day >= start_day,
+        models.IncomeDailyRollup.day <= today
     ).scalar()
     
-    return result or 0.0
\ No newline at end of file
+    return result or 0.0
+
+def get_daily_income(
+    db: Session,
+    user_id: int,
+    start_day: date,
+    end_day: date,
+    income_type: Optional[str] = None
+) -> List[dict]:
+    """Per-day income totals for charts, one row per day that had income"""
+    Rollup = models.IncomeDailyRollup
+    query = db.query(
+        Rollup.day,
+        func.sum(Rollup.amount_sum),
+        func.sum(Rollup.count)
+    ).filter(
+        Rollup.user_id == user_id,
+        Rollup.day >= start_day,
+        Rollup.day <= end_day
+    )
+    if income_type:
+        query = query.filter(Rollup.income_type == income_type)
+    
+    rows = query.group_by(Rollup.day).order_by(Rollup.day).all()
+    return [{"day": day, "amount": amount, "count": count} for day, amount, count in rows]
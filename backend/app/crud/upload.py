@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from .. import models, schemas
+from ..utils.pagination import Page, paginate
 import datetime
 
 
@@ -22,11 +23,18 @@ def get_upload(db: Session, upload_id: int) -> Optional[models.ExcelUpload]:
     return db.query(models.ExcelUpload).filter(models.ExcelUpload.id == upload_id).first()
 
 
-def get_uploads(db: Session, skip: int = 0, limit: int = 0) -> List[models.ExcelUpload]:
+def get_uploads(
+    db: Session,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     """Get all uploads with pagination"""
-    return db.query(models.ExcelUpload).order_by(
-        models.ExcelUpload.uploaded_at.desc()
-    ).offset(skip).limit(limit).all()
+    return paginate(
+        db, db.query(models.ExcelUpload), models.ExcelUpload.uploaded_at, models.ExcelUpload.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
 
 
 def update_upload_status(
@@ -1,7 +1,10 @@
+from sqlalchemy import func, update
 from sqlalchemy.orm import Session
 from typing import Optional, List
+from datetime import datetime
 from .. import models, schemas
 from ..utils.security import get_password_hash
+from ..utils.pagination import Page, paginate
 import random
 import string
 
@@ -23,11 +26,22 @@ def get_user_by_vantage_username(db: Session, vantage_username: str) -> Optional
 def get_user_by_referral_code(db: Session, referral_code: str) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.referral_code == referral_code).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 0, is_active: Optional[bool] = None) -> List[models.User]:
+def get_users(
+    db: Session,
+    skip: int = 0,
+    limit: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     query = db.query(models.User)
     if is_active is not None:
         query = query.filter(models.User.is_active == is_active)
-    return query.order_by(models.User.id).offset(skip).limit(limit).all()
+    # Oldest first, matching the previous ordering by id
+    return paginate(
+        db, query, models.User.created_at, models.User.id,
+        cursor=cursor, limit=limit, skip=skip, descending=False, include_total=include_total
+    )
 
 def create_user(db: Session, user_data: dict) -> models.User:
     # Hash password
@@ -70,6 +84,40 @@ def toggle_user_active(db: Session, user_id: int) -> Optional[models.User]:
         db.refresh(db_user)
     return db_user
 
+def set_users_active(
+    db: Session,
+    is_active: bool,
+    ids: Optional[List[int]] = None,
+    parent_id: Optional[int] = None,
+    country: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> List[int]:
+    """Set is_active on every matching user not already in that state, with one UPDATE ... RETURNING.
+
+    Superadmins are never deactivated this way. Returns the ids changed.
+    """
+    users = models.User.__table__
+    conditions = [func.coalesce(users.c.is_active, False) != is_active]
+    if ids is not None:
+        conditions.append(users.c.id.in_(ids))
+    if parent_id is not None:
+        conditions.append(users.c.parent_id == parent_id)
+    if country is not None:
+        conditions.append(users.c.country == country)
+    if created_from is not None:
+        conditions.append(users.c.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(users.c.created_at < created_to)
+    if not is_active:
+        conditions.append(func.coalesce(users.c.is_superadmin, False).is_(False))
+
+    changed = db.execute(
+        update(users).where(*conditions).values(is_active=is_active, updated_at=func.now()).returning(users.c.id)
+    ).scalars().all()
+    db.commit()
+    return sorted(changed)
+
 def get_direct_referrals_count(db: Session, user_id: int) -> int:
     return db.query(models.User).filter(models.User.parent_id == user_id).count()
 
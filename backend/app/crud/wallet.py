@@ -0,0 +1,307 @@
+"""Atomic wallet updates and the wallet ledger.
+
+Balances are changed by single UPDATE statements that the database evaluates
+(wallet_balance = wallet_balance + :delta), never by reading a balance into
+Python and writing it back, so concurrent requests cannot overwrite each other.
+Every update appends a wallet_ledger entry with the same deltas. Nothing here
+commits: the update and its entry join the caller's transaction, so they commit
+or roll back together with the withdrawal, income or deposit that caused them.
+
+The users columns stay the fast path for the current balance. The ledger
+answers audits and balance-as-of queries: a user's totals at any time are their
+latest snapshot before it plus the entries after that snapshot.
+"""
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, and_, bindparam, cast, column, exists, func, insert, literal, or_, select, text, update, values
+from sqlalchemy.orm import Session, aliased
+
+from .. import models
+from ..money import Money, from_micros, to_micros
+from ..models.wallet_ledger import LedgerEntryType
+
+users = models.User.__table__
+ledger = models.WalletLedgerEntry.__table__
+snapshots = models.WalletSnapshot.__table__
+
+WALLET_COLUMNS = ["wallet_balance", "total_earned", "total_withdrawn"]
+
+class WalletDelta(NamedTuple):
+    # Dollars; converted to micro-units by the Money columns
+    balance: float = 0.0
+    earned: float = 0.0
+    withdrawn: float = 0.0
+    # Id of the income, withdrawal or deposit behind the change
+    reference_id: Optional[int] = None
+
+
+class WalletTotals(NamedTuple):
+    balance: float
+    earned: float
+    withdrawn: float
+
+
+def _current(wallet_column):
+    # Rows created outside the ORM may have NULL totals
+    return func.coalesce(wallet_column, 0)
+
+
+def _expire(db: Session, user_ids) -> None:
+    """Make users already loaded in the session re-read their wallet columns"""
+    for user_id in user_ids:
+        user = db.identity_map.get(Session.identity_key(models.User, user_id))
+        if user is not None:
+            db.expire(user, WALLET_COLUMNS)
+
+
+def _entry(user_id: int, entry_type: LedgerEntryType, delta: WalletDelta) -> dict:
+    return {
+        "user_id": user_id,
+        "entry_type": entry_type,
+        "reference_id": delta.reference_id,
+        "balance_delta": delta.balance,
+        "earned_delta": delta.earned,
+        "withdrawn_delta": delta.withdrawn,
+    }
+
+
+def adjust_wallet(
+    db: Session,
+    user_id: int,
+    entry_type: LedgerEntryType,
+    reference_id: Optional[int] = None,
+    balance: float = 0.0,
+    earned: float = 0.0,
+    withdrawn: float = 0.0,
+    require_funds: bool = False
+) -> Optional[float]:
+    """Add the deltas to one user's wallet columns in a single UPDATE and record them in the ledger.
+
+    With `require_funds`, the update only applies if the balance stays
+    non-negative. Returns the new balance, or None if nothing was updated
+    (unknown user, or insufficient funds).
+    """
+    stmt = update(users).where(users.c.id == user_id).values(
+        wallet_balance=_current(users.c.wallet_balance) + balance,
+        total_earned=_current(users.c.total_earned) + earned,
+        total_withdrawn=_current(users.c.total_withdrawn) + withdrawn
+    ).returning(users.c.wallet_balance)
+    if require_funds:
+        stmt = stmt.where(_current(users.c.wallet_balance) + balance >= 0)
+
+    new_balance = db.execute(stmt).scalar()
+    if new_balance is not None:
+        db.execute(insert(ledger).values(**_entry(
+            user_id, entry_type, WalletDelta(balance, earned, withdrawn, reference_id)
+        )))
+    _expire(db, [user_id])
+    return new_balance
+
+
+def debit(
+    db: Session, user_id: int, amount: float, entry_type: LedgerEntryType, reference_id: Optional[int] = None
+) -> Optional[float]:
+    """Take `amount` from the wallet if the balance covers it. Returns the new balance, or None."""
+    return adjust_wallet(db, user_id, entry_type, reference_id, balance=-amount, require_funds=True)
+
+
+def credit(
+    db: Session,
+    user_id: int,
+    amount: float,
+    entry_type: LedgerEntryType,
+    reference_id: Optional[int] = None,
+    earned: bool = False
+) -> Optional[float]:
+    """Add `amount` to the wallet (and to total_earned if `earned`). Returns the new balance."""
+    return adjust_wallet(db, user_id, entry_type, reference_id, balance=amount, earned=amount if earned else 0.0)
+
+
+def adjust_wallets(db: Session, entries: Sequence[Tuple[int, WalletDelta]], entry_type: LedgerEntryType) -> int:
+    """Apply many (user_id, delta) entries at once and record each in the ledger. Returns the number of users updated.
+
+    A user's entries are summed into one row of the update. PostgreSQL gets
+    one UPDATE ... FROM (VALUES ...); other databases run the single-row
+    update as an executemany. Deltas never check funds, so use them for
+    credits and refunds.
+    """
+    if not entries:
+        return 0
+
+    totals: Dict[int, Tuple[int, int, int]] = {}
+    for user_id, delta in entries:
+        balance, earned, withdrawn = totals.get(user_id, (0, 0, 0))
+        totals[user_id] = (
+            balance + to_micros(delta.balance), earned + to_micros(delta.earned), withdrawn + to_micros(delta.withdrawn)
+        )
+    rows = [
+        (user_id, from_micros(balance), from_micros(earned), from_micros(withdrawn))
+        for user_id, (balance, earned, withdrawn) in totals.items()
+    ]
+
+    if db.get_bind().dialect.name == "postgresql":
+        deltas = values(
+            column("user_id", Integer), column("balance", Money),
+            column("earned", Money), column("withdrawn", Money),
+            name="deltas"
+        ).data(rows)
+        result = db.execute(
+            update(users).where(users.c.id == deltas.c.user_id).values(
+                wallet_balance=_current(users.c.wallet_balance) + deltas.c.balance,
+                total_earned=_current(users.c.total_earned) + deltas.c.earned,
+                total_withdrawn=_current(users.c.total_withdrawn) + deltas.c.withdrawn
+            )
+        )
+    else:
+        result = db.execute(
+            update(users).where(users.c.id == bindparam("user_id")).values(
+                wallet_balance=_current(users.c.wallet_balance) + bindparam("balance"),
+                total_earned=_current(users.c.total_earned) + bindparam("earned"),
+                total_withdrawn=_current(users.c.total_withdrawn) + bindparam("withdrawn")
+            ),
+            [
+                {"user_id": user_id, "balance": balance, "earned": earned, "withdrawn": withdrawn}
+                for user_id, balance, earned, withdrawn in rows
+            ]
+        )
+    db.execute(insert(ledger), [_entry(user_id, entry_type, delta) for user_id, delta in entries])
+
+    _expire(db, totals)
+    return result.rowcount
+
+
+def get_wallet(db: Session, user_id: int, as_of: Optional[datetime] = None) -> WalletTotals:
+    """A user's wallet totals from the ledger, now or as of a past moment"""
+    Snapshot = models.WalletSnapshot
+    Entry = models.WalletLedgerEntry
+
+    snapshot_query = db.query(Snapshot).filter(Snapshot.user_id == user_id)
+    if as_of is not None:
+        snapshot_query = snapshot_query.filter(Snapshot.as_of <= as_of)
+    snapshot = snapshot_query.order_by(Snapshot.as_of.desc()).first()
+
+    entries = db.query(
+        func.coalesce(func.sum(Entry.balance_delta), 0),
+        func.coalesce(func.sum(Entry.earned_delta), 0),
+        func.coalesce(func.sum(Entry.withdrawn_delta), 0)
+    ).filter(Entry.user_id == user_id)
+    if snapshot is not None:
+        entries = entries.filter(Entry.id > snapshot.last_entry_id)
+    if as_of is not None:
+        entries = entries.filter(Entry.created_at <= as_of)
+    balance, earned, withdrawn = entries.one()
+
+    if snapshot is None:
+        return WalletTotals(balance, earned, withdrawn)
+    return WalletTotals(snapshot.balance + balance, snapshot.total_earned + earned, snapshot.total_withdrawn + withdrawn)
+
+
+def open_ledger(db: Session) -> int:
+    """Give every user with wallet totals but no ledger entries an opening-balance entry. Returns entries added."""
+    entry_type = cast(literal(LedgerEntryType.OPENING_BALANCE.value), ledger.c.entry_type.type)
+    source = select(
+        users.c.id, entry_type,
+        _current(users.c.wallet_balance), _current(users.c.total_earned), _current(users.c.total_withdrawn)
+    ).where(
+        or_(_current(users.c.wallet_balance) != 0, _current(users.c.total_earned) != 0, _current(users.c.total_withdrawn) != 0),
+        ~exists().where(ledger.c.user_id == users.c.id)
+    )
+    result = db.execute(insert(ledger).from_select(
+        ["user_id", "entry_type", "balance_delta", "earned_delta", "withdrawn_delta"], source
+    ))
+    return result.rowcount
+
+
+def snapshot_cutoff(db: Session) -> datetime:
+    """Latest time every ledger entry written before it is committed (or rolled back).
+
+    A transaction still in progress may hold ledger ids below ones already
+    committed, so on PostgreSQL this is when the oldest open transaction in the
+    database started: entries are stamped with their insert time, and any
+    entry written before that belongs to a finished transaction. Sessions of
+    other roles only show their start time to members of pg_read_all_stats, so
+    the application role must see every writer. SQLite runs one writer at a
+    time and gives it ids above every committed one, so the cutoff is now.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return datetime.now(timezone.utc)
+    return db.execute(text(
+        "SELECT LEAST(clock_timestamp(), ("
+        "SELECT min(xact_start) FROM pg_stat_activity "
+        "WHERE datname = current_database() AND backend_type = 'client backend' AND pid <> pg_backend_pid()))"
+    )).scalar()
+
+
+def take_snapshots(db: Session) -> int:
+    """Snapshot every user with ledger entries since their last snapshot, in one INSERT ... SELECT.
+
+    Each snapshot adds the entries written before snapshot_cutoff() to the
+    user's previous snapshot, so a long transaction (e.g. a large upload) that
+    commits its entries later is never skipped. Returns the number of snapshots written.
+    """
+    cutoff = snapshot_cutoff(db)
+    last_entry_id = db.query(func.max(ledger.c.id)).filter(ledger.c.created_at < cutoff).scalar()
+    if last_entry_id is None:
+        return 0
+
+    latest = select(
+        snapshots.c.user_id, func.max(snapshots.c.last_entry_id).label("last_entry_id")
+    ).group_by(snapshots.c.user_id).subquery()
+    previous = aliased(snapshots)
+    source = select(
+        ledger.c.user_id,
+        func.max(ledger.c.id),
+        literal(cutoff, snapshots.c.as_of.type),
+        func.coalesce(previous.c.balance, 0) + func.sum(ledger.c.balance_delta),
+        func.coalesce(previous.c.total_earned, 0) + func.sum(ledger.c.earned_delta),
+        func.coalesce(previous.c.total_withdrawn, 0) + func.sum(ledger.c.withdrawn_delta)
+    ).select_from(
+        ledger
+        .outerjoin(latest, latest.c.user_id == ledger.c.user_id)
+        .outerjoin(previous, and_(
+            previous.c.user_id == latest.c.user_id, previous.c.last_entry_id == latest.c.last_entry_id
+        ))
+    ).where(
+        ledger.c.id <= last_entry_id,
+        ledger.c.id > func.coalesce(latest.c.last_entry_id, 0)
+    ).group_by(ledger.c.user_id, previous.c.balance, previous.c.total_earned, previous.c.total_withdrawn)
+
+    result = db.execute(insert(snapshots).from_select(
+        ["user_id", "last_entry_id", "as_of", "balance", "total_earned", "total_withdrawn"], source
+    ))
+    return result.rowcount
+
+
+def reconcile(db: Session) -> List[dict]:
+    """Recompute every user's totals from the full ledger and list the users whose columns drifted.
+
+    Amounts are integer micro-units, so any difference at all is drift.
+    """
+    totals = select(
+        ledger.c.user_id,
+        func.sum(ledger.c.balance_delta).label("balance"),
+        func.sum(ledger.c.earned_delta).label("earned"),
+        func.sum(ledger.c.withdrawn_delta).label("withdrawn")
+    ).group_by(ledger.c.user_id).subquery()
+
+    pairs = [
+        (_current(users.c.wallet_balance), func.coalesce(totals.c.balance, 0)),
+        (_current(users.c.total_earned), func.coalesce(totals.c.earned, 0)),
+        (_current(users.c.total_withdrawn), func.coalesce(totals.c.withdrawn, 0)),
+    ]
+    rows = db.execute(
+        select(users.c.id, users.c.username, *[value for pair in pairs for value in pair])
+        .select_from(users.outerjoin(totals, totals.c.user_id == users.c.id))
+        .where(or_(*[stored != recomputed for stored, recomputed in pairs]))
+        .order_by(func.abs(pairs[0][0] - pairs[0][1]).desc())
+    ).all()
+    return [
+        {
+            "user_id": row[0], "username": row[1],
+            "wallet_balance": row[2], "ledger_balance": row[3],
+            "total_earned": row[4], "ledger_earned": row[5],
+            "total_withdrawn": row[6], "ledger_withdrawn": row[7],
+        }
+        for row in rows
+    ]
@@ -1,16 +1,34 @@
 from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from .. import models, schemas
+from . import wallet as wallet_crud
+from .bulk import transition
+from ..models.wallet_ledger import LedgerEntryType
+from ..models.withdrawal import WithdrawalStatus
+from ..utils.pagination import Page, paginate
 from datetime import datetime
 
-def create_withdrawal(db: Session, withdrawal_data: schemas.WithdrawalCreate, user_id: int) -> models.WithdrawalRequest:
+# Statuses a request may be bulk-processed from, per target status
+BULK_TRANSITIONS = {
+    WithdrawalStatus.APPROVED: [WithdrawalStatus.PENDING],
+    WithdrawalStatus.REJECTED: [WithdrawalStatus.PENDING, WithdrawalStatus.APPROVED],
+    WithdrawalStatus.COMPLETED: [WithdrawalStatus.PENDING, WithdrawalStatus.APPROVED],
+}
+
+def create_withdrawal(
+    db: Session, withdrawal_data: schemas.WithdrawalCreate, user_id: int, commit: bool = True
+) -> models.WithdrawalRequest:
+    """Add a withdrawal request. With commit=False it is only flushed, so the caller can hold the funds first."""
     db_withdrawal = models.WithdrawalRequest(
         **withdrawal_data.dict(),
         user_id=user_id
     )
     db.add(db_withdrawal)
-    db.commit()
-    db.refresh(db_withdrawal)
+    if commit:
+        db.commit()
+        db.refresh(db_withdrawal)
+    else:
+        db.flush()
     return db_withdrawal
 
 def get_withdrawal(db: Session, withdrawal_id: int) -> Optional[models.WithdrawalRequest]:
@@ -20,55 +38,109 @@ def get_user_withdrawals(
     db: Session, 
     user_id: int, 
     skip: int = 0, 
-    limit: int = 0,
-    status: Optional[str] = None
-) -> List[models.WithdrawalRequest]:
+    limit: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     query = db.query(models.WithdrawalRequest).filter(models.WithdrawalRequest.user_id == user_id)
     
     if status:
         query = query.filter(models.WithdrawalRequest.status == status)
     
-    return query.order_by(models.WithdrawalRequest.requested_at.desc()).offset(skip).limit(limit).all()
+    return paginate(
+        db, query, models.WithdrawalRequest.requested_at, models.WithdrawalRequest.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
 
 def get_all_withdrawals(
     db: Session, 
     skip: int = 0, 
-    limit: int = 0,
-    status: Optional[str] = None
-) -> List[models.WithdrawalRequest]:
+    limit: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
     query = db.query(models.WithdrawalRequest).options(
         joinedload(models.WithdrawalRequest.user)
     )
     if status:
         query = query.filter(models.WithdrawalRequest.status == status)
     
-    return query.order_by(models.WithdrawalRequest.requested_at.desc()).offset(skip).limit(limit).all()
+    return paginate(
+        db, query, models.WithdrawalRequest.requested_at, models.WithdrawalRequest.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
 
 def process_withdrawal(
     db: Session, 
     withdrawal_id: int, 
     update_data: schemas.WithdrawalUpdate, 
     admin_id: int
-) -> Optional[models.WithdrawalRequest]:
-    withdrawal = get_withdrawal(db, withdrawal_id)
-    if not withdrawal:
-        return None
-    
-    withdrawal.status = update_data.status
-    withdrawal.admin_notes = update_data.admin_notes
-    withdrawal.processed_by = admin_id
-    withdrawal.processed_at = datetime.now()
+) -> Tuple[Optional[models.WithdrawalRequest], dict]:
+    """Move one withdrawal request to a new status.
+
+    The status changes with a conditional UPDATE (see crud.bulk.transition),
+    and the wallet is refunded or total_withdrawn increased only if that
+    UPDATE changed the row, so repeated or concurrent calls apply it once.
+    Returns the request (None unless processed) and its outcome.
+    """
+    values = {
+        "status": update_data.status,
+        "admin_notes": update_data.admin_notes,
+        "processed_by": admin_id,
+        "processed_at": datetime.now()
+    }
+    table = models.WithdrawalRequest.__table__
+    rows, outcomes = transition(
+        db, models.WithdrawalRequest, [withdrawal_id], BULK_TRANSITIONS.get(update_data.status, []), values,
+        returning=[table.c.user_id, table.c.amount]
+    )
+    if not rows:
+        db.rollback()
+        return None, outcomes[0]
     
+    _, user_id, amount = rows[0]
     # If rejected, return money to user's wallet
-    if update_data.status == "REJECTED":
-        user = withdrawal.user
-        user.wallet_balance += withdrawal.amount
+    if update_data.status == WithdrawalStatus.REJECTED:
+        wallet_crud.adjust_wallet(db, user_id, LedgerEntryType.WITHDRAWAL_RELEASE, withdrawal_id, balance=amount)
     
     # If approved and completed, update total withdrawn
-    elif update_data.status == "COMPLETED":
-        user = withdrawal.user
-        user.total_withdrawn += withdrawal.amount
+    elif update_data.status == WithdrawalStatus.COMPLETED:
+        wallet_crud.adjust_wallet(db, user_id, LedgerEntryType.WITHDRAWAL_COMPLETE, withdrawal_id, withdrawn=amount)
+    
+    db.commit()
+    return get_withdrawal(db, withdrawal_id), outcomes[0]
+
+def process_withdrawals(
+    db: Session,
+    update_data: schemas.WithdrawalBulkUpdate,
+    admin_id: int
+) -> List[dict]:
+    """Move many withdrawal requests to one status in a single transaction.
+
+    The status change is one UPDATE over every id; rejected requests are then
+    refunded and completed ones added to total_withdrawn in one wallet update.
+    Returns an outcome per id (see crud.bulk.transition).
+    """
+    values = {"status": update_data.status, "processed_by": admin_id, "processed_at": datetime.now()}
+    if update_data.admin_notes is not None:
+        values["admin_notes"] = update_data.admin_notes
+    
+    table = models.WithdrawalRequest.__table__
+    rows, outcomes = transition(
+        db, models.WithdrawalRequest, update_data.ids, BULK_TRANSITIONS[update_data.status], values,
+        returning=[table.c.user_id, table.c.amount]
+    )
+    
+    if update_data.status == WithdrawalStatus.REJECTED:
+        wallet_crud.adjust_wallets(db, [
+            (user_id, wallet_crud.WalletDelta(balance=amount, reference_id=id_)) for id_, user_id, amount in rows
+        ], LedgerEntryType.WITHDRAWAL_RELEASE)
+    elif update_data.status == WithdrawalStatus.COMPLETED:
+        wallet_crud.adjust_wallets(db, [
+            (user_id, wallet_crud.WalletDelta(withdrawn=amount, reference_id=id_)) for id_, user_id, amount in rows
+        ], LedgerEntryType.WITHDRAWAL_COMPLETE)
     
     db.commit()
-    db.refresh(withdrawal)
-    return withdrawal
\ No newline at end of file
+    return outcomes
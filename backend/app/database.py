@@ -1,11 +1,61 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from .config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# SQLite connections are shared with the threadpool that runs sync endpoints
+connect_args = {"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(settings.DATABASE_URL, connect_args=connect_args)
+
+
+class LazySession(Session):
+    """Session that can hand its connection back to the pool between reads.
+
+    A session checks a pooled connection out on its first query and keeps it
+    until the transaction ends. get_db only closes the session once the
+    response has been sent, so without release() a request holds its
+    connection through everything it does after its last query.
+    """
+
+    def release(self) -> bool:
+        """End a read-only transaction now, returning its connection to the pool.
+
+        Loaded objects stay usable (they are not expired), and the next query
+        checks a connection out again. Does nothing, and returns False, if the
+        transaction has written or has pending changes.
+        """
+        if not self.in_transaction() or self.info.get("wrote") or self.new or self.dirty or self.deleted:
+            return False
+        expire_on_commit = self.expire_on_commit
+        self.expire_on_commit = False
+        try:
+            self.commit()
+        finally:
+            self.expire_on_commit = expire_on_commit
+        return True
+
+
+@event.listens_for(LazySession, "do_orm_execute")
+def _track_statement(orm_execute_state):
+    # Row locks are held until the transaction ends, so a locking read counts as a write
+    statement = orm_execute_state.statement
+    if not orm_execute_state.is_select or getattr(statement, "_for_update_arg", None) is not None:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(LazySession, "after_flush")
+def _track_flush(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(LazySession, "after_transaction_end")
+def _reset_writes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+
+SessionLocal = sessionmaker(class_=LazySession, autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
@@ -14,4 +64,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -0,0 +1,261 @@
+"""
+Bulk user import from a CSV file, e.g. a partner's whole team at once.
+
+Run from the backend directory:
+    python -m app.import_users team.csv [--activate] [--out created.csv] [--send-emails]
+
+The CSV has a header row with the registration fields: email, phone, country,
+full_name and password, plus optional vantage_username, vantage_password and
+referral_code (the referrer's code, as at sign-up).
+
+Every row is validated before anything is written: the registration schema,
+duplicates within the file, and emails, phones and vantage usernames already
+taken, checked with one query per column for the whole file. Any error aborts
+the import with a report of every bad row. Passwords are hashed in a process
+pool, usernames and referral codes are reserved in bulk from the allocator
+(app/crud/allocator.py), and the users are inserted in one transaction (COPY
+on PostgreSQL, executemany elsewhere). If a code clashes with an older one,
+the insert is rolled back and retried with those codes replaced.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .crud import allocator
+from .database import SessionLocal
+from .schemas.user import UserCreate
+from .utils.security import get_password_hash
+
+# Values per IN (...) lookup
+LOOKUP_CHUNK = 1000
+
+# Registration fields read from the file; is_admin and is_superadmin are never imported
+FIELDS = ["email", "phone", "country", "full_name", "password", "vantage_username", "vantage_password", "referral_code"]
+
+# Columns checked for values already taken, in the file and in the database
+UNIQUE_FIELDS = ["email", "phone", "vantage_username"]
+
+users = models.User.__table__
+
+
+def _chunks(values: Sequence, size: int = LOOKUP_CHUNK) -> Iterable[Sequence]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def existing_values(db: Session, column, values: Iterable) -> Set:
+    """The subset of `values` already present in `column`"""
+    values = list(set(values))
+    found = set()
+    for chunk in _chunks(values):
+        found.update(db.execute(select(column).where(column.in_(chunk))).scalars())
+    return found
+
+
+def read_rows(path: str) -> List[Dict[str, str]]:
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = {"email", "phone", "country", "full_name", "password"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError(f"{path} has no column(s) {', '.join(sorted(missing))}")
+        # Blank optional cells mean "not given"
+        return [{field: (row.get(field) or "").strip() or None for field in FIELDS} for row in reader]
+
+
+def validate(db: Session, rows: List[Dict[str, str]]) -> Tuple[List[UserCreate], List[str]]:
+    """Validated users, in file order, and one message per problem found (line numbers count the header)"""
+    errors = []
+    valid = {}
+    for line, row in enumerate(rows, start=2):
+        try:
+            valid[line] = UserCreate(**row)
+        except ValidationError as e:
+            errors.extend(
+                (line, f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}") for error in e.errors()
+            )
+
+    for field in UNIQUE_FIELDS:
+        seen = {}
+        for line, user in valid.items():
+            value = getattr(user, field)
+            if value is None:
+                continue
+            if value in seen:
+                errors.append((line, f"{field} {value} repeats line {seen[value]}"))
+            else:
+                seen[value] = line
+        for value in existing_values(db, users.c[field], seen):
+            errors.append((seen[value], f"{field} {value} is already registered"))
+
+    codes = {user.referral_code for user in valid.values() if user.referral_code}
+    known = existing_values(db, users.c.referral_code, codes)
+    for line, user in valid.items():
+        if user.referral_code and user.referral_code not in known:
+            errors.append((line, f"invalid referral code {user.referral_code}"))
+
+    return list(valid.values()), [f"line {line}: {message}" for line, message in sorted(errors)]
+
+
+def hash_passwords(passwords: List[str], workers: int) -> List[str]:
+    """bcrypt every password, spread over `workers` processes"""
+    if workers <= 1 or len(passwords) < 2:
+        return [get_password_hash(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(get_password_hash, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def insert_users(db: Session, records: List[Dict]) -> None:
+    """Insert `records` in the session's transaction, bypassing the ORM"""
+    names = list(records[0])
+    connection = db.connection()
+    cursor = connection.connection.cursor()
+    try:
+        if connection.dialect.name == "postgresql":
+            # None is written as an unquoted empty field, which COPY reads as NULL
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(record.values() for record in records)
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {users.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        else:
+            placeholders = ", ".join("?" * len(names))
+            cursor.executemany(
+                f"INSERT INTO {users.name} ({', '.join(names)}) VALUES ({placeholders})",
+                [tuple(record.values()) for record in records]
+            )
+    finally:
+        cursor.close()
+
+
+def replace_taken_codes(db: Session, records: List[Dict]) -> None:
+    """Give records whose username or referral code is already taken fresh ones"""
+    for field, allocate in (
+        ("username", allocator.allocate_usernames),
+        ("referral_code", allocator.allocate_referral_codes),
+    ):
+        taken = existing_values(db, users.c[field], [record[field] for record in records])
+        clashing = [record for record in records if record[field] in taken]
+        for record, value in zip(clashing, allocate(db, len(clashing))):
+            record[field] = value
+
+
+def import_users(db: Session, users_data: List[UserCreate], activate: bool = False, workers: int = 1) -> List[Dict]:
+    """Create `users_data` (already validated) and commit. Returns the inserted records, with plain passwords."""
+    parents = {}
+    codes = {user.referral_code for user in users_data if user.referral_code}
+    for chunk in _chunks(list(codes)):
+        parents.update(db.execute(
+            select(users.c.referral_code, users.c.id).where(users.c.referral_code.in_(chunk))
+        ).all())
+
+    usernames = allocator.allocate_usernames(db, len(users_data))
+    referral_codes = allocator.allocate_referral_codes(db, len(users_data))
+    password_hashes = hash_passwords([user.password for user in users_data], workers)
+
+    records = [
+        {
+            "username": username,
+            "email": user.email,
+            "phone": user.phone,
+            "country": user.country,
+            "full_name": user.full_name,
+            "vantage_username": user.vantage_username,
+            "vantage_password": user.vantage_password,
+            "password_hash": password_hash,
+            "referral_code": referral_code,
+            "parent_id": parents.get(user.referral_code),
+            "is_active": activate,
+            "is_admin": False,
+            "is_superadmin": False,
+            # Micro-units, written as stored
+            "wallet_balance": 0,
+            "total_earned": 0,
+            "total_withdrawn": 0,
+        }
+        for user, username, referral_code, password_hash
+        in zip(users_data, usernames, referral_codes, password_hashes)
+    ]
+    for attempt in range(1, allocator.ALLOCATION_ATTEMPTS + 1):
+        try:
+            insert_users(db, records)
+            db.commit()
+            break
+        except db.get_bind().dialect.dbapi.IntegrityError as e:
+            db.rollback()
+            if attempt == allocator.ALLOCATION_ATTEMPTS or not allocator.is_code_conflict(e):
+                raise
+            replace_taken_codes(db, records)
+    for record, user in zip(records, users_data):
+        record["password"] = user.password
+    return records
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("csv_file")
+    parser.add_argument("--activate", action="store_true", help="create the users already active")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes hashing passwords")
+    parser.add_argument("--dry-run", action="store_true", help="validate the file without importing it")
+    parser.add_argument("--out", help="write the created usernames and referral codes to this CSV")
+    parser.add_argument("--send-emails", action="store_true", help="email every user their credentials")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rows = read_rows(args.csv_file)
+    if not rows:
+        print(f"{args.csv_file} has no users")
+        return 1
+
+    db = SessionLocal()
+    try:
+        users_data, errors = validate(db, rows)
+        if errors:
+            for message in errors:
+                print(message)
+            print(f"{len(errors)} problem(s) found; nothing imported")
+            return 1
+        print(f"{len(users_data):,} users valid ({time.perf_counter() - started:.1f}s)")
+        if args.dry_run:
+            return 0
+        records = import_users(db, users_data, activate=args.activate, workers=args.workers)
+    finally:
+        db.close()
+    print(f"Imported {len(records):,} users in {time.perf_counter() - started:.1f}s")
+
+    if args.out:
+        with open(args.out, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["email", "username", "referral_code"])
+            writer.writerows((record["email"], record["username"], record["referral_code"]) for record in records)
+        print(f"Wrote {args.out}")
+
+    if args.send_emails:
+        from .utils.email_service import EmailService
+
+        email_service = EmailService()
+        failed = [
+            record["email"] for record in records
+            if not email_service.send_credentials_email(
+                to_email=record["email"],
+                username=record["username"],
+                password=record["password"],
+                full_name=record["full_name"]
+            )
+        ]
+        print(f"Sent {len(records) - len(failed):,} credentials emails")
+        for email in failed:
+            print(f"  failed: {email}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,23 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import traceback
+import asyncio
 import logging
 
 from .database import Base, engine, get_db
 from .config import settings
+from .utils.responses import FastJSONResponse
+from .utils.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from .utils.income_partitions import ensure_partitions_locked
+from .utils import query_stats, metrics
+from .middleware.asgi import (
+    REQUEST_ID_HEADER, CatchExceptionsMiddleware, MetricsMiddleware, ProfilerMiddleware,
+    QueryTimingMiddleware, RequestIdMiddleware
+)
+from .middleware.load_shedding import LoadSheddingMiddleware
 
 # Import routers
 from .routers.admin import router as admin_router
@@ -27,11 +37,26 @@ logger = logging.getLogger(__name__)
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# Count queries and DB time per request
+query_stats.install(engine)
+metrics.instrument_pool(engine)
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    version=settings.PROJECT_VERSION
+    version=settings.PROJECT_VERSION,
+    default_response_class=FastJSONResponse
 )
 
+# Pure ASGI middleware; the last added runs first, so a request passes through CORS,
+# request id, profiler, metrics, load shedding, SQL timing and the exception handler.
+# CORS is outermost so 503s and 500s still carry its headers.
+app.add_middleware(CatchExceptionsMiddleware)
+app.add_middleware(QueryTimingMiddleware)
+app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,21 +64,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, REQUEST_ID_HEADER,
+        "Server-Timing", "X-DB-Queries", "X-Profile-Key", "X-Profile-Url"
+    ],
 )
 
-@app.middleware("http")
-async def catch_exceptions(request: Request, call_next):
+@app.on_event("startup")
+async def start_event_loop_probe():
+    app.state.event_loop_probe = asyncio.create_task(metrics.probe_event_loop_lag())
+
+@app.on_event("startup")
+async def ensure_income_partitions():
+    # Keep upcoming monthly income partitions ready (no-op until incomes is partitioned).
+    # Workers start together: one takes the advisory lock and the others skip.
     try:
-        response = await call_next(request)
-        return response
+        created = await run_in_threadpool(ensure_partitions_locked, engine, False)
+        if created:
+            logger.info(f"Created income partitions: {', '.join(created)}")
     except Exception as e:
-        logger.error(f"Exception occurred: {str(e)}")
-        logger.error(traceback.format_exc())
-        from fastapi.responses import JSONResponse
-        return JSONResponse(
-            status_code=500,
-            content={"detail": f"Internal server error: {str(e)}"},
-        )
+        logger.warning(f"Could not create income partitions: {str(e)}")
+
+@app.on_event("shutdown")
+async def stop_event_loop_probe():
+    app.state.event_loop_probe.cancel()
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -92,6 +126,11 @@ def health_check(db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=500, detail="Database connection failed")
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render_metrics(), headers={"Content-Type": metrics.CONTENT_TYPE_LATEST})
+
 # Temporary simple routes
 @app.get("/admin/test")
 def admin_test():
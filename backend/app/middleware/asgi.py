@@ -0,0 +1,247 @@
+"""Pure ASGI middleware: request ids, profiling, metrics, SQL timing and error handling.
+
+These replace the @app.middleware("http") functions. That decorator goes
+through Starlette's BaseHTTPMiddleware, which runs the rest of the app in a
+separate task and pipes every response body through a memory stream, on every
+request and once per middleware. Here each middleware wraps `send` to read or
+amend the http.response.start message and passes body messages through as
+they come, so streaming responses still stream.
+"""
+import asyncio
+import logging
+import re
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+from ..utils import metrics, profiler, query_stats
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Caller-supplied ids are echoed only if they look like ids, so they are safe to log
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+# Id of the request being handled, for log lines written while handling it
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+class RequestIdMiddleware:
+    """Give every request an id: the caller's X-Request-ID if valid, otherwise a new one.
+
+    The id is returned in the X-Request-ID response header and is available as
+    request.state.request_id and through the request_id context variable.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        current_id = incoming if incoming and _VALID_REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = current_id
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = current_id
+            await send(message)
+
+        token = request_id.set(current_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
+
+
+class ProfilerMiddleware:
+    """Profile the request when a superadmin sends `X-Profile: 1` or `?__profile`.
+
+    The speedscope JSON is stored in private storage and returned in the
+    X-Profile-Key and X-Profile-Url headers; the url is the superadmin-only
+    /admin/files endpoint.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        if not profiler.profile_requested(request.headers, request.query_params):
+            await self.app(scope, receive, send)
+            return
+
+        user_id = await run_in_threadpool(profiler.superadmin_id, request.headers.get("authorization", ""))
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        if not profiler.rate_limiter.allow(user_id):
+            response = JSONResponse(status_code=429, content={"detail": "Profiling rate limit reached, try again later"})
+            await response(scope, receive, send)
+            return
+
+        # Sync endpoints run in the threadpool: follow whichever worker thread is running the endpoint
+        endpoint = None
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                endpoint = getattr(route, "endpoint", None)
+                break
+        focus_code = None
+        if endpoint is not None and not asyncio.iscoroutinefunction(endpoint):
+            focus_code = endpoint.__code__
+
+        sampler = profiler.SamplingProfiler(
+            [threading.get_ident()], focus_code=focus_code, name=f"{request.method} {request.url.path}"
+        )
+        stopped = False
+
+        async def send_with_profile(message: Message) -> None:
+            nonlocal stopped
+            if message["type"] == "http.response.start":
+                # The profile covers the request up to its response headers, which carry its key
+                sampler.stop()
+                stopped = True
+                key, url = await run_in_threadpool(sampler.save)
+                headers = MutableHeaders(scope=message)
+                headers["X-Profile-Key"] = key
+                headers["X-Profile-Url"] = url
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if not stopped:
+                sampler.stop()
+
+
+class MetricsMiddleware:
+    """Request count, latency and in-flight gauge, labelled by route template rather than raw path.
+
+    Latency runs until the response body has been sent.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        metrics.IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.IN_FLIGHT.dec()
+            # The router records the matched route in the scope
+            route = scope.get("route")
+            metrics.observe_request(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status_code,
+                time.perf_counter() - started
+            )
+
+
+class QueryTimingMiddleware:
+    """Report the request's query count and DB time in X-DB-Queries and Server-Timing.
+
+    How long the request kept pooled connections checked out goes to the
+    db_connection_hold_seconds histogram once it is done: get_db closes the
+    session after the response has been sent, inside this middleware.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = query_stats.start()
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                total_ms = (time.perf_counter() - started) * 1000
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Queries"] = str(stats.count)
+                headers["Server-Timing"] = (
+                    f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+                )
+                if settings.SQL_DEBUG:
+                    repeated = stats.repeated(settings.SQL_REPEAT_THRESHOLD)
+                    if repeated:
+                        headers["X-DB-Repeated-Queries"] = str(sum(count for _, count in repeated))
+                        for shape, count in repeated:
+                            logger.warning(f"Possible N+1 in {scope['method']} {scope['path']}: {count} x {shape[:300]}")
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+        if stats.checkouts:
+            route = scope.get("route")
+            metrics.observe_connection_hold(scope["method"], getattr(route, "path", "unmatched"), stats.hold)
+
+
+class CatchExceptionsMiddleware:
+    """Log unhandled exceptions and answer 500 with the error, unless the response has already started"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_tracking_start(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking_start)
+        except Exception as e:
+            logger.error(f"Exception occurred (request {request_id.get()}): {str(e)}")
+            logger.error(traceback.format_exc())
+            if response_started:
+                raise
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": f"Internal server error: {str(e)}"},
+            )
+            await response(scope, receive, send)
@@ -32,6 +32,8 @@ async def get_current_user_optional(
         raise credentials_exception
     
     user = crud.user.get_user_by_username(db, username=username)
+    # Nothing else in here needs the database: return the connection until the endpoint's first query
+    db.release()
     if user is None:
         raise credentials_exception
     
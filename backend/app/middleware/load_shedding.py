@@ -0,0 +1,164 @@
+"""Per-route-class concurrency limits with fast 503s instead of unbounded queueing.
+
+Every request is put in a route class by its method and route template:
+    interactive   everything not listed below (logins, /auth/me, summaries, ...)
+    admin_heavy   referral trees, searches, full listings, reports, bulk updates
+    background    Excel uploads, manual distribution, exports, upload profiling
+/health and /metrics are never limited. Each class has its own limit on
+requests handled at once and on requests waiting for a slot (see config.py).
+A request that finds the queue full, or waits longer than
+LOAD_SHED_QUEUE_TIMEOUT, is answered 503 with Retry-After at once. So heavy
+admin work holds at most its own class's share of the threadpool and the
+database pool, and user traffic keeps the rest.
+
+Limits are per worker process and are enforced on the event loop, so they need
+no locks.
+"""
+import asyncio
+import re
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..config import settings
+from ..utils import metrics
+
+INTERACTIVE = "interactive"
+ADMIN_HEAVY = "admin_heavy"
+BACKGROUND = "background"
+
+# (method, route template, class); None means not limited. Unlisted routes are interactive.
+ROUTE_CLASSES: List[Tuple[str, str, Optional[str]]] = [
+    ("GET", "/health", None),
+    ("GET", "/metrics", None),
+
+    ("GET", "/users/", ADMIN_HEAVY),
+    ("GET", "/users/search", ADMIN_HEAVY),
+    ("GET", "/users/{user_id}/referral-tree", ADMIN_HEAVY),
+    ("GET", "/users/{user_id}/referral-stats", ADMIN_HEAVY),
+    ("GET", "/users/{user_id}/referrals/level/{level}", ADMIN_HEAVY),
+    ("PUT", "/users/bulk-activate", ADMIN_HEAVY),
+    ("GET", "/admin/reports/users", ADMIN_HEAVY),
+    ("GET", "/admin/reports/income", ADMIN_HEAVY),
+    ("GET", "/withdrawal/all", ADMIN_HEAVY),
+    ("PUT", "/withdrawal/bulk-process", ADMIN_HEAVY),
+    ("GET", "/deposit/admin/all", ADMIN_HEAVY),
+    ("GET", "/deposit/admin/stats", ADMIN_HEAVY),
+    ("PUT", "/deposit/admin/bulk-process", ADMIN_HEAVY),
+
+    ("POST", "/upload/excel", BACKGROUND),
+    ("POST", "/manual-distribution/distribute", BACKGROUND),
+    ("GET", "/admin/reports/{report}/export", BACKGROUND),
+    ("POST", "/admin/profile/uploads/{upload_id}", BACKGROUND),
+]
+
+_COMPILED_ROUTES: List[Tuple[str, re.Pattern, Optional[str]]] = [
+    (method, compile_path(template)[0], name) for method, template, name in ROUTE_CLASSES
+]
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """The class a request belongs to, or None if it is not limited"""
+    for route_method, pattern, name in _COMPILED_ROUTES:
+        if route_method == method and pattern.match(path):
+            return name
+    return INTERACTIVE
+
+
+class ConcurrencyLimit:
+    """At most `limit` requests at once and `queue` more waiting, each for up to `timeout` seconds"""
+
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> Optional[str]:
+        """Take a slot; returns None once it has one, or why the request is shed"""
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            return None
+        if len(self.waiters) >= self.queue:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        metrics.REQUESTS_QUEUED.labels(self.name).inc()
+        try:
+            # release() hands its slot straight to the waiter, so `active` already counts it
+            await asyncio.wait_for(waiter, self.timeout)
+        except asyncio.TimeoutError:
+            return "timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived just as the request was cancelled: pass it on
+                self.release()
+            raise
+        finally:
+            metrics.REQUESTS_QUEUED.labels(self.name).dec()
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        return None
+
+    def release(self) -> None:
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+def default_limits() -> Dict[str, ConcurrencyLimit]:
+    """Limits for each route class from settings; classes with 0 concurrency are left out"""
+    configured = {
+        INTERACTIVE: (settings.INTERACTIVE_CONCURRENCY, settings.INTERACTIVE_QUEUE),
+        ADMIN_HEAVY: (settings.ADMIN_HEAVY_CONCURRENCY, settings.ADMIN_HEAVY_QUEUE),
+        BACKGROUND: (settings.BACKGROUND_CONCURRENCY, settings.BACKGROUND_QUEUE),
+    }
+    return {
+        name: ConcurrencyLimit(name, limit, queue, settings.LOAD_SHED_QUEUE_TIMEOUT)
+        for name, (limit, queue) in configured.items()
+        if limit > 0
+    }
+
+
+class LoadSheddingMiddleware:
+    """Hold each request to its route class's limit, answering 503 with Retry-After when over it"""
+
+    def __init__(self, app: ASGIApp, limits: Optional[Dict[str, ConcurrencyLimit]] = None):
+        self.app = app
+        self.limits = default_limits() if limits is None else limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self.limits.get(route_class(scope["method"], scope["path"]))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        reason = await limit.acquire()
+        if reason is not None:
+            metrics.REQUESTS_SHED.labels(limit.name, reason).inc()
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server busy, try again later"},
+                headers={"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+
+        # The slot is held until the response body has been sent
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
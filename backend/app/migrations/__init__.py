@@ -0,0 +1,22 @@
+"""
+Database migrations.
+
+Initial setup: python -m app.migrations [create|drop|reset]
+Standalone migration scripts: python -m app.migrations.<script_name>
+"""
+from sqlalchemy import create_engine
+from .. import models  # noqa: F401 (registers the tables on Base)
+from ..database import Base
+from ..config import settings
+
+def create_tables():
+    """Create all database tables"""
+    engine = create_engine(settings.DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    print("✅ Database tables created successfully!")
+
+def drop_tables():
+    """Drop all database tables"""
+    engine = create_engine(settings.DATABASE_URL)
+    Base.metadata.drop_all(bind=engine)
+    print("🗑️  Database tables dropped!")
@@ -0,0 +1,16 @@
+import sys
+
+from . import create_tables, drop_tables
+
+if len(sys.argv) > 1:
+    if sys.argv[1] == "create":
+        create_tables()
+    elif sys.argv[1] == "drop":
+        drop_tables()
+    elif sys.argv[1] == "reset":
+        drop_tables()
+        create_tables()
+    else:
+        print("Usage: python -m app.migrations [create|drop|reset]")
+else:
+    create_tables()
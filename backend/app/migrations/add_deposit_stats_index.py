@@ -0,0 +1,29 @@
+"""Add the (status, confirmed_at) index used by /deposit/admin/stats"""
+from sqlalchemy import text
+from ..database import engine
+
+INDEX_NAME = "ix_deposit_transactions_status_confirmed_at"
+
+def upgrade():
+    """Create the index without locking deposit_transactions against writes"""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            "ON deposit_transactions (status, confirmed_at)"
+        ))
+    print(f"Index {INDEX_NAME} created successfully")
+
+def downgrade():
+    """Drop the index"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}"))
+    print(f"Index {INDEX_NAME} dropped")
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
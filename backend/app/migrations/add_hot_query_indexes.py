@@ -0,0 +1,105 @@
+"""Add the composite and partial indexes behind the hot list, summary and report queries"""
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from ..database import engine
+from .. import models
+from ..models.contact import ContactMessage
+
+# (model, index name) pairs; the index definitions live on the models' __table_args__
+INDEXES = [
+    (models.Income, "ix_incomes_user_id_created_at"),
+    (models.Income, "ix_incomes_created_at"),
+    (models.User, "ix_users_parent_id"),
+    (models.DepositTransaction, "ix_deposit_transactions_user_id_status"),
+    (models.DepositTransaction, "ix_deposit_transactions_status_confirmed_at"),
+    (models.DepositTransaction, "ix_deposit_transactions_pending_created_at"),
+    (models.WithdrawalRequest, "ix_withdrawal_requests_user_id_status"),
+    (models.WithdrawalRequest, "ix_withdrawal_requests_pending_requested_at"),
+    (models.Deduction, "ix_deductions_user_id_created_at"),
+    (ContactMessage, "ix_contact_messages_created_at"),
+]
+
+def _get_index(model, name):
+    for index in model.__table__.indexes:
+        if index.name == name:
+            return index
+    raise LookupError(f"{model.__name__} has no index {name}")
+
+def _drop_if_invalid(conn, name):
+    # An interrupted concurrent build leaves an INVALID index behind; rebuild it
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).scalar()
+    if invalid:
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+def _is_partitioned(conn, table):
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"
+    ), {"table": table}).scalar())
+
+def _create_partitioned_index(conn, ddl, name, table):
+    """Build an index on a partitioned table without CONCURRENTLY on the parent, which PostgreSQL rejects.
+
+    The parent index is created ON ONLY the parent (invalid until every
+    partition has one), each partition's index is built concurrently and
+    attached, and the parent index becomes valid with the last attach.
+    """
+    conn.execute(text(ddl.replace(f" ON {table} ", f" ON ONLY {table} ", 1).replace(
+        "CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1
+    )))
+    partitions = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table ORDER BY c.relname"
+    ), {"table": table}).scalars().all()
+    for partition in partitions:
+        # A partition that already has an index attached to this one (e.g. created with it) is skipped
+        attached = conn.execute(text(
+            "SELECT 1 FROM pg_inherits i JOIN pg_index x ON x.indexrelid = i.inhrelid "
+            "WHERE i.inhparent = CAST(:parent AS regclass) AND x.indrelid = CAST(:partition AS regclass)"
+        ), {"parent": name, "partition": partition}).scalar()
+        if attached:
+            continue
+        partition_index = f"{name}_{partition[len(table) + 1:]}"
+        _drop_if_invalid(conn, partition_index)
+        conn.execute(text(ddl.replace(
+            f"CREATE INDEX {name} ON {table} ",
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition_index} ON {partition} ", 1
+        )))
+        conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}"))
+
+def upgrade():
+    """Create the indexes one by one without locking the tables against writes"""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for model, name in INDEXES:
+            table = model.__table__.name
+            ddl = str(CreateIndex(_get_index(model, name)).compile(dialect=engine.dialect))
+            if _is_partitioned(conn, table):
+                # incomes once app.migrations.partition_incomes has run
+                _create_partitioned_index(conn, ddl, name, table)
+            else:
+                _drop_if_invalid(conn, name)
+                conn.execute(text(ddl.replace("CREATE INDEX ", "CREATE INDEX CONCURRENTLY IF NOT EXISTS ", 1)))
+            print(f"Index {name} created successfully")
+
+def downgrade():
+    """Drop the indexes"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for model, name in INDEXES:
+            if _is_partitioned(conn, model.__table__.name):
+                # Not possible concurrently; this also drops the partitions' indexes
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            else:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+            print(f"Index {name} dropped")
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
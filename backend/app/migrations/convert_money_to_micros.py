@@ -0,0 +1,74 @@
+"""Convert the FLOAT money columns to BIGINT micro-units (see app/money.py)"""
+from sqlalchemy import inspect, text
+from sqlalchemy.types import Integer
+from ..database import Base, engine
+from .. import models  # registers every table on Base.metadata
+from ..money import MICROS, Money
+
+def _money_columns():
+    """(table, column) for every Money column in the models"""
+    return [
+        (table, column)
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, Money)
+    ]
+
+def _pending(conn, micros):
+    """Money columns per table still to convert: stored as floats (micros=True) or as integers (micros=False)"""
+    inspector = inspect(conn)
+    existing = set(inspector.get_table_names())
+    pending = {}
+    for table, column in _money_columns():
+        if table.name not in existing:
+            continue
+        current = {info["name"]: info["type"] for info in inspector.get_columns(table.name)}
+        if column.name in current and isinstance(current[column.name], Integer) != micros:
+            pending.setdefault(table, []).append(column)
+    return pending
+
+def _convert_sqlite(conn, table, column, new_type, expression):
+    # SQLite cannot change a column's type in place: copy it into a new column and swap
+    temporary = f"{column.name}__converted"
+    not_null = "" if column.nullable else " NOT NULL DEFAULT 0"
+    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {temporary} {new_type}{not_null}"))
+    conn.execute(text(f"UPDATE {table.name} SET {temporary} = {expression.format(column=column.name)}"))
+    conn.execute(text(f"ALTER TABLE {table.name} DROP COLUMN {column.name}"))
+    conn.execute(text(f"ALTER TABLE {table.name} RENAME COLUMN {temporary} TO {column.name}"))
+
+def _convert(micros):
+    if micros:
+        new_type, expression = "BIGINT", f"CAST(round({{column}} * {MICROS}) AS BIGINT)"
+    else:
+        new_type, expression = "DOUBLE PRECISION", f"{{column}} / {MICROS}.0"
+    with engine.begin() as conn:
+        pending = _pending(conn, micros)
+        for table, columns in pending.items():
+            if engine.dialect.name == "postgresql":
+                # One ALTER per table, so each table is rewritten once
+                conn.execute(text(f"ALTER TABLE {table.name} " + ", ".join(
+                    f"ALTER COLUMN {column.name} TYPE {new_type} USING {expression.format(column=column.name)}"
+                    for column in columns
+                )))
+            else:
+                for column in columns:
+                    _convert_sqlite(conn, table, column, new_type, expression)
+            print(f"{table.name}: {', '.join(column.name for column in columns)} converted to {new_type}")
+    if not pending:
+        print("Money columns already converted")
+
+def upgrade():
+    """Store every money column as BIGINT micro-units"""
+    _convert(micros=True)
+
+def downgrade():
+    """Store the money columns as floating-point dollars again"""
+    _convert(micros=False)
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,21 @@
+"""Create the allocation_counters table behind the username and referral-code allocator"""
+from ..database import engine
+from ..models.allocation_counter import AllocationCounter
+
+def upgrade():
+    """Create the counters table; counters start at 0 on first use"""
+    AllocationCounter.__table__.create(bind=engine, checkfirst=True)
+    print("allocation_counters table created successfully")
+
+def downgrade():
+    """Drop the counters table"""
+    AllocationCounter.__table__.drop(bind=engine, checkfirst=True)
+    print("allocation_counters table dropped")
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
@@ -0,0 +1,34 @@
+"""Create the income_daily_rollup table and fill it from existing incomes"""
+from ..database import SessionLocal, engine
+from ..models.income_rollup import IncomeDailyRollup
+from ..crud.income import rebuild_daily_rollup
+
+def rebuild(user_id=None):
+    """Recompute the rollup from the incomes table"""
+    db = SessionLocal()
+    try:
+        rows = rebuild_daily_rollup(db, user_id=user_id)
+    finally:
+        db.close()
+    print(f"Income rollup rebuilt ({rows} rows)")
+
+def upgrade():
+    """Create the rollup table and backfill it"""
+    IncomeDailyRollup.__table__.create(bind=engine, checkfirst=True)
+    print("income_daily_rollup table created successfully")
+    rebuild()
+
+def downgrade():
+    """Drop the rollup table"""
+    IncomeDailyRollup.__table__.drop(bind=engine, checkfirst=True)
+    print("income_daily_rollup table dropped")
+
+if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild":
+        rebuild(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    elif len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
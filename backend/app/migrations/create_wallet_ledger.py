@@ -0,0 +1,72 @@
+"""Create the wallet_ledger and wallet_snapshots tables and open the ledger with current balances"""
+from sqlalchemy import text
+
+from ..database import SessionLocal, engine
+from ..models.wallet_ledger import WalletLedgerEntry, WalletSnapshot
+from ..crud.wallet import open_ledger, reconcile, take_snapshots
+
+def snapshot():
+    """Snapshot every wallet with ledger entries since its last snapshot (run periodically, e.g. hourly)"""
+    db = SessionLocal()
+    try:
+        rows = take_snapshots(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Wallet snapshots taken ({rows} users)")
+
+def check():
+    """Report users whose wallet columns differ from their ledger. Returns the number of drifted users."""
+    db = SessionLocal()
+    try:
+        drifted = reconcile(db)
+    finally:
+        db.close()
+    for row in drifted:
+        print(
+            f"  user {row['user_id']} ({row['username']}): "
+            f"balance {row['wallet_balance']:.2f} vs ledger {row['ledger_balance']:.2f}, "
+            f"earned {row['total_earned']:.2f} vs {row['ledger_earned']:.2f}, "
+            f"withdrawn {row['total_withdrawn']:.2f} vs {row['ledger_withdrawn']:.2f}"
+        )
+    print(f"Wallet reconciliation: {len(drifted)} users drifted")
+    return len(drifted)
+
+def upgrade():
+    """Create the ledger tables and give every existing wallet its opening balance"""
+    WalletLedgerEntry.__table__.create(bind=engine, checkfirst=True)
+    WalletSnapshot.__table__.create(bind=engine, checkfirst=True)
+    if engine.dialect.name == "postgresql":
+        # Ledgers created before entries were stamped with their insert time
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE wallet_ledger ALTER COLUMN created_at SET DEFAULT clock_timestamp()"))
+    print("wallet_ledger and wallet_snapshots tables created successfully")
+
+    db = SessionLocal()
+    try:
+        if engine.dialect.name == "postgresql":
+            # No wallet may change between reading the opening balances and writing them
+            db.execute(text("LOCK TABLE users IN SHARE ROW EXCLUSIVE MODE"))
+        rows = open_ledger(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Wallet ledger opened ({rows} opening balances)")
+
+def downgrade():
+    """Drop the ledger tables"""
+    WalletSnapshot.__table__.drop(bind=engine, checkfirst=True)
+    WalletLedgerEntry.__table__.drop(bind=engine, checkfirst=True)
+    print("wallet_ledger and wallet_snapshots tables dropped")
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "snapshot":
+        snapshot()
+    elif len(sys.argv) > 1 and sys.argv[1] == "reconcile":
+        sys.exit(1 if check() else 0)
+    elif len(sys.argv) > 1 and sys.argv[1] == "downgrade":
+        downgrade()
+    else:
+        upgrade()
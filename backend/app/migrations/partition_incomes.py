@@ -0,0 +1,101 @@
+"""Convert incomes into a table range-partitioned by month on created_at
+
+    python -m app.migrations.partition_incomes                  convert (once), then create upcoming partitions
+    python -m app.migrations.partition_incomes ensure           create upcoming partitions
+    python -m app.migrations.partition_incomes archive N [--keep]
+                                                                export partitions older than N months to Parquet,
+                                                                then detach and drop them (--keep: detach only)
+
+The conversion copies every row and holds an exclusive lock on incomes while it
+runs, so schedule it in a maintenance window.
+"""
+from datetime import datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from ..database import engine
+from ..models.income import Income
+from ..utils.income_partitions import (
+    PARENT_TABLE, DEFAULT_PARTITION, PARTITION_LOCK_KEY, is_partitioned, month_start, create_partition,
+    ensure_partitions, ensure_partitions_locked, archive_partitions
+)
+
+OLD_TABLE = "incomes_unpartitioned"
+
+def upgrade():
+    """Rebuild incomes as a partitioned table and copy the existing rows into it"""
+    with engine.begin() as conn:
+        # Held until commit, so starting workers do not create partitions mid-conversion
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        if is_partitioned(conn):
+            print("incomes is already partitioned")
+        else:
+            conn.execute(text(f"LOCK TABLE {PARENT_TABLE} IN ACCESS EXCLUSIVE MODE"))
+
+            # Unique constraints on a partitioned table must include created_at, so
+            # incomes.id can no longer be the target of a foreign key
+            foreign_keys = conn.execute(text(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE confrelid = CAST(:table AS regclass) AND contype = 'f'"
+            ), {"table": PARENT_TABLE}).all()
+            for table, constraint in foreign_keys:
+                conn.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{constraint}"'))
+
+            # Move the old table out of the way, freeing its index names
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} RENAME TO {OLD_TABLE}"))
+            conn.execute(text(f"ALTER TABLE {OLD_TABLE} RENAME CONSTRAINT {PARENT_TABLE}_pkey TO {OLD_TABLE}_pkey"))
+            for index in Income.__table__.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+            conn.execute(text(f"UPDATE {OLD_TABLE} SET created_at = now() WHERE created_at IS NULL"))
+
+            conn.execute(text(
+                f"CREATE TABLE {PARENT_TABLE} (LIKE {OLD_TABLE} INCLUDING DEFAULTS) "
+                "PARTITION BY RANGE (created_at)"
+            ))
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ADD CONSTRAINT {PARENT_TABLE}_pkey PRIMARY KEY (id, created_at)"))
+            sequence = conn.execute(text(f"SELECT pg_get_serial_sequence('{OLD_TABLE}', 'id')")).scalar()
+            conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {PARENT_TABLE}.id"))
+            conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT_TABLE} DEFAULT"))
+
+            # One partition per month from the oldest income up to now
+            oldest = conn.execute(text(f"SELECT min(created_at) FROM {OLD_TABLE}")).scalar()
+            this_month = month_start(datetime.now(timezone.utc).date())
+            month = month_start(oldest.astimezone(timezone.utc).date()) if oldest else this_month
+            while month <= this_month:
+                create_partition(conn, month)
+                month = month_start(month, 1)
+
+            conn.execute(text(f"INSERT INTO {PARENT_TABLE} SELECT * FROM {OLD_TABLE}"))
+            for index in Income.__table__.indexes:
+                conn.execute(CreateIndex(index))
+            conn.execute(text(f"DROP TABLE {OLD_TABLE}"))
+            print("incomes converted to monthly partitions")
+
+        created = ensure_partitions(conn)
+
+    # ANALYZE the new tables outside the conversion transaction
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {PARENT_TABLE}"))
+    print(f"Created partitions: {', '.join(created) or 'none needed'}")
+
+def ensure():
+    """Create partitions for the current and upcoming months"""
+    created = ensure_partitions_locked(engine)
+    print(f"Created partitions: {', '.join(created) or 'none needed'}")
+
+def archive(older_than_months: int, drop: bool = True):
+    """Export old monthly partitions to Parquet and detach them"""
+    with engine.connect() as conn:
+        archived = archive_partitions(conn, older_than_months, drop=drop)
+    for name, path in archived:
+        print(f"{name}: {path or 'empty, nothing exported'}")
+    print(f"Archived {len(archived)} partition(s)")
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "ensure":
+        ensure()
+    elif len(sys.argv) > 2 and sys.argv[1] == "archive":
+        archive(int(sys.argv[2]), drop="--keep" not in sys.argv)
+    else:
+        upgrade()
@@ -3,20 +3,28 @@ Database models for Brand FX.
 """
 from .user import User
 from .income import Income, IncomeType
+from .income_rollup import IncomeDailyRollup
 from .withdrawal import WithdrawalRequest, WithdrawalStatus
 from .upload import ExcelUpload
 from .deposit import DepositTransaction, DepositStatus
 from .deduction import Deduction, DeductionType
+from .wallet_ledger import WalletLedgerEntry, WalletSnapshot, LedgerEntryType
+from .allocation_counter import AllocationCounter
 
 __all__ = [
     "User",
     "Income",
     "IncomeType",
+    "IncomeDailyRollup",
     "WithdrawalRequest", 
     "WithdrawalStatus",
     "ExcelUpload",
     'DepositTransaction',
     'DepositStatus',
     'Deduction',
-    'DeductionType'
+    'DeductionType',
+    'WalletLedgerEntry',
+    'WalletSnapshot',
+    'LedgerEntryType',
+    'AllocationCounter'
 ]
\ No newline at end of file
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger
+from ..database import Base
+
+class AllocationCounter(Base):
+    """Next unused number of each code sequence (see crud/allocator.py).
+
+    One row per sequence: "referral_code", and "username:YYMMDD" for each day.
+    """
+    __tablename__ = "allocation_counters"
+    
+    name = Column(String(50), primary_key=True)
+    next_value = Column(BigInteger, nullable=False, default=0)
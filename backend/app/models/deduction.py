@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
+from ..money import Money
 import enum
 
 class DeductionType(str, enum.Enum):
@@ -17,13 +18,13 @@ class Deduction(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Deduction details
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     deduction_type = Column(Enum(DeductionType), default=DeductionType.DEPOSIT_PAYMENT)
     description = Column(Text, nullable=True)
     
     # Related transaction (e.g., deposit ID that triggered this deduction)
     related_deposit_id = Column(Integer, ForeignKey("deposit_transactions.id"), nullable=True)
-    related_income_id = Column(Integer, ForeignKey("incomes.id"), nullable=True)
+    related_income_id = Column(Integer, nullable=True)  # incomes.id; no FK since incomes is partitioned
     
     # Admin notes
     admin_notes = Column(Text, nullable=True)
@@ -36,3 +37,8 @@ class Deduction(Base):
     user = relationship("User", back_populates="deductions", foreign_keys=[user_id])
     deducted_by_user = relationship("User", foreign_keys=[deducted_by])
     deposit = relationship("DepositTransaction", backref="deductions")
+    
+    __table_args__ = (
+        # A user's deductions, newest first
+        Index("ix_deductions_user_id_created_at", "user_id", "created_at", "id"),
+    )
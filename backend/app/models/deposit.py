@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
+from ..money import Money
 import enum
 
 class DepositStatus(str, enum.Enum):
@@ -18,7 +19,7 @@ class DepositTransaction(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
     # Transaction details
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     status = Column(Enum(DepositStatus), default=DepositStatus.PENDING)
     
     # Payment details
@@ -36,4 +37,17 @@ class DepositTransaction(Base):
     confirmed_at = Column(DateTime(timezone=True), nullable=True)
     
     # Relationships
-    user = relationship("User", back_populates="deposits")
\ No newline at end of file
+    user = relationship("User", back_populates="deposits")
+    
+    __table_args__ = (
+        # Admin stats filter on status and confirmed_at time windows
+        Index("ix_deposit_transactions_status_confirmed_at", "status", "confirmed_at"),
+        # A user's deposits and per-status summaries
+        Index("ix_deposit_transactions_user_id_status", "user_id", "status"),
+        # Admin queue of pending deposits, newest first
+        Index(
+            "ix_deposit_transactions_pending_created_at", "created_at", "id",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'")
+        ),
+    )
\ No newline at end of file
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
+from ..money import Money
 import enum
 
 class IncomeType(str, enum.Enum):
@@ -14,7 +15,7 @@ class Income(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     percentage = Column(Float, nullable=False)
     level = Column(Integer, nullable=False)
     income_type = Column(Enum(IncomeType), nullable=False)
@@ -22,10 +23,17 @@ class Income(Base):
     
     # Source user who generated this income
     source_vantage_username = Column(String(50), nullable=False)
-    source_income_amount = Column(Float, nullable=False)
+    source_income_amount = Column(Money, nullable=False)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="incomes")
\ No newline at end of file
+    user = relationship("User", back_populates="incomes")
+    
+    __table_args__ = (
+        # A user's income history, newest first (keyset pagination on created_at, id)
+        Index("ix_incomes_user_id_created_at", "user_id", "created_at", "id"),
+        # Admin reports and exports over a date range
+        Index("ix_incomes_created_at", "created_at"),
+    )
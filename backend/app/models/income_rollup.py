@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, Enum
+from ..database import Base
+from ..money import Money
+from .income import IncomeType
+
+class IncomeDailyRollup(Base):
+    """Per-user daily income totals, kept in step with the incomes table.
+
+    One row per (user, day, income type, level); summaries read a handful of
+    these rows instead of scanning the user's whole income history.
+    """
+    __tablename__ = "income_daily_rollup"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    income_type = Column(Enum(IncomeType), primary_key=True)
+    level = Column(Integer, primary_key=True)
+    
+    amount_sum = Column(Money, nullable=False, default=0.0)
+    count = Column(Integer, nullable=False, default=0)
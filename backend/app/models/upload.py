@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Float
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
+from ..money import Money
 
 
 class ExcelUpload(Base):
@@ -19,7 +20,7 @@ class ExcelUpload(Base):
     error_rows = Column(Integer, default=0)
     
     # Income distribution
-    total_distributed = Column(Float, default=0.0)
+    total_distributed = Column(Money, default=0.0)
     
     # Timestamps
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
+from ..money import Money
 
 class User(Base):
     __tablename__ = "users"
@@ -29,9 +30,9 @@ class User(Base):
     is_superadmin = Column(Boolean, default=False)
     
     # Wallet
-    wallet_balance = Column(Float, default=0.0)
-    total_earned = Column(Float, default=0.0)
-    total_withdrawn = Column(Float, default=0.0)
+    wallet_balance = Column(Money, default=0.0)
+    total_earned = Column(Money, default=0.0)
+    total_withdrawn = Column(Money, default=0.0)
     
     # Withdrawal details
     withdrawal_address = Column(Text, nullable=True)
@@ -45,4 +46,13 @@ class User(Base):
     incomes = relationship("Income", back_populates="user")
     withdrawal_requests = relationship("WithdrawalRequest", back_populates="user", foreign_keys="[WithdrawalRequest.user_id]")
     deposits = relationship("DepositTransaction", back_populates="user", foreign_keys="[DepositTransaction.user_id]")
-    deductions = relationship("Deduction", back_populates="user", foreign_keys="[Deduction.user_id]")
\ No newline at end of file
+    deductions = relationship("Deduction", back_populates="user", foreign_keys="[Deduction.user_id]")
+    
+    __table_args__ = (
+        # Referral tree lookups; root users have no parent, so they are left out of the index
+        Index(
+            "ix_users_parent_id", "parent_id",
+            postgresql_where=text("parent_id IS NOT NULL"),
+            sqlite_where=text("parent_id IS NOT NULL")
+        ),
+    )
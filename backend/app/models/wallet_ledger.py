@@ -0,0 +1,75 @@
+from sqlalchemy import Column, Integer, BigInteger, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from ..database import Base
+from ..money import Money
+import enum
+
+class LedgerEntryType(str, enum.Enum):
+    OPENING_BALANCE = "OPENING_BALANCE"  # Wallet totals when the ledger was introduced
+    INCOME = "INCOME"
+    WITHDRAWAL_HOLD = "WITHDRAWAL_HOLD"  # Amount taken from the wallet when a withdrawal is requested
+    WITHDRAWAL_RELEASE = "WITHDRAWAL_RELEASE"  # Held amount returned when the request is rejected
+    WITHDRAWAL_COMPLETE = "WITHDRAWAL_COMPLETE"  # Held amount paid out
+    MANUAL_DEPOSIT = "MANUAL_DEPOSIT"
+
+class insert_time(FunctionElement):
+    """The time a row is inserted. PostgreSQL's now() is the time its transaction started."""
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+@compiles(insert_time)
+def _insert_time(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
+
+@compiles(insert_time, "postgresql")
+def _insert_time_postgresql(element, compiler, **kw):
+    return "clock_timestamp()"
+
+class WalletLedgerEntry(Base):
+    """Append-only record of every change to a user's wallet columns.
+
+    Each row holds the deltas applied to wallet_balance, total_earned and
+    total_withdrawn, written in the same transaction as the update itself.
+    """
+    __tablename__ = "wallet_ledger"
+    
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entry_type = Column(Enum(LedgerEntryType), nullable=False)
+    # Id of the income, withdrawal or deposit behind the entry
+    reference_id = Column(Integer, nullable=True)
+    
+    balance_delta = Column(Money, nullable=False, default=0.0)
+    earned_delta = Column(Money, nullable=False, default=0.0)
+    withdrawn_delta = Column(Money, nullable=False, default=0.0)
+    
+    # When the entry was written, so entries written before an in-progress transaction
+    # started also got their ids first (see crud.wallet.take_snapshots)
+    created_at = Column(DateTime(timezone=True), server_default=insert_time(), nullable=False)
+    
+    __table_args__ = (
+        # A user's entries after their latest snapshot
+        Index("ix_wallet_ledger_user_id_id", "user_id", "id"),
+    )
+
+class WalletSnapshot(Base):
+    """A user's wallet totals covering every ledger entry up to last_entry_id.
+
+    as_of is the time the snapshot's entries were cut off at, so balance-as-of
+    queries start from the latest snapshot with as_of at or before the date asked for.
+    """
+    __tablename__ = "wallet_snapshots"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    last_entry_id = Column(BigInteger().with_variant(Integer, "sqlite"), nullable=False)
+    as_of = Column(DateTime(timezone=True), nullable=False)
+    
+    balance = Column(Money, nullable=False)
+    total_earned = Column(Money, nullable=False)
+    total_withdrawn = Column(Money, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_wallet_snapshots_user_id_as_of", "user_id", "as_of"),
+    )
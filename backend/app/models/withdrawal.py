@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
+from ..money import Money
 
 import enum
 
@@ -17,7 +18,7 @@ class WithdrawalRequest(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     status = Column(Enum(WithdrawalStatus), default=WithdrawalStatus.PENDING)
     
     # Admin processing
@@ -31,4 +32,15 @@ class WithdrawalRequest(Base):
     
     # Relationships
     user = relationship("User", back_populates="withdrawal_requests", foreign_keys=[user_id])
-    admin = relationship("User", foreign_keys=[processed_by])
\ No newline at end of file
+    admin = relationship("User", foreign_keys=[processed_by])
+    
+    __table_args__ = (
+        # A user's withdrawals, optionally filtered by status
+        Index("ix_withdrawal_requests_user_id_status", "user_id", "status"),
+        # Admin queue of pending requests, newest first
+        Index(
+            "ix_withdrawal_requests_pending_requested_at", "requested_at", "id",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'")
+        ),
+    )
@@ -0,0 +1,82 @@
+"""
+Money stored as integer micro-units.
+
+Amounts live in BIGINT columns as millionths of a dollar (USDT's precision),
+so sums and differences computed by the database, or over int64 NumPy arrays,
+are exact. Python code and the API still see float dollars: the Money column
+type converts on the way in and out, and MoneyAmount rounds request values to
+micro-units. Use to_micros/from_micros where Python itself does the arithmetic.
+"""
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Annotated, Optional, Union
+
+import numpy as np
+from pydantic import AfterValidator
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+MICROS = 1_000_000
+
+Number = Union[int, float, Decimal]
+
+
+def to_micros(amount: Number) -> int:
+    """Micro-units in `amount` dollars, rounded half to even"""
+    if isinstance(amount, int):
+        return amount * MICROS
+    if isinstance(amount, Decimal):
+        return int((amount * MICROS).to_integral_value(ROUND_HALF_EVEN))
+    return round(amount * MICROS)
+
+
+def from_micros(micros: Number) -> float:
+    """Dollars in `micros` micro-units (the nearest float)"""
+    return float(micros) / MICROS
+
+
+def micros_array(amounts) -> np.ndarray:
+    """Vectorized to_micros: float dollars to an int64 array of micro-units"""
+    return np.rint(np.asarray(amounts, dtype=np.float64) * MICROS).astype(np.int64)
+
+
+def percent_of(micros, rate: float):
+    """`rate` (e.g. 0.02) of an amount in micro-units, rounded half up to whole micro-units.
+
+    Works on ints and on int64 arrays. The rate is used as the exact decimal
+    it is written as, so 0.02 takes exactly 1/50.
+    """
+    numerator, denominator = Decimal(str(rate)).as_integer_ratio()
+    return (micros * numerator + denominator // 2) // denominator
+
+
+def quantize(amount: float) -> float:
+    """`amount` rounded to whole micro-units"""
+    return from_micros(to_micros(amount))
+
+
+class Money(TypeDecorator):
+    """Float dollars in Python, BIGINT micro-units in the database.
+
+    Literals compared or combined with a Money column (wallet_balance + :delta)
+    are converted too, so UPDATEs and filters stay in integer arithmetic.
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    # Built once: TypeDecorator otherwise creates a comparator class for every
+    # expression involving the column (wallet_balance + :delta, sum(amount), ...)
+    class Comparator(TypeDecorator.Comparator, BigInteger.comparator_factory):
+        pass
+
+    comparator_factory = Comparator
+
+    def process_bind_param(self, value: Optional[Number], dialect) -> Optional[int]:
+        return None if value is None else to_micros(value)
+
+    def process_result_value(self, value: Optional[Number], dialect) -> Optional[float]:
+        # SUM() over BIGINT comes back as Decimal on PostgreSQL
+        return None if value is None else from_micros(value)
+
+
+# Money fields in request and response schemas
+MoneyAmount = Annotated[float, AfterValidator(quantize)]
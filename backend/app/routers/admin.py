@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timedelta
+import mimetypes
+import os
+import threading
 
 from .. import crud, schemas, models, utils
-from ..database import get_db
+from ..database import get_db, SessionLocal, engine
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from ..models.user import User
 from ..config import settings
+from ..utils.responses import fast_response
+from ..utils.pagination import after_cursor, clamp_limit, decode_cursor, encode_cursor, keyset_order
+from ..utils.export import stream_csv, stream_xlsx, CSV_MEDIA_TYPE, XLSX_MEDIA_TYPE
+from ..utils.excel_processor import ExcelProcessor
+from ..utils.metrics import suppressed as metrics_suppressed
+from ..utils.profiler import SamplingProfiler, rate_limiter
+from ..utils.sandbox import sandbox_session
+from ..utils.storage import get_private_storage
+
+# Tables an upload replay writes to run against copies: users and the upload row
+# are copied with their contents, the rest start empty
+REPLAY_COPIED_TABLES = ("users", "excel_uploads")
+REPLAY_EMPTY_TABLES = ("incomes", "income_daily_rollup", "wallet_ledger")
+
+# Rows fetched per round trip when streaming report listings
+REPORT_BATCH_SIZE = 1000
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
@@ -35,6 +56,7 @@ async def get_current_user(
         raise credentials_exception
     
     user = crud.user.get_user_by_username(db, username=username)
+    db.release()
     if user is None:
         raise credentials_exception
     
@@ -48,8 +70,11 @@ async def get_current_user(
 
 @router.get("/reports/users")
 def get_user_report(
+    request: Request,
     start_date: datetime = None,
     end_date: datetime = None,   
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -66,19 +91,46 @@ def get_user_report(
     if not end_date:
         end_date = datetime.now()
     
-    # Get users created in date range
-    users = db.query(models.User).filter(
+    in_range = [
         models.User.created_at >= start_date,
         models.User.created_at <= end_date
-    ).all()
+    ]
     
-    # Get statistics
-    total_users = len(users)
-    active_users = len([u for u in users if u.is_active])
-    total_income = sum(user.total_earned for user in users)
-    total_withdrawals = sum(user.total_withdrawn for user in users)
+    # Get statistics in one aggregate query
+    total_users, active_users, total_income, total_withdrawals = db.query(
+        func.count(models.User.id),
+        func.count(models.User.id).filter(models.User.is_active.is_(True)),
+        func.coalesce(func.sum(models.User.total_earned), 0.0),
+        func.coalesce(func.sum(models.User.total_withdrawn), 0.0)
+    ).filter(*in_range).one()
     
-    return {
+    # One keyset page of the users themselves, read as plain rows; the full listing streams from the export
+    limit = clamp_limit(limit)
+    users_query = db.query(
+        models.User.id,
+        models.User.username,
+        models.User.email,
+        models.User.is_active,
+        models.User.total_earned,
+        models.User.total_withdrawn,
+        models.User.created_at
+    ).filter(*in_range)
+    if cursor:
+        cursor_created, cursor_id = decode_cursor(cursor)
+        users_query = users_query.filter(
+            after_cursor(models.User.created_at, models.User.id, cursor_created, cursor_id, descending=False)
+        )
+    users_query = users_query.order_by(
+        *keyset_order(models.User.created_at, models.User.id, descending=False)
+    ).limit(limit + 1)
+    
+    users = [row._asdict() for row in users_query]
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = encode_cursor(users[-1]["created_at"], users[-1]["id"])
+    
+    return fast_response(request, {
         "period": {
             "start_date": start_date,
             "end_date": end_date
@@ -91,24 +143,18 @@ def get_user_report(
             "total_withdrawals": total_withdrawals,
             "platform_balance": total_income - total_withdrawals
         },
-        "users": [
-            {
-                "id": user.id,
-                "username": user.username,
-                "email": user.email,
-                "is_active": user.is_active,
-                "total_earned": user.total_earned,
-                "total_withdrawn": user.total_withdrawn,
-                "created_at": user.created_at
-            }
-            for user in users
-        ]
-    }
+        "users": {
+            "items": users,
+            "next_cursor": next_cursor,
+            "limit": limit
+        }
+    })
 
 @router.get("/reports/income")
 def get_income_report(
     start_date: datetime = None,
     end_date: datetime = None,
+    current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Generate income distribution report (admin only)"""
@@ -124,30 +170,35 @@ def get_income_report(
     if not end_date:
         end_date = datetime.now()
     
-    # Get incomes in date range
-    incomes = db.query(models.Income).filter(
+    # Group by income type and level in the database
+    rows = db.query(
+        models.Income.income_type,
+        models.Income.level,
+        func.count(models.Income.id),
+        func.sum(models.Income.amount),
+        func.max(models.Income.percentage)
+    ).filter(
         models.Income.created_at >= start_date,
         models.Income.created_at <= end_date
+    ).group_by(
+        models.Income.income_type,
+        models.Income.level
+    ).order_by(
+        models.Income.income_type,
+        models.Income.level
     ).all()
     
-    # Group by income type and level
-    report = {}
-    total_amount = 0
-    
-    for income in incomes:
-        key = f"{income.income_type}_level_{income.level}"
-        if key not in report:
-            report[key] = {
-                "income_type": income.income_type,
-                "level": income.level,
-                "count": 0,
-                "total_amount": 0,
-                "percentage": income.percentage
-            }
-        
-        report[key]["count"] += 1
-        report[key]["total_amount"] += income.amount
-        total_amount += income.amount
+    report = [
+        {
+            "income_type": income_type,
+            "level": level,
+            "count": count,
+            "total_amount": amount,
+            "percentage": percentage
+        }
+        for income_type, level, count, amount, percentage in rows
+    ]
+    total_amount = sum(item["total_amount"] for item in report)
     
     return {
         "period": {
@@ -155,5 +206,183 @@ def get_income_report(
             "end_date": end_date
         },
         "total_amount": total_amount,
-        "distribution": list(report.values())
-    }
\ No newline at end of file
+        "distribution": report
+    }
+
+
+def _export_query(report: str, start_date: datetime, end_date: datetime):
+    """Column select and header for one exportable report"""
+    User = models.User
+    if report == "users":
+        columns = [
+            User.id, User.username, User.email, User.full_name, User.phone, User.country,
+            User.referral_code, User.parent_id, User.is_active, User.wallet_balance,
+            User.total_earned, User.total_withdrawn, User.created_at
+        ]
+        query = select(*columns)
+        created = User.created_at
+    elif report == "income":
+        Income = models.Income
+        columns = [
+            Income.id, Income.user_id, User.username, Income.amount, Income.percentage, Income.level,
+            Income.income_type, Income.source_vantage_username, Income.source_income_amount, Income.created_at
+        ]
+        query = select(*columns).join(User, Income.user_id == User.id)
+        created = Income.created_at
+    elif report == "deposits":
+        Deposit = models.DepositTransaction
+        columns = [
+            Deposit.id, Deposit.user_id, User.username, Deposit.amount, Deposit.status,
+            Deposit.usdt_address, Deposit.transaction_hash, Deposit.created_at, Deposit.confirmed_at
+        ]
+        query = select(*columns).join(User, Deposit.user_id == User.id)
+        created = Deposit.created_at
+    else:
+        Withdrawal = models.WithdrawalRequest
+        columns = [
+            Withdrawal.id, Withdrawal.user_id, User.username, Withdrawal.amount, Withdrawal.status,
+            Withdrawal.admin_notes, Withdrawal.requested_at, Withdrawal.processed_at
+        ]
+        query = select(*columns).join(User, Withdrawal.user_id == User.id)
+        created = Withdrawal.requested_at
+    
+    header = [column.key for column in columns]
+    query = query.where(created >= start_date, created <= end_date).order_by(created)
+    return header, query
+
+
+def _export_rows(query):
+    """Stream rows through a server-side cursor.
+
+    The body is produced after the endpoint returns, so the export has a session
+    of its own. It is opened when the first row is read and closed when the
+    generator finishes or is closed, so a response that is never sent holds none.
+    """
+    db = SessionLocal()
+    try:
+        yield from db.execute(query.execution_options(yield_per=REPORT_BATCH_SIZE))
+    finally:
+        db.close()
+
+
+@router.get("/reports/{report}/export")
+def export_report(
+    report: str = Path(..., pattern="^(users|income|deposits|withdrawals)$"),
+    format: str = Query("csv", pattern="^(csv|xlsx)$"),
+    start_date: datetime = None,
+    end_date: datetime = None,
+    current_user: User = Depends(get_current_user),
+):
+    """Download a report as CSV or XLSX (superadmin only)"""
+    if not current_user.is_superadmin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    # Default to last 30 days
+    if not start_date:
+        start_date = datetime.now() - timedelta(days=30)
+    if not end_date:
+        end_date = datetime.now()
+    
+    header, query = _export_query(report, start_date, end_date)
+    rows = _export_rows(query)
+    
+    filename = f"{report}_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{format}"
+    if format == "xlsx":
+        body, media_type = stream_xlsx(header, rows, title=report.capitalize()), XLSX_MEDIA_TYPE
+    else:
+        body, media_type = stream_csv(header, rows), CSV_MEDIA_TYPE
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/profile/uploads/{upload_id}")
+def profile_upload(
+    upload_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Replay an Excel upload under the sampling profiler (superadmin only).
+
+    The replay runs against temporary copies of the tables it writes to, inside
+    a transaction that is rolled back, so no income is distributed twice, no
+    user row is locked and the upload metrics are left alone. The speedscope
+    JSON is kept in private storage.
+    """
+    if not current_user.is_superadmin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    upload = crud.upload.get_upload(db, upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if not upload.file_path:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The file for this upload was not kept, so it cannot be replayed"
+        )
+    if not rate_limiter.allow(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Profiling rate limit reached, try again later"
+        )
+    
+    file_data = get_private_storage().read(upload.file_path)
+    uploaded_by = upload.uploaded_by
+    db.release()
+    
+    with sandbox_session(engine, REPLAY_COPIED_TABLES, REPLAY_EMPTY_TABLES) as replay_db, metrics_suppressed():
+        with SamplingProfiler([threading.get_ident()], name=f"ExcelUpload {upload_id} replay") as sampler:
+            result = ExcelProcessor.process_excel_sync(
+                db=replay_db,
+                file_data=file_data,
+                uploaded_by=uploaded_by,
+                upload_id=upload_id
+            )
+    
+    key, url = sampler.save()
+    return {
+        "upload_id": upload_id,
+        "profile_key": key,
+        "profile_url": url,
+        "duration": sampler.duration,
+        "total_rows": result["total_rows"],
+        "processed_rows": result["processed_rows"],
+        "error_rows": result["error_rows"]
+    }
+
+
+@router.get("/files/{key:path}")
+def get_private_file(
+    key: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Download a privately stored file, e.g. a kept Excel upload or a profile (superadmin only)"""
+    if not current_user.is_superadmin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    storage = get_private_storage()
+    try:
+        found = storage.exists(key)
+    except ValueError:
+        found = False
+    if not found:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    media_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+    return Response(
+        content=storage.read(key),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{os.path.basename(key)}"'}
+    )
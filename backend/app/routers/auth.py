@@ -5,9 +5,6 @@ from datetime import timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from typing import Optional
-import random
-import string
-from datetime import datetime as dt
 
 # Import User model directly
 from ..models.user import User
@@ -16,7 +13,9 @@ from .. import crud
 from ..database import get_db
 from ..config import settings
 from ..crud.user import get_user_by_username
+from ..crud import allocator
 from ..utils.email_service import EmailService  # Import email service
+from ..utils.metrics import track_email
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")  # Note the leading slash
@@ -66,6 +65,7 @@ async def get_current_user(
         raise credentials_exception
     
     user = get_user_by_username(db, username=username)
+    db.release()
     if user is None:
         raise credentials_exception
     
@@ -104,16 +104,6 @@ def register(
             detail="Phone number already registered"
         )
     
-    # Generate username (YYMMDD + 4 random digits)
-    date_part = dt.now().strftime("%y%m%d")
-    random_part = str(random.randint(1000, 9999))
-    username = date_part + random_part
-    
-    # Check if username already exists (unlikely but handle it)
-    while get_user_by_username(db, username):
-        random_part = str(random.randint(1000, 9999))
-        username = date_part + random_part
-    
     # Check if referral code is valid
     parent_id = None
     if user_data.referral_code:
@@ -125,33 +115,28 @@ def register(
             )
         parent_id = parent.id
     
-    # Generate referral code for new user
-    referral_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-    
-    # Ensure referral code is unique
-    while crud.user.get_user_by_referral_code(db, referral_code):
-        referral_code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    # The checks are done: return the connection while the password is hashed
+    db.release()
     
     # Store the plain password temporarily for email
     plain_password = user_data.password
     
     # Create user
     user_dict = user_data.dict()
-    user_dict["username"] = username
-    user_dict["referral_code"] = referral_code
+    user_dict.pop("username", None)
+    user_dict.pop("referral_code", None)
     user_dict["parent_id"] = parent_id
     user_dict["password_hash"] = get_password_hash(user_dict.pop("password"))
     
-    db_user = User(**user_dict)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    # Username (YYMMDD + digits) and referral code come from the allocator;
+    # the unique constraints catch a clash with an older code, and it retries
+    db_user = allocator.create_with_codes(db, User(**user_dict))
     
     # Send credentials email in background
     background_tasks.add_task(
-        email_service.send_credentials_email,
+        track_email(email_service.send_credentials_email),
         to_email=user_data.email,
-        username=username,
+        username=db_user.username,
         password=plain_password,
         full_name=user_data.full_name
     )
@@ -192,6 +177,8 @@ async def login(
 ):
     """User login using OAuth2 standard form"""
     user = get_user_by_username(db, username=form_data.username)
+    # bcrypt is slow: return the connection before checking the password
+    db.release()
     if not user or not verify_password(form_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -224,6 +211,7 @@ async def login_json(
 ):
     """Alternative login using JSON"""
     user = get_user_by_username(db, username=login_data.username)
+    db.release()
     if not user or not verify_password(login_data.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -257,6 +245,7 @@ async def login_form(
 ):
     """Alternative login using Form data"""
     user = get_user_by_username(db, username=username)
+    db.release()
     if not user or not verify_password(password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,10 +1,11 @@
 # app/routers/contact.py
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from ..database import get_db
 from ..models.contact import ContactMessage
 from ..schemas.contact import ContactCreate, ContactResponse
+from ..utils.pagination import paginate
 
 router = APIRouter(prefix="/contact", tags=["contact"])
 
@@ -41,8 +42,11 @@ async def create_contact_message(
 # ADMIN endpoints - these require authentication
 @router.get("/", response_model=List[ContactResponse])
 async def get_contact_messages(
+    response: Response,
     skip: int = 0,
-    limit: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: Session = Depends(get_db),
     # current_user: models.User = Depends(get_current_user)  # REMOVE THIS FOR NOW
 ):
@@ -54,13 +58,12 @@ async def get_contact_messages(
     # if not current_user.is_admin and not current_user.is_superadmin:
     #     raise HTTPException(status_code=403, detail="Not authorized")
     
-    messages = db.query(ContactMessage)\
-        .order_by(ContactMessage.created_at.desc())\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
-    return messages
+    page = paginate(
+        db, db.query(ContactMessage), ContactMessage.created_at, ContactMessage.id,
+        cursor=cursor, limit=limit, skip=skip, include_total=include_total
+    )
+    response.headers.update(page.headers())
+    return page.items
 
 @router.patch("/{message_id}")
 async def update_message_status(
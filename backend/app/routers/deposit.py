@@ -1,20 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, UploadFile, File, Form
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func, desc
 from typing import List, Optional
 import os
-import shutil
 from datetime import datetime, timedelta
 
 from .. import schemas, models
 from ..crud import deposit as deposit_crud
 from ..crud import deduction as deduction_crud
+from ..crud import wallet as wallet_crud
 from ..database import get_db
+from ..models.wallet_ledger import LedgerEntryType
 from ..middleware.auth import get_current_user_optional, get_current_user  # Import both
 from ..config import settings
+from ..utils.storage import get_storage
+from ..utils.responses import fast_response
 
 router = APIRouter(prefix="/deposit", tags=["deposit"])
 
+# Built once at import so list endpoints serialize in a single pydantic-core pass
+deposit_admin_list_adapter = TypeAdapter(List[schemas.deposit.DepositAdminResponse])
+
 # Superadmin's USDT wallet details
 SUPERADMIN_USDT_ADDRESS = os.getenv("USDT_ADDRESS", "0x34927dd80e01374e509951b59a804ce7c0295778")
 SUPERADMIN_USDT_QR_CODE = os.getenv("USDT_QR_CODE", "/static/qrcodes/usdt_qr.png")
@@ -38,17 +45,10 @@ async def create_deposit_request(
     deposit = deposit_crud.create_deposit(db, deposit_data, current_user.id)
     return deposit
 
-@router.post("/upload-screenshot/{deposit_id}")
-async def upload_payment_screenshot(
-    deposit_id: int,
-    payment_screenshot_url: Optional[str] = Form(None),
-    payment_screenshot: Optional[UploadFile] = File(None),
-    transaction_hash: Optional[str] = Form(None),
-    current_user: models.User = Depends(get_current_user),  # Keep as active only
-    db: Session = Depends(get_db)
-):
-    """Update deposit with screenshot (supports both file upload and URL)"""
-    # Verify deposit exists and belongs to user
+ALLOWED_SCREENSHOT_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+def get_owned_deposit(db: Session, deposit_id: int, user_id: int) -> models.DepositTransaction:
+    """Load a deposit and verify it belongs to the user"""
     deposit = deposit_crud.get_deposit(db, deposit_id)
     if not deposit:
         raise HTTPException(
@@ -56,44 +56,97 @@ async def upload_payment_screenshot(
             detail="Deposit request not found"
         )
     
-    if deposit.user_id != current_user.id:
+    if deposit.user_id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to update this deposit"
         )
     
-    # Validate that either file or URL is provided
-    if not payment_screenshot and not payment_screenshot_url:
+    return deposit
+
+def screenshot_key_prefix(user_id: int, deposit_id: int) -> str:
+    """Object keys for a deposit's screenshots all start with this prefix"""
+    return f"deposits/{user_id}/deposit_{deposit_id}_"
+
+def new_screenshot_key(user_id: int, deposit_id: int, filename: str) -> str:
+    """Build a storage key for a new screenshot, validating the file extension"""
+    file_ext = os.path.splitext(filename or "")[1].lower()
+    if file_ext not in ALLOWED_SCREENSHOT_EXTENSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_SCREENSHOT_EXTENSIONS)}"
+        )
+    
+    return f"{screenshot_key_prefix(user_id, deposit_id)}{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_ext}"
+
+@router.post("/upload-url/{deposit_id}")
+async def create_screenshot_upload_url(
+    deposit_id: int,
+    filename: str = Form(...),
+    content_type: Optional[str] = Form(None),
+    current_user: models.User = Depends(get_current_user),  # Keep as active only
+    db: Session = Depends(get_db)
+):
+    """Get a presigned URL to upload a screenshot directly to storage.
+    
+    After the PUT succeeds, call /upload-screenshot/{deposit_id} with payment_screenshot_key.
+    """
+    get_owned_deposit(db, deposit_id, current_user.id)
+    
+    storage = get_storage()
+    if not storage.supports_direct_upload:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Direct uploads are not available, upload the file to /deposit/upload-screenshot instead"
+        )
+    
+    key = new_screenshot_key(current_user.id, deposit_id, filename)
+    return storage.create_upload_url(key, content_type)
+
+@router.post("/upload-screenshot/{deposit_id}")
+async def upload_payment_screenshot(
+    deposit_id: int,
+    payment_screenshot_url: Optional[str] = Form(None),
+    payment_screenshot_key: Optional[str] = Form(None),
+    payment_screenshot: Optional[UploadFile] = File(None),
+    transaction_hash: Optional[str] = Form(None),
+    current_user: models.User = Depends(get_current_user),  # Keep as active only
+    db: Session = Depends(get_db)
+):
+    """Update deposit with screenshot (supports file upload, a directly uploaded storage key, or a URL)"""
+    # Verify deposit exists and belongs to user
+    get_owned_deposit(db, deposit_id, current_user.id)
+    # Return the connection while the file is stored; the update below takes one again
+    db.release()
+
+    # Validate that a file, key or URL is provided
+    if not payment_screenshot and not payment_screenshot_key and not payment_screenshot_url:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Please provide either a screenshot file or URL"
         )
     
-    screenshot_path = None
+    storage = get_storage()
+    screenshot_key = None
     
     # Handle file upload
     if payment_screenshot:
-        # Check file type
-        allowed_extensions = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
-        file_ext = os.path.splitext(payment_screenshot.filename)[1].lower()
-        if file_ext not in allowed_extensions:
+        screenshot_key = new_screenshot_key(current_user.id, deposit_id, payment_screenshot.filename)
+        storage.save(screenshot_key, payment_screenshot.file, payment_screenshot.content_type)
+    
+    # Handle file already uploaded to storage via /upload-url
+    elif payment_screenshot_key:
+        if not payment_screenshot_key.startswith(screenshot_key_prefix(current_user.id, deposit_id)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid screenshot key"
+            )
+        if not storage.exists(payment_screenshot_key):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File type not allowed. Allowed types: {', '.join(allowed_extensions)}"
+                detail="Screenshot has not been uploaded yet"
             )
-        
-        # Create upload directory if not exists
-        upload_dir = os.path.join(settings.UPLOAD_DIR, "deposits", str(current_user.id))
-        os.makedirs(upload_dir, exist_ok=True)
-        
-        # Save file
-        filename = f"deposit_{deposit_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{file_ext}"
-        file_path = os.path.join(upload_dir, filename)
-        
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(payment_screenshot.file, buffer)
-        
-        screenshot_path = f"/static/uploads/deposits/{current_user.id}/{filename}"
+        screenshot_key = payment_screenshot_key
     
     # Handle URL
     elif payment_screenshot_url:
@@ -103,19 +156,19 @@ async def upload_payment_screenshot(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid screenshot URL format"
             )
-        screenshot_path = payment_screenshot_url
+        screenshot_key = payment_screenshot_url
     
     # Update deposit with screenshot
     updated_deposit = deposit_crud.update_deposit_screenshot(
         db, 
         deposit_id, 
-        screenshot_path,
+        screenshot_key,
         transaction_hash
     )
     
     return {
         "message": "Screenshot uploaded successfully",
-        "deposit": updated_deposit
+        "deposit": schemas.deposit.DepositResponse.from_orm(updated_deposit)
     }
 
 @router.post("/upload-screenshot-local/{deposit_id}")
@@ -126,23 +179,35 @@ async def upload_payment_screenshot_local(
     current_user: models.User = Depends(get_current_user),  # Keep as active only
     db: Session = Depends(get_db)
 ):
-    """Upload payment screenshot locally (backup method)"""
-    # ... existing code (no change needed)
-    # (Keep the existing implementation)
+    """Upload payment screenshot as a file (backup method), stored with the configured storage backend"""
+    return await upload_payment_screenshot(
+        deposit_id,
+        payment_screenshot_url=None,
+        payment_screenshot_key=None,
+        payment_screenshot=file,
+        transaction_hash=transaction_hash,
+        current_user=current_user,
+        db=db
+    )
 
 @router.get("/my-deposits", response_model=List[schemas.deposit.DepositResponse])
 async def get_my_deposits(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: Optional[int] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: models.User = Depends(get_current_user_optional),  # FIXED: Allow inactive
     db: Session = Depends(get_db)
 ):
     """Get current user's deposit history - allowed for inactive users"""
-    deposits = deposit_crud.get_user_deposits(
-        db, current_user.id, skip=skip, limit=limit, status=status
+    page = deposit_crud.get_user_deposits(
+        db, current_user.id, skip=skip, limit=limit, status=status,
+        cursor=cursor, include_total=include_total
     )
-    return deposits
+    response.headers.update(page.headers())
+    return page.items
 
 @router.get("/summary")
 async def get_deposit_summary(
@@ -155,13 +220,19 @@ async def get_deposit_summary(
 
 @router.get("/deductions/my-deductions")
 async def get_my_deductions(
-    limit: int = 100,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: models.User = Depends(get_current_user_optional),  # FIXED: Allow inactive
     db: Session = Depends(get_db)
 ):
     """Get deduction history for current user - allowed for inactive users"""
-    deductions = deduction_crud.get_user_deductions(db, current_user.id, limit=limit)
-    return deductions
+    page = deduction_crud.get_user_deductions(
+        db, current_user.id, limit=limit, cursor=cursor, include_total=include_total
+    )
+    response.headers.update(page.headers())
+    return page.items
 
 @router.get("/deductions/deduction-summary")
 async def get_deduction_summary(
@@ -169,13 +240,17 @@ async def get_deduction_summary(
     db: Session = Depends(get_db)
 ):
     """Get deduction summary for current user - allowed for inactive users"""
-    total_deducted = deduction_crud.get_total_deductions(db, current_user.id)
-    deductions = deduction_crud.get_user_deductions(db, current_user.id, limit=999)
-    
+    return deduction_crud.get_user_deduction_summary(db, current_user.id)
+
+@router.get("/my-overview")
+async def get_my_overview(
+    current_user: models.User = Depends(get_current_user_optional),  # Allow inactive
+    db: Session = Depends(get_db)
+):
+    """Get deposit and deduction summaries for the user dashboard in one call - allowed for inactive users"""
     return {
-        "total_deducted": total_deducted,
-        "deduction_count": len(deductions),
-        "recent_deductions": deductions[:10]
+        "deposit_summary": deposit_crud.get_user_deposit_summary(db, current_user.id),
+        "deduction_summary": deduction_crud.get_user_deduction_summary(db, current_user.id)
     }
 
 @router.get("/payment-details")
@@ -192,11 +267,14 @@ async def get_payment_details(
     }
 
 # Admin endpoints (keep as is - require superadmin)
-@router.get("/admin/all", response_model=List[schemas.deposit.DepositWithUserResponse])
+@router.get("/admin/all", response_model=List[schemas.deposit.DepositAdminResponse])
 async def get_all_deposits(
+    request: Request,
     skip: int = 0,
-    limit: int = 100,
+    limit: Optional[int] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: models.User = Depends(get_current_user),  # Keep as active only
     db: Session = Depends(get_db)
 ):
@@ -207,34 +285,12 @@ async def get_all_deposits(
             detail="Not enough permissions"
         )
     
-    deposits = deposit_crud.get_all_deposits(db, skip=skip, limit=limit, status=status)
-    
-    # Format response with user details
-    response = []
-    for deposit in deposits:
-        deposit_dict = {
-            "id": deposit.id,
-            "user_id": deposit.user_id,
-            "amount": deposit.amount,
-            "status": deposit.status,
-            "usdt_address": deposit.usdt_address,
-            "transaction_hash": deposit.transaction_hash,
-            "payment_screenshot": deposit.payment_screenshot,
-            "notes": deposit.notes,
-            "admin_notes": deposit.admin_notes,
-            "created_at": deposit.created_at,
-            "updated_at": deposit.updated_at,
-            "confirmed_at": deposit.confirmed_at,
-            "user": {
-                "id": deposit.user.id,
-                "username": deposit.user.username,
-                "full_name": deposit.user.full_name,
-                "email": deposit.user.email
-            }
-        }
-        response.append(deposit_dict)
+    page = deposit_crud.get_all_deposits(
+        db, skip=skip, limit=limit, status=status, cursor=cursor, include_total=include_total
+    )
     
-    return response
+    # Deposits are serialized with their user details straight from the ORM rows
+    return fast_response(request, page.items, deposit_admin_list_adapter, headers=page.headers())
 
 @router.put("/admin/process/{deposit_id}")
 async def process_deposit(
@@ -259,6 +315,33 @@ async def process_deposit(
     
     return {"message": f"Deposit {update_data.status} successfully", "deposit": deposit}
 
+@router.put("/admin/bulk-process", response_model=schemas.BulkProcessResponse)
+async def bulk_process_deposits(
+    update_data: schemas.deposit.DepositBulkUpdate,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Process many deposits in one transaction (admin only)"""
+    if not current_user.is_superadmin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    if update_data.status not in deposit_crud.BULK_TRANSITIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Deposits cannot be bulk-processed to {update_data.status.value}"
+        )
+    
+    results = deposit_crud.process_deposits(db, update_data)
+    
+    return {
+        "status": update_data.status.value,
+        "processed": sum(result["outcome"] == "processed" for result in results),
+        "results": results
+    }
+
 # Admin stats endpoint
 @router.get("/admin/stats")
 async def get_deposit_stats(
@@ -272,63 +355,7 @@ async def get_deposit_stats(
             detail="Not enough permissions"
         )
     
-    # Total deposits
-    total_deposits = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(models.DepositTransaction.status == "COMPLETED")\
-        .scalar() or 0.0
-    
-    # Pending deposits amount
-    pending_amount = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(models.DepositTransaction.status == "PENDING")\
-        .scalar() or 0.0
-    
-    # Confirming deposits amount
-    confirming_amount = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(models.DepositTransaction.status == "CONFIRMING")\
-        .scalar() or 0.0
-    
-    # Count by status
-    status_counts = {}
-    for status in ["PENDING", "CONFIRMING", "COMPLETED", "FAILED", "EXPIRED"]:
-        count = db.query(models.DepositTransaction)\
-            .filter(models.DepositTransaction.status == status)\
-            .count()
-        status_counts[status] = count
-    
-    # Today's deposits
-    today = datetime.now().date()
-    today_deposits = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(
-            models.DepositTransaction.status == "COMPLETED",
-            func.date(models.DepositTransaction.confirmed_at) == today
-        ).scalar() or 0.0
-    
-    # This week's deposits
-    week_ago = datetime.now() - timedelta(days=7)
-    week_deposits = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(
-            models.DepositTransaction.status == "COMPLETED",
-            models.DepositTransaction.confirmed_at >= week_ago
-        ).scalar() or 0.0
-    
-    # This month's deposits
-    month_ago = datetime.now() - timedelta(days=30)
-    month_deposits = db.query(func.sum(models.DepositTransaction.amount))\
-        .filter(
-            models.DepositTransaction.status == "COMPLETED",
-            models.DepositTransaction.confirmed_at >= month_ago
-        ).scalar() or 0.0
-    
-    return {
-        "total_deposits": total_deposits,
-        "pending_amount": pending_amount,
-        "confirming_amount": confirming_amount,
-        "status_counts": status_counts,
-        "today_deposits": today_deposits,
-        "week_deposits": week_deposits,
-        "month_deposits": month_deposits,
-        "total_transactions": sum(status_counts.values())
-    }
+    return deposit_crud.get_deposit_stats(db)
 
 # ... rest of the admin endpoints (keep them as is with get_current_user)
 
@@ -382,8 +409,9 @@ async def get_deposit_details(
     
     return response
 
-@router.get("/admin/recent", response_model=List[schemas.deposit.DepositWithUserResponse])
+@router.get("/admin/recent", response_model=List[schemas.deposit.DepositAdminResponse])
 async def get_recent_deposits(
+    request: Request,
     limit: int = 10,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -401,38 +429,16 @@ async def get_recent_deposits(
         .limit(limit)\
         .all()
     
-    # Format response
-    response = []
-    for deposit in deposits:
-        deposit_dict = {
-            "id": deposit.id,
-            "user_id": deposit.user_id,
-            "amount": deposit.amount,
-            "status": deposit.status,
-            "usdt_address": deposit.usdt_address,
-            "transaction_hash": deposit.transaction_hash,
-            "payment_screenshot": deposit.payment_screenshot,
-            "notes": deposit.notes,
-            "admin_notes": deposit.admin_notes,
-            "created_at": deposit.created_at,
-            "updated_at": deposit.updated_at,
-            "confirmed_at": deposit.confirmed_at,
-            "user": {
-                "id": deposit.user.id,
-                "username": deposit.user.username,
-                "full_name": deposit.user.full_name,
-                "email": deposit.user.email
-            }
-        }
-        response.append(deposit_dict)
-    
-    return response
+    return fast_response(request, deposits, deposit_admin_list_adapter)
 
 @router.get("/admin/user/{user_id}", response_model=List[schemas.deposit.DepositResponse])
 async def get_user_deposits_admin(
     user_id: int,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -443,8 +449,11 @@ async def get_user_deposits_admin(
             detail="Not enough permissions"
         )
     
-    deposits = crud.deposit.get_user_deposits(db, user_id, skip=skip, limit=limit)
-    return deposits
+    page = deposit_crud.get_user_deposits(
+        db, user_id, skip=skip, limit=limit, cursor=cursor, include_total=include_total
+    )
+    response.headers.update(page.headers())
+    return page.items
 
 @router.post("/admin/manual-add")
 async def manual_add_deposit(
@@ -463,7 +472,7 @@ async def manual_add_deposit(
         )
     
     # Verify user exists
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = db.query(models.User.id).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -482,13 +491,14 @@ async def manual_add_deposit(
     )
     
     db.add(deposit)
+    db.flush()
     
     # Update user wallet
-    user.wallet_balance += amount
-    user.total_earned += amount
+    wallet_crud.credit(db, user_id, amount, LedgerEntryType.MANUAL_DEPOSIT, deposit.id, earned=True)
     
     db.commit()
     db.refresh(deposit)
+    deposit_crud.deposit_stats_cache.invalidate()
     
     return {
         "message": "Deposit added successfully",
@@ -503,13 +513,19 @@ async def manual_add_deposit(
 
 @router.get("/deductions/my-deductions")
 async def get_my_deductions(
-    limit: int = 100,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get deduction history for current user"""
-    deductions = deduction_crud.get_user_deductions(db, current_user.id, limit=limit)
-    return deductions
+    page = deduction_crud.get_user_deductions(
+        db, current_user.id, limit=limit, cursor=cursor, include_total=include_total
+    )
+    response.headers.update(page.headers())
+    return page.items
 
 @router.get("/deductions/deduction-summary")
 async def get_deduction_summary(
@@ -517,18 +533,15 @@ async def get_deduction_summary(
     db: Session = Depends(get_db)
 ):
     """Get deduction summary for current user"""
-    total_deducted = deduction_crud.get_total_deductions(db, current_user.id)
-    deductions = deduction_crud.get_user_deductions(db, current_user.id, limit=999)
-    
-    return {
-        "total_deducted": total_deducted,
-        "deduction_count": len(deductions),
-        "recent_deductions": deductions[:10]
-    }
+    return deduction_crud.get_user_deduction_summary(db, current_user.id)
 
 @router.get("/admin/deductions/{user_id}")
 async def get_user_deductions_admin(
     user_id: int,
+    response: Response,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -539,5 +552,8 @@ async def get_user_deductions_admin(
             detail="Not enough permissions"
         )
     
-    deductions = deduction_crud.get_user_deductions(db, user_id, limit=999)
-    return deductions
\ No newline at end of file
+    page = deduction_crud.get_user_deductions(
+        db, user_id, limit=limit, cursor=cursor, include_total=include_total
+    )
+    response.headers.update(page.headers())
+    return page.items
\ No newline at end of file
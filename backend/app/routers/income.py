@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import date
+from datetime import date, datetime, timedelta
 
 from .. import crud, schemas, models, utils
 from app.crud.income import get_user_incomes
+from ..crud import wallet as wallet_crud
 from ..schemas.income import IncomeResponse
 from ..database import get_db
 from fastapi.security import OAuth2PasswordBearer
@@ -37,6 +38,7 @@ async def get_current_user(
         raise credentials_exception
     
     user = crud.user.get_user_by_username(db, username=username)
+    db.release()
     if user is None:
         raise credentials_exception
     
@@ -50,24 +52,31 @@ async def get_current_user(
 
 @router.get("/my-income", response_model=List[IncomeResponse])
 def get_my_income(
+    response: Response,
     skip: int = 0,
-    limit: int = 0,
+    limit: Optional[int] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     income_type: Optional[str] = None,    
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Get current user's income records"""
-    return get_user_incomes(
+    page = get_user_incomes(
         db, 
         current_user.id, 
         skip=skip, 
         limit=limit,
         start_date=start_date,
         end_date=end_date,
-        income_type=income_type
+        income_type=income_type,
+        cursor=cursor,
+        include_total=include_total
     )
+    response.headers.update(page.headers())
+    return page.items
 
 @router.get("/summary")
 def get_income_summary(
@@ -86,4 +95,38 @@ def get_income_summary(
         "total_amount": total,
         "wallet_balance": current_user.wallet_balance,
         "total_withdrawn": current_user.total_withdrawn
-    }
\ No newline at end of file
+    }
+
+@router.get("/wallet")
+def get_wallet_as_of(
+    as_of: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Get current user's wallet totals from the ledger, now or as of a past moment"""
+    totals = wallet_crud.get_wallet(db, current_user.id, as_of=as_of)
+
+    return {
+        "as_of": as_of,
+        "wallet_balance": totals.balance,
+        "total_earned": totals.earned,
+        "total_withdrawn": totals.withdrawn
+    }
+
+@router.get("/daily")
+def get_daily_income(
+    days: int = Query(30, ge=1, le=366),
+    income_type: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Get current user's income per day for the last `days` days (for charts)"""
+    end_day = date.today()
+    start_day = end_day - timedelta(days=days - 1)
+    series = crud.income.get_daily_income(db, current_user.id, start_day, end_day, income_type=income_type)
+    
+    return {
+        "start_date": start_day,
+        "end_date": end_day,
+        "days": series
+    }
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Response, status, File, UploadFile, BackgroundTasks
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 import asyncio
+import os
 from datetime import datetime
+from io import BytesIO
 
 from .. import crud, schemas, models
 from ..schemas.upload import ExcelUploadResponse, ExcelUploadCreate
@@ -14,6 +16,7 @@ from ..models.user import User
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 from ..config import settings
 from ..utils.excel_processor import ExcelProcessor
+from ..utils.storage import get_private_storage
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
@@ -38,6 +41,7 @@ async def get_current_user(
         raise credentials_exception
     
     user = crud.user.get_user_by_username(db, username=username)
+    db.release()
     if user is None:
         raise credentials_exception
     
@@ -86,6 +90,18 @@ async def upload_excel(
         upload = crud.upload.create_upload(db, upload_data)
         print(f"Created upload record ID: {upload.id}")
         
+        # Keep the file, privately, so the upload can be replayed under the profiler later
+        try:
+            upload.file_path = get_private_storage().save(
+                f"excel_uploads/{upload.id}/{os.path.basename(file.filename)}",
+                BytesIO(contents),
+                content_type=file.content_type
+            )
+            db.commit()
+        except Exception as e:
+            print(f"Could not store upload file: {str(e)}")
+            db.rollback()
+        
         # Process file IMMEDIATELY (synchronous, waits for completion)
         print("Starting Excel processing...")
         result = ExcelProcessor.process_excel_sync(
@@ -113,8 +129,11 @@ async def upload_excel(
 
 @router.get("/excel", response_model=List[ExcelUploadResponse])
 def get_excel_uploads(
+    response: Response,
     skip: int = 0,
-    limit: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -125,7 +144,9 @@ def get_excel_uploads(
             detail="Not enough permissions"
         )
     
-    return crud.upload.get_uploads(db, skip=skip, limit=limit)
+    page = crud.upload.get_uploads(db, skip=skip, limit=limit, cursor=cursor, include_total=include_total)
+    response.headers.update(page.headers())
+    return page.items
 
 
 @router.get("/excel/{upload_id}", response_model=ExcelUploadResponse)
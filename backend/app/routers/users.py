@@ -1,5 +1,6 @@
 # routers/users.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 from typing import List, Optional
@@ -7,23 +8,30 @@ from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 
 # Import directly
-from ..schemas.user import UserResponse, UserUpdate, UserPasswordUpdate
+from ..schemas.user import UserResponse, UserListItem, UserUpdate, UserPasswordUpdate, UserBulkActivate
 from ..models.user import User
 from .. import crud
 from ..database import get_db
 from ..config import settings
 from ..middleware.auth import get_current_user_optional, get_current_user  # Import both
+from ..utils.responses import fast_response
+from ..utils.pagination import paginate
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+# Built once at import so list endpoints serialize in a single pydantic-core pass
+user_list_adapter = TypeAdapter(List[UserListItem])
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # ==================== SEARCH ENDPOINT MUST BE FIRST ====================
 @router.get("/search")
 async def search_users(
+    response: Response,
     q: str = "",
     skip: int = 0,
-    limit: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # Keep as active for search (admin function)
 ):
@@ -56,9 +64,12 @@ async def search_users(
     query_filters.append(User.email.ilike(f"%{q}%"))
     
     # Apply OR condition to all filters
-    users = db.query(User).filter(
-        or_(*query_filters)
-    ).offset(skip).limit(limit).all()
+    page = paginate(
+        db, db.query(User).filter(or_(*query_filters)), User.created_at, User.id,
+        cursor=cursor, limit=limit, skip=skip, descending=False
+    )
+    response.headers.update(page.headers())
+    users = page.items
     
     # Return user data with full_name and vantage_username
     results = []
@@ -87,9 +98,12 @@ async def search_users(
 # ==================== OTHER ROUTES COME AFTER ====================
 @router.get("/", response_model=List[UserResponse])
 def get_users(
+    request: Request,
     skip: int = 0,
-    limit: int = 0,
+    limit: Optional[int] = None,
     is_active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)  # Keep as active (admin only)
 ):
@@ -100,7 +114,10 @@ def get_users(
             detail="Not enough permissions"
         )
     
-    return crud.user.get_users(db, skip=skip, limit=limit, is_active=is_active)
+    page = crud.user.get_users(
+        db, skip=skip, limit=limit, is_active=is_active, cursor=cursor, include_total=include_total
+    )
+    return fast_response(request, page.items, user_list_adapter, headers=page.headers())
 
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(
@@ -125,6 +142,41 @@ def get_user(
     
     return user
 
+# Must come before /{user_id}, which would otherwise match "bulk-activate"
+@router.put("/bulk-activate")
+def bulk_activate_users(
+    bulk_data: UserBulkActivate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)  # Keep as active (admin only)
+):
+    """Activate or deactivate many users at once, by id or by filter (superadmin only)"""
+    if not current_user.is_superadmin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    changed = crud.user.set_users_active(
+        db,
+        bulk_data.is_active,
+        ids=bulk_data.ids,
+        parent_id=bulk_data.parent_id,
+        country=bulk_data.country,
+        created_from=bulk_data.created_from,
+        created_to=bulk_data.created_to
+    )
+    
+    result = {
+        "message": f"{len(changed)} users {'activated' if bulk_data.is_active else 'deactivated'}",
+        "updated": len(changed),
+        "ids": changed
+    }
+    if bulk_data.ids is not None:
+        # Already in the requested state, superadmins not deactivated, or no such user
+        changed_ids = set(changed)
+        result["unchanged"] = [user_id for user_id in dict.fromkeys(bulk_data.ids) if user_id not in changed_ids]
+    return result
+
 @router.put("/{user_id}", response_model=UserResponse)
 def update_user(
     user_id: int,
@@ -1,21 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, Query
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
 from .. import crud, schemas, models, utils
-from ..schemas.withdrawal import WithdrawalResponse, WithdrawalCreate, WithdrawalUpdate
+from ..schemas.withdrawal import WithdrawalResponse, WithdrawalCreate, WithdrawalUpdate, WithdrawalBulkUpdate
+from ..schemas.bulk import BulkProcessResponse
 from ..database import get_db
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
+from ..crud import wallet as wallet_crud
 from ..crud.withdrawal import create_withdrawal
+from ..utils.responses import fast_response
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 from ..config import settings
 from ..models.user import User
+from ..models.wallet_ledger import LedgerEntryType
 
 router = APIRouter(prefix="/withdrawal", tags=["withdrawal"])
 
+# Built once at import so list endpoints serialize in a single pydantic-core pass
+withdrawal_list_adapter = TypeAdapter(List[WithdrawalResponse])
+
 
 # Authentication function
 async def get_current_user(
@@ -37,6 +45,7 @@ async def get_current_user(
         raise credentials_exception
     
     user = crud.user.get_user_by_username(db, username=username)
+    db.release()
     if user is None:
         raise credentials_exception
     
@@ -62,13 +71,6 @@ def create_withdrawal_request(
             detail=f"Minimum withdrawal amount is ${settings.MIN_WITHDRAWAL_AMOUNT}"
         )
     
-    # Check if user has sufficient balance
-    if current_user.wallet_balance < withdrawal_data.amount:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Insufficient balance"
-        )
-    
     # Check if user has withdrawal address
     if not current_user.withdrawal_address:
         raise HTTPException(
@@ -76,31 +78,51 @@ def create_withdrawal_request(
             detail="Please set your withdrawal address first"
         )
     
-    # Create withdrawal request
-    withdrawal = create_withdrawal(db, withdrawal_data, current_user.id)
+    # Create withdrawal request, committed below together with the hold
+    withdrawal = create_withdrawal(db, withdrawal_data, current_user.id, commit=False)
     
-    # Deduct from wallet (will be added back if rejected)
-    current_user.wallet_balance -= withdrawal_data.amount
-    db.commit()
+    # Hold the amount (added back if rejected). The balance check and the
+    # deduction are one statement, so concurrent requests cannot overdraw.
+    if wallet_crud.debit(
+        db, current_user.id, withdrawal_data.amount, LedgerEntryType.WITHDRAWAL_HOLD, withdrawal.id
+    ) is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Insufficient balance"
+        )
     
+    db.commit()
+    db.refresh(withdrawal)
     return withdrawal
 
 @router.get("/my-requests", response_model=List[WithdrawalResponse])
 def get_my_withdrawal_requests(
+    response: Response,
     skip: int = 0,
-    limit: int = 0,
+    limit: Optional[int] = None,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Get current user's withdrawal requests"""
-    return crud.withdrawal.get_user_withdrawals(db, current_user.id, skip=skip, limit=limit, status=status)
+    page = crud.withdrawal.get_user_withdrawals(
+        db, current_user.id, skip=skip, limit=limit, status=status,
+        cursor=cursor, include_total=include_total
+    )
+    response.headers.update(page.headers())
+    return page.items
 
 @router.get("/all", response_model=List[WithdrawalResponse])
 def get_all_withdrawal_requests(
+    request: Request,
     skip: int = 0,
-    limit: int = 0,
+    limit: Optional[int] = None,
     withdrawal_status: Optional[str] = None,   
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -111,7 +133,38 @@ def get_all_withdrawal_requests(
             detail="Not enough permissions"
         )
     
-    return crud.withdrawal.get_all_withdrawals(db, skip=skip, limit=limit, status=withdrawal_status)
+    page = crud.withdrawal.get_all_withdrawals(
+        db, skip=skip, limit=limit, status=withdrawal_status,
+        cursor=cursor, include_total=include_total
+    )
+    return fast_response(request, page.items, withdrawal_list_adapter, headers=page.headers())
+
+@router.put("/bulk-process", response_model=BulkProcessResponse)
+def bulk_process_withdrawal_requests(
+    update_data: WithdrawalBulkUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Approve, reject or complete many withdrawal requests in one transaction (admin only)"""
+    if not current_user.is_superadmin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    
+    if update_data.status not in crud.withdrawal.BULK_TRANSITIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Withdrawal requests cannot be bulk-processed to {update_data.status.value}"
+        )
+    
+    results = crud.withdrawal.process_withdrawals(db, update_data, current_user.id)
+    
+    return {
+        "status": update_data.status.value,
+        "processed": sum(result["outcome"] == "processed" for result in results),
+        "results": results
+    }
 
 @router.put("/{request_id}/process")
 def process_withdrawal_request(
@@ -127,17 +180,23 @@ def process_withdrawal_request(
             detail="Not enough permissions"
         )
     
-    withdrawal = crud.withdrawal.process_withdrawal(
+    withdrawal, outcome = crud.withdrawal.process_withdrawal(
         db, 
         request_id, 
         update_data, 
         current_user.id
     )
     
-    if not withdrawal:
+    if outcome["outcome"] == "not_found":
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Withdrawal request not found"
         )
+    if not withdrawal:
+        # Already processed (possibly by a concurrent request), or the move is not allowed
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Withdrawal request cannot be moved to {update_data.status.value}: {outcome['detail']}"
+        )
     
     return {"message": "Withdrawal request processed", "withdrawal": withdrawal}
\ No newline at end of file
@@ -1,15 +1,17 @@
-from .user import UserBase, UserCreate, UserUpdate, UserResponse, UserLogin
+from .user import UserBase, UserCreate, UserUpdate, UserResponse, UserLogin, UserBulkActivate
 from .income import IncomeBase, IncomeCreate, IncomeResponse
-from .withdrawal import WithdrawalBase, WithdrawalCreate, WithdrawalUpdate, WithdrawalResponse
+from .withdrawal import WithdrawalBase, WithdrawalCreate, WithdrawalUpdate, WithdrawalBulkUpdate, WithdrawalResponse
 from .upload import ExcelUploadBase, ExcelUploadCreate, ExcelUploadResponse
 from .contact import ContactBase, ContactCreate, ContactResponse
-from .deposit import DepositBase, DepositCreate, DepositUpdate, DepositScreenshotUpload, DepositResponse, DepositWithUserResponse
+from .deposit import DepositBase, DepositCreate, DepositUpdate, DepositBulkUpdate, DepositScreenshotUpload, DepositResponse, DepositWithUserResponse
+from .bulk import BulkProcessBase, BulkOutcome, BulkProcessResponse
 
 __all__ = [
-    "UserBase", "UserCreate", "UserUpdate", "UserResponse", "UserLogin",
+    "UserBase", "UserCreate", "UserUpdate", "UserResponse", "UserLogin", "UserBulkActivate",
     "IncomeBase", "IncomeCreate", "IncomeResponse",
-    "WithdrawalBase", "WithdrawalCreate", "WithdrawalUpdate", "WithdrawalResponse",
+    "WithdrawalBase", "WithdrawalCreate", "WithdrawalUpdate", "WithdrawalBulkUpdate", "WithdrawalResponse",
     "ExcelUploadBase", "ExcelUploadCreate", "ExcelUploadResponse",
     "ContactBase","ContactCreate","ContactResponse"
-    "DepositBase","DepositCreate", "DepositUpdate","DepositScreenshotUpload", "DepositResponse", "DepositWithUserResponse",
+    "DepositBase","DepositCreate", "DepositUpdate", "DepositBulkUpdate", "DepositScreenshotUpload", "DepositResponse", "DepositWithUserResponse",
+    "BulkProcessBase", "BulkOutcome", "BulkProcessResponse",
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from ..config import settings
+
+class BulkProcessBase(BaseModel):
+    """Ids to move to one status; subclasses add the status field"""
+    ids: List[int] = Field(..., min_length=1, max_length=settings.MAX_BULK_IDS)
+    admin_notes: Optional[str] = None  # Applied to every processed row; existing notes are kept if omitted
+
+class BulkOutcome(BaseModel):
+    id: int
+    outcome: str  # processed, skipped or not_found
+    detail: Optional[str] = None
+
+class BulkProcessResponse(BaseModel):
+    status: str
+    processed: int
+    results: List[BulkOutcome]
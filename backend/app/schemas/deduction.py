@@ -1,9 +1,10 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from ..money import MoneyAmount
 
 class DeductionBase(BaseModel):
-    amount: float
+    amount: MoneyAmount
     deduction_type: str
     description: Optional[str] = None
     related_deposit_id: Optional[int] = None
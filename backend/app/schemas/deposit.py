@@ -1,11 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, validator
 from typing import Optional
 from datetime import datetime
+from ..money import MoneyAmount
 from ..models.deposit import DepositStatus
+from ..utils.storage import resolve_file_url
+from .bulk import BulkProcessBase
 
 # Base schema
 class DepositBase(BaseModel):
-    amount: float
+    amount: MoneyAmount
     usdt_address: str
 
 # Create deposit request
@@ -18,6 +21,10 @@ class DepositUpdate(BaseModel):
     transaction_hash: Optional[str] = None
     admin_notes: Optional[str] = None
 
+# Process many deposits at once (for admin)
+class DepositBulkUpdate(BulkProcessBase):
+    status: DepositStatus
+
 # Upload screenshot
 class DepositScreenshotUpload(BaseModel):
     transaction_id: int
@@ -37,6 +44,11 @@ class DepositResponse(DepositBase):
     updated_at: Optional[datetime] = None
     confirmed_at: Optional[datetime] = None
     
+    # payment_screenshot is stored as a storage key; return a URL the browser can load
+    @validator('payment_screenshot')
+    def screenshot_url(cls, v):
+        return resolve_file_url(v)
+    
     class Config:
         from_attributes = True
 
@@ -45,4 +57,21 @@ class DepositWithUserResponse(DepositResponse):
     user: dict  # Will contain user details
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Minimal user details shown in admin deposit lists
+class DepositUserBrief(BaseModel):
+    id: int
+    username: str
+    full_name: str
+    email: str
+    
+    class Config:
+        from_attributes = True
+
+# Deposit with user details, built straight from the ORM row (for admin lists)
+class DepositAdminResponse(DepositResponse):
+    user: DepositUserBrief
+    
+    class Config:
+        from_attributes = True
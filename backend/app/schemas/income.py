@@ -1,16 +1,17 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from ..money import MoneyAmount
 from ..models.income import IncomeType
 
 class IncomeBase(BaseModel):
-    amount: float
+    amount: MoneyAmount
     percentage: float
     level: int
     income_type: IncomeType
     description: Optional[str] = None
     source_vantage_username: str
-    source_income_amount: float
+    source_income_amount: MoneyAmount
 
 class IncomeCreate(IncomeBase):
     user_id: int
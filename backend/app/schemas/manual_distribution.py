@@ -2,11 +2,12 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from ..money import MoneyAmount
 
 
 class ManualDistributionBase(BaseModel):
     vantage_username: str
-    amount: float
+    amount: MoneyAmount
     income_type: str  # DAILY, WEEKLY, MONTHLY
 
 
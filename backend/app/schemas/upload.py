@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from ..money import MoneyAmount
 
 
 class ExcelUploadBase(BaseModel):
@@ -20,7 +21,7 @@ class ExcelUploadResponse(ExcelUploadBase):
     total_rows: int
     processed_rows: int
     error_rows: int
-    total_distributed: float
+    total_distributed: MoneyAmount
     uploaded_at: datetime
     processed_at: Optional[datetime] = None
     
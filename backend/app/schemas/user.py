@@ -1,6 +1,8 @@
-from pydantic import BaseModel, EmailStr, validator, Field
+from pydantic import BaseModel, EmailStr, validator, model_validator, Field
 from typing import Optional, List
 from datetime import datetime
+from ..config import settings
+from ..money import MoneyAmount
 
 # Solution: Keep username in UserBase but make it Optional
 class UserBase(BaseModel):
@@ -48,9 +50,9 @@ class UserResponse(UserBase):
     is_active: bool
     is_admin: bool
     is_superadmin: bool
-    wallet_balance: float
-    total_earned: float
-    total_withdrawn: float
+    wallet_balance: MoneyAmount
+    total_earned: MoneyAmount
+    total_withdrawn: MoneyAmount
     referral_code: str
     withdrawal_address: Optional[str] = None
     withdrawal_qr_code: Optional[str] = None
@@ -63,6 +65,15 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserListItem(UserResponse):
+    """UserResponse as serialized by fast_response for user lists.
+
+    Stored emails were validated on the way in, and re-running EmailStr on every
+    row dominated list serialization. Endpoints still declare UserResponse, so
+    the public schema keeps EmailStr.
+    """
+    email: str
+
 class TokenData(Token):
     user: UserResponse
 
@@ -70,4 +81,20 @@ class UserWithChildren(UserResponse):
     children: List[UserResponse] = []
 
 class UserPasswordUpdate(BaseModel):
-    new_password: str
\ No newline at end of file
+    new_password: str
+
+class UserBulkActivate(BaseModel):
+    """Users to activate (or deactivate): a list of ids, or every user matching the filters"""
+    ids: Optional[List[int]] = Field(None, min_length=1, max_length=settings.MAX_BULK_IDS)
+    parent_id: Optional[int] = None  # Direct referrals of this user, e.g. a partner's team
+    country: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def ids_or_filter(self):
+        filters = (self.parent_id, self.country, self.created_from, self.created_to)
+        if self.ids is None and all(value is None for value in filters):
+            raise ValueError("Give ids or at least one filter")
+        return self
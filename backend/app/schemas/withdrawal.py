@@ -1,11 +1,13 @@
 from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
+from ..money import MoneyAmount
 from ..models.withdrawal import WithdrawalStatus
 from .user import UserResponse
+from .bulk import BulkProcessBase
 
 class WithdrawalBase(BaseModel):
-    amount: float
+    amount: MoneyAmount
 
 class WithdrawalCreate(WithdrawalBase):
     pass
@@ -14,6 +16,9 @@ class WithdrawalUpdate(BaseModel):
     status: WithdrawalStatus
     admin_notes: Optional[str] = None
 
+class WithdrawalBulkUpdate(BulkProcessBase):
+    status: WithdrawalStatus
+
 class WithdrawalResponse(WithdrawalBase):
     id: int
     user_id: int
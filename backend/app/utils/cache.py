@@ -0,0 +1,56 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class TTLCache:
+    """Small in-process cache whose entries expire after `ttl` seconds.
+
+    Each worker process has its own copy, so invalidation only affects the
+    current process; keep the TTL short so other workers catch up quickly.
+    A ttl of 0 disables caching.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._data: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        # Bumped by every invalidate(), so values computed before one are not stored after it
+        self._generation = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """Store `value`, unless the cache has been invalidated since `generation` was read"""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def get_or_set(self, key: str, compute: Callable[[], Any]) -> Any:
+        value = self.get(key)
+        if value is None:
+            generation = self._generation
+            value = compute()
+            # An invalidate() during compute() wins: the value is returned but not cached
+            self.set(key, value, generation)
+        return value
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one key, or everything when no key is given"""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
@@ -3,8 +3,12 @@ from io import BytesIO
 from datetime import datetime
 from sqlalchemy.orm import Session
 from typing import Dict
+import time
 import traceback
 
+from .metrics import observe_upload
+from ..money import from_micros, micros_array, to_micros
+
 class ExcelProcessor:
     
     @staticmethod
@@ -16,6 +20,7 @@ class ExcelProcessor:
     ) -> Dict:
         """Process Excel file synchronously"""
         print(f"=== STARTING EXCEL PROCESSING ===")
+        started = time.perf_counter()
         
         results = {
             "total_rows": 0,
@@ -45,13 +50,21 @@ class ExcelProcessor:
             if missing_columns:
                 raise ValueError(f"Missing required columns: {missing_columns}")
             
+            # Convert the whole amount column to micro-units at once; cells that
+            # are not numbers stay NaN and fail on their own row below
+            amounts = pd.to_numeric(df['amount'], errors='coerce')
+            amount_micros = micros_array(amounts.fillna(0))
+            total_micros = 0
+            
             # Process each row for income distribution
             for index, row in df.iterrows():
                 row_number = index + 2  # Excel row number (1 for header + 1 for 0-index)
                 try:
                     # Get data from Excel row
                     vantage_username = str(row['vantage_username']).strip()
-                    amount = float(row['amount'])
+                    if pd.isna(amounts[index]):
+                        raise ValueError(f"could not convert amount {row['amount']!r} to a number")
+                    amount = from_micros(amount_micros[index])
                     income_type = str(row.get('income_type', 'DAILY')).strip()  
                     
                     print(f"Processing row {row_number}: {vantage_username}, {amount}, {income_type.upper()}")
@@ -81,7 +94,8 @@ class ExcelProcessor:
                         print(f"  -> ERROR: {error_msg}")
                     else:
                         results["processed_rows"] += 1
-                        results["total_distributed"] += distribution_result.get("distributed", 0)
+                        total_micros += to_micros(distribution_result.get("distributed", 0))
+                        results["total_distributed"] = from_micros(total_micros)
                         
                         print(f"  -> SUCCESS: Distributed {distribution_result.get('distributed', 0)} to {distribution_result.get('users_affected', 0)} users")
                     
@@ -138,6 +152,7 @@ class ExcelProcessor:
                 traceback.print_exc()
                 results["errors"].append(f"Database update error: {str(e)}")
             
+            observe_upload(results["processed_rows"], results["error_rows"], time.perf_counter() - started)
             return results
             
         except Exception as e:
@@ -161,4 +176,5 @@ class ExcelProcessor:
             except Exception as inner_e:
                 print(f"Failed to update error status: {str(inner_e)}")
             
+            observe_upload(results["processed_rows"], results["error_rows"], time.perf_counter() - started)
             return results
\ No newline at end of file
@@ -0,0 +1,80 @@
+import csv
+import enum
+import io
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Sequence
+
+# Rows buffered before a CSV chunk is sent to the client
+CSV_CHUNK_ROWS = 500
+# Bytes read per chunk when sending a finished XLSX file
+XLSX_CHUNK_SIZE = 64 * 1024
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel has no timezone support; write UTC wall-clock time
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def stream_csv(header: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """Encode rows as CSV, yielding a chunk every CSV_CHUNK_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    yield _drain(buffer)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_csv_value(value) for value in row])
+        if count % CSV_CHUNK_ROWS == 0:
+            yield _drain(buffer)
+
+    yield _drain(buffer)
+
+
+def stream_xlsx(header: Sequence[str], rows: Iterable[Sequence[Any]], title: str = "Report") -> Iterator[bytes]:
+    """Write rows to a write-only workbook and yield the finished file in chunks.
+
+    Write-only worksheets spool rows to disk, so memory stays flat however many
+    rows there are. An XLSX file is a zip archive that can only be sent once it
+    is complete, so the first byte arrives after the last row has been read.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title)
+    sheet.append(list(header))
+    for row in rows:
+        sheet.append([_xlsx_value(value) for value in row])
+
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            chunk = output.read(XLSX_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
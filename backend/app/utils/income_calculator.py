@@ -2,6 +2,10 @@ from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from .. import models, crud
 from ..config import settings
+from ..crud.wallet import WalletDelta, adjust_wallets
+from ..money import from_micros, percent_of, to_micros
+from ..models.wallet_ledger import LedgerEntryType
+from .metrics import observe_distribution
 
 class IncomeCalculator:
     @staticmethod
@@ -42,9 +46,14 @@ class IncomeCalculator:
         # Get the fixed percentage from settings
         fixed_percentage = getattr(settings, 'FIXED_INCOME_PERCENTAGE', 0.02)  # Default 2%
         
+        # Payouts are computed in integer micro-units, so they sum exactly
+        amount_micros = to_micros(amount)
+        distributed_micros = 0
+        
         # Start from the direct referrer (skip the target user who earned)
         current_user = target_user.parent
         level = 1
+        credits = []
         
         while current_user and level <= 5:
             # Check if user qualifies for this level income
@@ -67,7 +76,8 @@ class IncomeCalculator:
             
             if percentage > 0:
                 # Calculate income amount
-                income_amount = amount * percentage
+                income_micros = percent_of(amount_micros, percentage)
+                income_amount = from_micros(income_micros)
                 
                 # Create income record (without excel_upload_id)
                 income_data = {
@@ -81,18 +91,26 @@ class IncomeCalculator:
                     # Removed: "excel_upload_id": excel_upload_id
                 }
                 
-                income = crud.income.create_income(db, income_data)
-                
-                # Update user wallet
-                current_user.wallet_balance += income_amount
-                current_user.total_earned += income_amount
-                db.commit()
+                income = crud.income.create_income(db, income_data, commit=False)
+                credits.append((income, level, income_amount))
                 
-                results["distributed"] += income_amount
+                distributed_micros += income_micros
                 results["users_affected"] += 1
             
             # Move to parent
             current_user = current_user.parent
             level += 1
         
+        # Credit every upline wallet in one statement, committed with the income
+        # rows; the flush assigns the income ids their ledger entries refer to
+        db.flush()
+        adjust_wallets(db, [
+            (income.user_id, WalletDelta(income_amount, income_amount, reference_id=income.id))
+            for income, _, income_amount in credits
+        ], LedgerEntryType.INCOME)
+        db.commit()
+        for _, level, income_amount in credits:
+            observe_distribution(level, income_amount)
+        results["distributed"] = from_micros(distributed_micros)
+        
         return results
\ No newline at end of file
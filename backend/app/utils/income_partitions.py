@@ -0,0 +1,212 @@
+"""Monthly range partitions of the incomes table (PostgreSQL only).
+
+The table is converted once by app.migrations.partition_incomes. After that,
+ensure_partitions() keeps partitions ready for the coming months (run at
+startup and by `python -m app.migrations.partition_incomes ensure` from cron)
+and archive_partitions() detaches old months and exports them to Parquet.
+"""
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "incomes"
+DEFAULT_PARTITION = "incomes_default"
+
+# Rows read per batch when exporting a partition
+EXPORT_BATCH_SIZE = 50000
+
+# Advisory lock held while partitions are created, so processes never race on the DDL
+PARTITION_LOCK_KEY = 5170421
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """First day of the month `offset` months after the month containing `day`"""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT_TABLE}_p{month:%Y_%m}"
+
+
+def _bound(month: date) -> str:
+    # Bounds are pinned to UTC so they do not depend on the session time zone
+    return f"{month:%Y-%m-%d} 00:00:00+00"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return bool(conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+    ), {"table": PARENT_TABLE}).scalar())
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """Monthly partitions as (name, first day of month), oldest first; the default partition is left out"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": PARENT_TABLE}).scalars().all()
+
+    prefix = f"{PARENT_TABLE}_p"
+    partitions = []
+    for name in names:
+        if name.startswith(prefix):
+            year, month = name[len(prefix):].split("_")
+            partitions.append((name, date(int(year), int(month), 1)))
+    return sorted(partitions, key=lambda partition: partition[1])
+
+
+def create_partition(conn: Connection, month: date) -> bool:
+    """Create the partition for `month` if it is missing. Returns True if it was created.
+
+    Rows for that month that already landed in the default partition are moved
+    into the new partition before it is attached.
+    """
+    name = partition_name(month)
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+        return False
+
+    start, end = _bound(month), _bound(month_start(month, 1))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS)"))
+    if conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar():
+        conn.execute(text(
+            f"WITH moved AS ("
+            f"DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :start AND created_at < :end RETURNING *"
+            f") INSERT INTO {name} SELECT * FROM moved"
+        ), {"start": start, "end": end})
+    conn.execute(text(
+        f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    ))
+    logger.info(f"Created income partition {name}")
+    return True
+
+
+def ensure_partitions(conn: Connection, months_ahead: int = settings.INCOME_PARTITION_MONTHS_AHEAD) -> List[str]:
+    """Make sure partitions exist from the current month through `months_ahead` months ahead.
+
+    Does nothing if incomes is not partitioned. Returns the names of the partitions created.
+    """
+    if not is_partitioned(conn):
+        return []
+
+    this_month = month_start(datetime.now(timezone.utc).date())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = month_start(this_month, offset)
+        if create_partition(conn, month):
+            created.append(partition_name(month))
+    return created
+
+
+def ensure_partitions_locked(engine: Engine, wait: bool = True) -> Optional[List[str]]:
+    """ensure_partitions() in its own transaction, under an advisory lock.
+
+    With wait=False, returns None at once if another process holds the lock
+    (it is creating the same partitions), so workers starting together do not
+    queue up behind each other.
+    """
+    with engine.begin() as conn:
+        if not is_partitioned(conn):
+            return []
+        if wait:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+        elif not conn.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY}).scalar():
+            return None
+        return ensure_partitions(conn)
+
+
+def export_partition(conn: Connection, name: str, archive_dir: str) -> Tuple[Optional[str], int]:
+    """Write a partition's rows to a zstd-compressed Parquet file in batches.
+
+    Returns the file path (None for an empty partition) and the number of rows written.
+    """
+    try:
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Archiving incomes requires the pyarrow package (pip install pyarrow)")
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.parquet")
+    tmp_path = f"{path}.tmp"
+
+    writer = None
+    row_count = 0
+    result = conn.execute(text(f"SELECT * FROM {name} ORDER BY id").execution_options(stream_results=True))
+    try:
+        while True:
+            rows = result.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            frame = pd.DataFrame(rows, columns=list(result.keys()))
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+            writer.write_table(table)
+            row_count += len(rows)
+    except Exception:
+        if writer is not None:
+            writer.close()
+            os.remove(tmp_path)
+        raise
+    finally:
+        result.close()
+
+    if writer is None:
+        return None, 0
+    writer.close()
+    os.replace(tmp_path, path)
+    return path, row_count
+
+
+def archive_partitions(
+    conn: Connection,
+    older_than_months: int,
+    archive_dir: str = settings.INCOME_ARCHIVE_DIR,
+    drop: bool = True
+) -> List[Tuple[str, Optional[str]]]:
+    """Export monthly partitions that ended more than `older_than_months` months ago, then detach them.
+
+    The export reads the partition while it is still attached, so incomes stays
+    available. Detaching (and dropping, unless `drop` is False) then happens in a
+    short transaction that is rolled back if rows arrived after the export.
+    Returns (partition, parquet path) pairs; the path is None for empty partitions.
+    Daily rollups are kept, so period summaries still include archived months.
+    """
+    cutoff = month_start(datetime.now(timezone.utc).date(), -older_than_months)
+    partitions = list_partitions(conn)
+    conn.commit()
+
+    archived = []
+    for name, month in partitions:
+        if month_start(month, 1) > cutoff:
+            continue
+        with conn.begin():
+            path, row_count = export_partition(conn, name, archive_dir)
+        with conn.begin():
+            conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}"))
+            current_count = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+            if current_count != row_count:
+                raise RuntimeError(
+                    f"{name} changed during export ({row_count} rows exported, {current_count} now); run the archive again"
+                )
+            if drop:
+                conn.execute(text(f"DROP TABLE {name}"))
+        logger.info(f"Archived income partition {name} to {path or '(empty)'}")
+        archived.append((name, path))
+    return archived
@@ -0,0 +1,174 @@
+"""Prometheus metrics served at /metrics.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty
+directory shared by the workers (and wiped on deploy); each worker then writes
+its samples there and /metrics aggregates them. Gauges declare how they are
+combined across workers with multiprocess_mode.
+"""
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Seconds between event-loop lag probes
+EVENT_LOOP_PROBE_INTERVAL = 0.5
+
+_suppressed: ContextVar[bool] = ContextVar("metrics_suppressed", default=False)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template and status",
+    ["method", "route", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template and status",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+    multiprocess_mode="livesum"
+)
+REQUESTS_SHED = Counter(
+    "http_requests_shed_total", "Requests answered 503 by load shedding, by route class and reason",
+    ["route_class", "reason"]
+)
+REQUESTS_QUEUED = Gauge(
+    "http_requests_queued", "Requests waiting for a slot in their route class",
+    ["route_class"], multiprocess_mode="livesum"
+)
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Configured connection pool size", multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections checked out of the pool", multiprocess_mode="livesum")
+DB_POOL_CHECKED_IN = Gauge("db_pool_checked_in", "Idle connections in the pool", multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections open beyond the pool size", multiprocess_mode="livesum")
+# Per route: histogram_quantile(0.95, sum by (route, le) (rate(db_connection_hold_seconds_bucket[5m])))
+DB_CONNECTION_HOLD = Histogram(
+    "db_connection_hold_seconds", "Time a request kept pooled DB connections checked out, by route template",
+    ["method", "route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+UPLOAD_ROWS = Counter("upload_rows_total", "Excel upload rows by result", ["result"])
+UPLOAD_DURATION = Histogram(
+    "upload_processing_seconds", "Time to process one Excel upload",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800)
+)
+UPLOAD_ROWS_PER_SECOND = Gauge(
+    "upload_rows_per_second", "Throughput of the most recent Excel upload",
+    multiprocess_mode="mostrecent"
+)
+
+DISTRIBUTED_AMOUNT = Counter("income_distributed_amount_total", "Income distributed, by referral level", ["level"])
+DISTRIBUTIONS = Counter("income_distributions_total", "Income records created, by referral level", ["level"])
+
+EMAIL_OUTBOX = Gauge("email_outbox_depth", "Emails queued but not yet sent", multiprocess_mode="livesum")
+EMAILS_SENT = Counter("emails_sent_total", "Emails handed to the mail provider, by result", ["result"])
+
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer scheduled every probe interval",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+def render_metrics() -> bytes:
+    """Current metrics in the Prometheus text format, merged across workers in multiprocess mode"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a dead worker's live gauges (call from the process manager's child-exit hook)"""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
+
+
+def observe_request(method: str, route: str, status: int, duration: float) -> None:
+    labels = (method, route, str(status))
+    REQUESTS.labels(*labels).inc()
+    REQUEST_LATENCY.labels(*labels).observe(duration)
+
+
+def observe_connection_hold(method: str, route: str, duration: float) -> None:
+    DB_CONNECTION_HOLD.labels(method, route).observe(duration)
+
+
+@contextmanager
+def suppressed() -> Iterator[None]:
+    """Leave the upload and distribution metrics untouched by work done inside the block (e.g. a replay)"""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def observe_upload(processed_rows: int, error_rows: int, duration: float) -> None:
+    if _suppressed.get():
+        return
+    UPLOAD_ROWS.labels("processed").inc(processed_rows)
+    UPLOAD_ROWS.labels("errored").inc(error_rows)
+    UPLOAD_DURATION.observe(duration)
+    if duration > 0:
+        UPLOAD_ROWS_PER_SECOND.set((processed_rows + error_rows) / duration)
+
+
+def observe_distribution(level: int, amount: float) -> None:
+    if _suppressed.get():
+        return
+    DISTRIBUTED_AMOUNT.labels(str(level)).inc(amount)
+    DISTRIBUTIONS.labels(str(level)).inc()
+
+
+def track_email(send: Callable[..., bool]) -> Callable[..., bool]:
+    """Count an email as queued now and wrap its sender so it leaves the outbox when it runs"""
+    EMAIL_OUTBOX.inc()
+
+    def send_tracked(*args, **kwargs) -> bool:
+        try:
+            sent = send(*args, **kwargs)
+            EMAILS_SENT.labels("sent" if sent else "failed").inc()
+            return sent
+        except Exception:
+            EMAILS_SENT.labels("failed").inc()
+            raise
+        finally:
+            EMAIL_OUTBOX.dec()
+
+    return send_tracked
+
+
+def instrument_pool(engine: Engine) -> None:
+    """Refresh the pool gauges whenever a connection is checked out or returned"""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return
+
+    def update(returning: int = 0) -> None:
+        DB_POOL_SIZE.set(pool.size())
+        DB_POOL_CHECKED_OUT.set(pool.checkedout() - returning)
+        DB_POOL_CHECKED_IN.set(pool.checkedin() + returning)
+        DB_POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+    event.listen(pool, "checkout", lambda *args: update())
+    # checkin fires before the connection is back in the pool's queue
+    event.listen(pool, "checkin", lambda *args: update(returning=1))
+    update()
+
+
+async def probe_event_loop_lag() -> None:
+    """Run forever, recording how late each sleep wakes up"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(EVENT_LOOP_PROBE_INTERVAL)
+        EVENT_LOOP_LAG.observe(max(time.perf_counter() - started - EVENT_LOOP_PROBE_INTERVAL, 0.0))
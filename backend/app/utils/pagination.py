@@ -0,0 +1,145 @@
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.orm import Query, Session
+
+from ..config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+class Page:
+    """One page of a list query plus the cursor for the next one"""
+
+    def __init__(self, items: List[Any], next_cursor: Optional[str] = None, total: Optional[int] = None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def headers(self) -> Dict[str, str]:
+        """Pagination metadata for list endpoints, which keep returning plain arrays"""
+        headers = {}
+        if self.next_cursor:
+            headers[NEXT_CURSOR_HEADER] = self.next_cursor
+        if self.total is not None:
+            headers[TOTAL_COUNT_HEADER] = str(self.total)
+        return headers
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: int) -> str:
+    """Opaque cursor for the (created_at, id) position of a row; created_at may be NULL"""
+    raw = orjson.dumps([created_at.isoformat() if created_at is not None else None, row_id])
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = orjson.loads(raw)
+        return (datetime.fromisoformat(created_at) if created_at is not None else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    """Missing or non-positive limits get the default page size; large ones are capped"""
+    if not limit or limit <= 0:
+        return settings.DEFAULT_PAGE_SIZE
+    return min(limit, settings.MAX_PAGE_SIZE)
+
+
+def approximate_count(db: Session, query: Query) -> int:
+    """Row estimate for a filtered query.
+
+    On PostgreSQL this reads the planner's row estimate from EXPLAIN instead of
+    counting, so it costs the same on any table size. Small estimates are
+    unreliable and cheap to verify, so below EXACT_COUNT_THRESHOLD the rows are
+    counted exactly. Other databases always get an exact count.
+    """
+    query = query.order_by(None)
+    dialect = db.get_bind().dialect
+    if dialect.name != "postgresql":
+        return query.count()
+
+    compiled = query.statement.compile(dialect=dialect)
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate < settings.EXACT_COUNT_THRESHOLD:
+        return query.count()
+    return estimate
+
+
+def keyset_order(created_column, id_column, descending: bool = True) -> list:
+    """ORDER BY for keyset pages: NULL created values sort after all others, as PostgreSQL's btree indexes keep them"""
+    if descending:
+        return [created_column.desc().nulls_first(), id_column.desc()]
+    return [created_column.asc().nulls_last(), id_column.asc()]
+
+
+def after_cursor(created_column, id_column, cursor_created: Optional[datetime], cursor_id: int, descending: bool = True):
+    """Filter for the rows that come after (cursor_created, cursor_id) in keyset_order"""
+    position = tuple_(created_column, id_column)
+    if descending:
+        if cursor_created is None:
+            # Still among the NULL rows, which come first
+            return or_(and_(created_column.is_(None), id_column < cursor_id), created_column.isnot(None))
+        return position < tuple_(cursor_created, cursor_id)
+    if cursor_created is None:
+        return and_(created_column.is_(None), id_column > cursor_id)
+    return or_(position > tuple_(cursor_created, cursor_id), created_column.is_(None))
+
+
+def paginate(
+    db: Session,
+    query: Query,
+    created_column,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    skip: int = 0,
+    descending: bool = True,
+    include_total: bool = False
+) -> Page:
+    """Keyset-paginate `query` on (created_column, id_column).
+
+    Rows after `cursor` are found with a row-value comparison, so deep pages cost
+    the same as the first one. Rows with a NULL created value are ordered after
+    the rest and paged by id. `skip` is only honoured when no cursor is given,
+    for older clients that still page with offsets.
+    """
+    limit = clamp_limit(limit)
+    total = approximate_count(db, query) if include_total else None
+
+    if cursor:
+        cursor_created, cursor_id = decode_cursor(cursor)
+        query = query.filter(after_cursor(created_column, id_column, cursor_created, cursor_id, descending))
+    elif skip:
+        query = query.offset(skip)
+
+    query = query.order_by(*keyset_order(created_column, id_column, descending))
+
+    # Fetch one extra row to know whether there is a next page
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+
+    return Page(rows, next_cursor=next_cursor, total=total)
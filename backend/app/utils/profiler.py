@@ -0,0 +1,190 @@
+"""On-demand sampling profiler producing speedscope JSON (https://www.speedscope.app).
+
+A background thread samples the stacks of the threads doing a request's work
+every PROFILER_INTERVAL seconds. Nothing runs unless a profile was asked for.
+"""
+import io
+import secrets
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from types import CodeType, FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import orjson
+from jose import JWTError, jwt
+
+from ..config import settings
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "__profile"
+
+
+class SamplingProfiler:
+    """Samples selected threads from a background thread.
+
+    `threads` are always sampled. Other threads are sampled only while
+    `focus_code` (e.g. a sync endpoint running in the threadpool) is on their stack.
+    """
+
+    def __init__(
+        self,
+        threads: List[int],
+        focus_code: Optional[CodeType] = None,
+        interval: float = settings.PROFILER_INTERVAL,
+        name: str = "profile"
+    ):
+        self.threads = set(threads)
+        self.focus_code = focus_code
+        self.interval = interval
+        self.name = name
+        self._frames: Dict[Tuple[str, str, int], int] = {}
+        self._frame_list: List[Dict[str, Any]] = []
+        self._samples: Dict[int, List[List[int]]] = {}
+        self._weights: Dict[int, List[float]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _frame_index(self, frame: FrameType) -> int:
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frames.get(key)
+        if index is None:
+            index = len(self._frame_list)
+            self._frames[key] = index
+            self._frame_list.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _stack(self, frame: FrameType, require_focus: bool) -> Optional[List[int]]:
+        frames = []
+        found = not require_focus
+        while frame is not None:
+            frames.append(frame)
+            if frame.f_code is self.focus_code:
+                found = True
+            frame = frame.f_back
+        if not found:
+            return None
+        return [self._frame_index(frame) for frame in reversed(frames)]
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                always = thread_id in self.threads
+                if not always and self.focus_code is None:
+                    continue
+                stack = self._stack(frame, require_focus=not always)
+                if stack:
+                    self._samples.setdefault(thread_id, []).append(stack)
+                    self._weights.setdefault(thread_id, []).append(elapsed)
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """The samples in speedscope's file format, one profile per sampled thread"""
+        profiles = []
+        for thread_id, samples in self._samples.items():
+            weights = self._weights[thread_id]
+            profiles.append({
+                "type": "sampled",
+                "name": f"{self.name} (thread {thread_id})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": settings.PROJECT_NAME,
+            "shared": {"frames": self._frame_list},
+            "profiles": profiles
+        }
+
+    def save(self) -> Tuple[str, str]:
+        """Store the profile in private storage. Returns (key, url); the url needs a superadmin token"""
+        from .storage import get_private_storage
+
+        storage = get_private_storage()
+        key = f"profiles/{datetime.now():%Y%m%d_%H%M%S}_{secrets.token_hex(4)}.speedscope.json"
+        storage.save(key, io.BytesIO(orjson.dumps(self.to_speedscope())), content_type="application/json")
+        return key, storage.url(key)
+
+
+class ProfileRateLimiter:
+    """At most `limit` profiles per user in any `window` seconds (per process)"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+        self._history: Dict[int, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, user_id: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            history = self._history.setdefault(user_id, deque())
+            while history and history[0] <= now - self.window:
+                history.popleft()
+            if len(history) >= self.limit:
+                return False
+            history.append(now)
+            return True
+
+
+rate_limiter = ProfileRateLimiter(settings.PROFILER_RATE_LIMIT, settings.PROFILER_RATE_WINDOW)
+
+
+def profile_requested(headers, query_params) -> bool:
+    return headers.get(PROFILE_HEADER, "").lower() in ("1", "true") or PROFILE_QUERY_PARAM in query_params
+
+
+def superadmin_id(authorization: str) -> Optional[int]:
+    """Id of the superadmin the bearer token belongs to, or None"""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        username = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+    if username is None:
+        return None
+
+    from .. import models
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        user = db.query(models.User.id, models.User.is_superadmin, models.User.is_active)\
+            .filter(models.User.username == username).first()
+    finally:
+        db.close()
+    if user is None or not user.is_active or not user.is_superadmin:
+        return None
+    return user.id
@@ -0,0 +1,143 @@
+"""Per-request SQL statistics collected from SQLAlchemy cursor and pool events.
+
+install() hooks an engine once. A request then calls start() to get a
+QueryStats that every statement executed in its context (including sync
+endpoints running in the threadpool) is counted against, along with how long
+it kept pooled connections checked out.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_current: ContextVar[Optional["QueryStats"]] = ContextVar("query_stats", default=None)
+
+_PARAM = re.compile(r"%\([^)]*\)s|%s|\?|:\w+|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_SPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement with parameters and literals replaced by '?', so repeated queries compare equal"""
+    shape = _PARAM.sub("?", statement)
+    shape = _PARAM_LIST.sub("?", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """Queries run, time spent in the database and connection hold time for one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+        self.checkouts = 0
+        self.hold = 0.0
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def record_hold(self, duration: float) -> None:
+        self.checkouts += 1
+        self.hold += duration
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes run more than `threshold` times, most frequent first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+
+def start() -> QueryStats:
+    """Start collecting for the current context (one request)"""
+    stats = QueryStats()
+    _current.set(stats)
+    return stats
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start_time"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute: pop its start time and count it here
+    conn = exception_context.connection
+    if conn is None or exception_context.execution_context is None:
+        return
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    started = start_times.pop()
+    stats = _current.get()
+    if stats is not None and exception_context.statement is not None:
+        stats.record(exception_context.statement, time.perf_counter() - started)
+
+
+def _checkout(dbapi_connection, connection_record, connection_proxy):
+    # The request is remembered here because the connection may be returned from another context
+    connection_record.info["checked_out"] = (time.perf_counter(), _current.get())
+
+
+def _checkin(dbapi_connection, connection_record):
+    checked_out = connection_record.info.pop("checked_out", None)
+    if checked_out is None:
+        return
+    started, stats = checked_out
+    if stats is not None:
+        stats.record_hold(time.perf_counter() - started)
+
+
+def install(engine: Engine) -> None:
+    """Hook the engine's cursor, error and pool events (safe to call more than once)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+        event.listen(engine, "checkout", _checkout)
+        event.listen(engine, "checkin", _checkin)
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, engine: Optional[Engine] = None) -> Iterator[List[str]]:
+    """Fail if more than `max_queries` statements run inside the block.
+
+    Counts every statement on the engine, whatever thread it runs in, so it
+    works around TestClient calls:
+
+        with assert_max_queries(3):
+            client.get("/deposit/admin/stats", headers=headers)
+    """
+    if engine is None:
+        from ..database import engine
+
+    statements: List[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    if len(statements) > max_queries:
+        shapes = Counter(statement_shape(statement) for statement in statements)
+        detail = "\n".join(f"  {count} x {shape}" for shape, count in shapes.most_common())
+        raise AssertionError(f"Expected at most {max_queries} queries, ran {len(statements)}:\n{detail}")
@@ -0,0 +1,73 @@
+import enum
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; without it every client gets JSON
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+
+class FastJSONResponse(ORJSONResponse):
+    """Default response class: orjson encodes dicts with datetimes, enums and UUIDs natively"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default)
+
+
+def _msgpack_default(value: Any) -> Any:
+    """Encode types msgpack has no native representation for the same way as the JSON responses"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__} to msgpack")
+
+
+def wants_msgpack(request: Optional[Request]) -> bool:
+    """True if the client asked for msgpack and it is available"""
+    if msgpack is None or request is None:
+        return False
+    return MSGPACK_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def fast_response(
+    request: Optional[Request],
+    content: Any,
+    adapter: Optional[TypeAdapter] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """Serialize `content` in one pass and return a ready Response.
+
+    Returning a Response skips FastAPI's jsonable_encoder pass. With an `adapter`
+    (a module-level TypeAdapter for the endpoint's response model), ORM objects are
+    validated with from_attributes and dumped straight to JSON by pydantic-core.
+    Clients sending `Accept: application/msgpack` get msgpack instead.
+    """
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if adapter is not None:
+        validated = adapter.validate_python(content, from_attributes=True)
+        if wants_msgpack(request):
+            return MsgPackResponse(adapter.dump_python(validated, mode="json"), headers=headers)
+        return Response(adapter.dump_json(validated), media_type="application/json", headers=headers)
+
+    if wants_msgpack(request):
+        return MsgPackResponse(content, headers=headers)
+    return FastJSONResponse(content, headers=headers)
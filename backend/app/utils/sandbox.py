@@ -0,0 +1,90 @@
+"""Run ORM work against temporary copies of tables, leaving the real rows alone.
+
+Temporary tables shadow permanent tables of the same name (PostgreSQL searches
+pg_temp first, SQLite the temp schema), so unchanged queries read and write the
+copies. Nothing the work does locks or changes a real row, and everything is
+rolled back and dropped afterwards. Used to replay an Excel upload under the
+profiler.
+"""
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+
+def _create_copy(conn: Connection, table: str, with_rows: bool) -> None:
+    if conn.dialect.name == "postgresql":
+        schema = conn.execute(text("SELECT current_schema()")).scalar()
+        conn.execute(text(
+            f"CREATE TEMPORARY TABLE {table} "
+            f"(LIKE {schema}.{table} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING INDEXES)"
+        ))
+        if with_rows:
+            conn.execute(text(f"INSERT INTO pg_temp.{table} SELECT * FROM {schema}.{table}"))
+        _own_sequences(conn, schema, table)
+        return
+
+    # SQLite: the same definition and indexes, created in the temp schema
+    create_table = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table}
+    ).scalar()
+    conn.execute(text(create_table.replace("CREATE TABLE", "CREATE TEMPORARY TABLE", 1)))
+    indexes = conn.execute(
+        text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :name AND sql IS NOT NULL"),
+        {"name": table}
+    ).all()
+    for name, create_index in indexes:
+        conn.execute(text(create_index.replace(f"INDEX {name}", f"INDEX temp.{name}", 1)))
+    if with_rows:
+        conn.execute(text(f"INSERT INTO temp.{table} SELECT * FROM main.{table}"))
+
+
+def _own_sequences(conn: Connection, schema: str, table: str) -> None:
+    # LIKE copies serial defaults as nextval() on the real sequences; give each its own temporary
+    # sequence, starting where the real one is, so the replay takes no real ids
+    columns = conn.execute(text(
+        "SELECT a.attname FROM pg_attrdef d "
+        "JOIN pg_attribute a ON a.attrelid = d.adrelid AND a.attnum = d.adnum "
+        "WHERE d.adrelid = CAST(:table AS regclass) AND pg_get_expr(d.adbin, d.adrelid) LIKE 'nextval(%'"
+    ), {"table": f"pg_temp.{table}"}).scalars().all()
+    for column in columns:
+        sequence = f"pg_temp.{table}_{column}_seq"
+        start = conn.execute(text(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {schema}.{table}")).scalar()
+        conn.execute(text(
+            f"CREATE TEMPORARY SEQUENCE {table}_{column}_seq START WITH {start} "
+            f"OWNED BY pg_temp.{table}.{column}"
+        ))
+        conn.execute(text(f"ALTER TABLE pg_temp.{table} ALTER COLUMN {column} SET DEFAULT nextval('{sequence}')"))
+
+
+def _drop_copy(conn: Connection, table: str) -> None:
+    temp_schema = "pg_temp" if conn.dialect.name == "postgresql" else "temp"
+    conn.execute(text(f"DROP TABLE IF EXISTS {temp_schema}.{table}"))
+
+
+@contextmanager
+def sandbox_session(engine: Engine, copied: Sequence[str], empty: Sequence[str] = ()) -> Iterator[Session]:
+    """Session whose statements see copies of the `copied` tables and empty copies of the `empty` ones.
+
+    Commits inside only release savepoints; the whole transaction is rolled
+    back on exit. Copy every table the work writes to.
+    """
+    tables = list(copied) + list(empty)
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            for table in tables:
+                _create_copy(conn, table, with_rows=table in copied)
+            session = Session(bind=conn, join_transaction_mode="create_savepoint")
+            try:
+                yield session
+            finally:
+                session.close()
+        finally:
+            transaction.rollback()
+            # SQLite runs DDL outside the transaction, so the copies survive the rollback
+            with conn.begin():
+                for table in tables:
+                    _drop_copy(conn, table)
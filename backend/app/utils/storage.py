@@ -0,0 +1,207 @@
+import os
+import shutil
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Dict, Optional
+
+from ..config import settings
+
+
+class StorageBackend(ABC):
+    """Base class for uploaded-file storage. Files are addressed by object key, e.g. 'deposits/12/deposit_5.png'"""
+
+    supports_direct_upload = False
+
+    @abstractmethod
+    def save(self, key: str, file_obj: BinaryIO, content_type: Optional[str] = None) -> str:
+        """Store the file under `key` and return the key"""
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """The stored file's contents"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether an object is stored under `key`"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove the object; a missing key is not an error"""
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        """URL a browser can use to display the object"""
+
+    def create_upload_url(self, key: str, content_type: Optional[str] = None) -> Dict:
+        """Presigned URL the client can PUT the file to directly"""
+        raise NotImplementedError("This storage backend does not support direct uploads")
+
+
+class LocalStorage(StorageBackend):
+    """Stores files in a directory: UPLOAD_DIR (served by the /static mount) unless another root is given"""
+
+    def __init__(self, root: str = settings.UPLOAD_DIR, base_url: str = "/static/uploads"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key: str, file_obj: BinaryIO, content_type: Optional[str] = None) -> str:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as buffer:
+            shutil.copyfileobj(file_obj, buffer)
+        return key
+
+    def read(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+
+class S3Storage(StorageBackend):
+    """Stores files in an S3-compatible bucket (AWS S3, MinIO, R2, ...)"""
+
+    supports_direct_upload = True
+
+    def __init__(
+        self,
+        bucket: str = settings.S3_BUCKET,
+        endpoint_url: str = settings.S3_ENDPOINT_URL,
+        region: str = settings.S3_REGION,
+        access_key_id: str = settings.S3_ACCESS_KEY_ID,
+        secret_access_key: str = settings.S3_SECRET_ACCESS_KEY,
+        public_url: str = settings.S3_PUBLIC_URL,
+        expires_in: int = settings.S3_PRESIGN_EXPIRES
+    ):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the boto3 package (pip install boto3)")
+
+        if not bucket:
+            raise RuntimeError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+
+        self.bucket = bucket
+        self.public_url = public_url.rstrip("/")
+        self.expires_in = expires_in
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            # Path-style addressing keeps presigned URLs valid for MinIO and other non-AWS endpoints
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"})
+        )
+
+    def save(self, key: str, file_obj: BinaryIO, content_type: Optional[str] = None) -> str:
+        extra_args = {"ContentType": content_type} if content_type else None
+        self.client.upload_fileobj(file_obj, self.bucket, key, ExtraArgs=extra_args)
+        return key
+
+    def read(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key: str) -> str:
+        if self.public_url:
+            return f"{self.public_url}/{key}"
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=self.expires_in
+        )
+
+    def create_upload_url(self, key: str, content_type: Optional[str] = None) -> Dict:
+        params = {"Bucket": self.bucket, "Key": key}
+        headers = {}
+        if content_type:
+            # The client must send the same Content-Type header or the signature won't match
+            params["ContentType"] = content_type
+            headers["Content-Type"] = content_type
+
+        upload_url = self.client.generate_presigned_url(
+            "put_object",
+            Params=params,
+            ExpiresIn=self.expires_in
+        )
+        return {
+            "key": key,
+            "upload_url": upload_url,
+            "method": "PUT",
+            "headers": headers,
+            "expires_in": self.expires_in
+        }
+
+
+# Private files are never linked to directly: their URLs point at this superadmin-only endpoint
+PRIVATE_FILES_URL = "/admin/files"
+
+_storage: Optional[StorageBackend] = None
+_private_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    """Return the configured storage backend (created once per process)"""
+    global _storage
+    if _storage is None:
+        backend = settings.STORAGE_BACKEND.lower()
+        if backend == "s3":
+            _storage = S3Storage()
+        elif backend == "local":
+            _storage = LocalStorage()
+        else:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}' (expected 'local' or 's3')")
+    return _storage
+
+
+def get_private_storage() -> StorageBackend:
+    """Return the storage for files only superadmins may read (created once per process)"""
+    global _private_storage
+    if _private_storage is None:
+        backend = settings.STORAGE_BACKEND.lower()
+        if backend == "s3":
+            if not settings.S3_PRIVATE_BUCKET:
+                raise RuntimeError("S3_PRIVATE_BUCKET must be set when STORAGE_BACKEND=s3")
+            _private_storage = S3Storage(bucket=settings.S3_PRIVATE_BUCKET, public_url=PRIVATE_FILES_URL)
+        elif backend == "local":
+            _private_storage = LocalStorage(root=settings.PRIVATE_UPLOAD_DIR, base_url=PRIVATE_FILES_URL)
+        else:
+            raise RuntimeError(f"Unknown STORAGE_BACKEND '{settings.STORAGE_BACKEND}' (expected 'local' or 's3')")
+    return _private_storage
+
+
+def resolve_file_url(value: Optional[str]) -> Optional[str]:
+    """Turn a stored object key into a displayable URL.
+
+    Full URLs (e.g. ImgBB links) and legacy '/static/...' paths are returned unchanged.
+    """
+    if not value or value.startswith(("http://", "https://", "/")):
+        return value
+    return get_storage().url(value)
@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# Scratch database for tools that recreate tables; override with BENCH_DATABASE_URL
+DEFAULT_BENCH_DATABASE_URL = f"sqlite:///{os.path.join(tempfile.gettempdir(), 'vantage_bench.sqlite3')}"
+
+
+def use_bench_database() -> str:
+    """Point the app at BENCH_DATABASE_URL. Call before anything imports app.config."""
+    url = os.getenv("BENCH_DATABASE_URL", DEFAULT_BENCH_DATABASE_URL)
+    os.environ["DATABASE_URL"] = url
+    return url
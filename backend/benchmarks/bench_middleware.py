@@ -0,0 +1,175 @@
+"""
+Per-request cost of the middleware stack: @app.middleware("http") versus pure ASGI.
+
+Run from the backend directory:
+    python -m benchmarks.bench_middleware [requests]
+
+Builds three copies of a trivial app (the `/` route from app.main, plus an
+async twin at `/async`) that differ only in their middleware:
+    none    CORS only
+    http    CORS plus the four @app.middleware("http") functions app.main used
+            before (exception handler, SQL timing, metrics, profiler)
+    asgi    CORS plus the pure ASGI stack app.main installs (the same concerns
+            plus request ids and load shedding)
+Requests are driven straight through the ASGI interface in one event loop, so
+no server or socket time is included. No database is needed.
+"""
+import asyncio
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.middleware.asgi import (
+    CatchExceptionsMiddleware, MetricsMiddleware, ProfilerMiddleware, QueryTimingMiddleware, RequestIdMiddleware
+)
+from app.middleware.load_shedding import LoadSheddingMiddleware
+from app.utils import metrics, profiler, query_stats
+from app.utils.responses import FastJSONResponse
+
+STACKS = ["none", "http", "asgi"]
+
+
+def add_http_middleware(app: FastAPI) -> None:
+    """The BaseHTTPMiddleware stack app.main had, minus the branches that never run here"""
+
+    @app.middleware("http")
+    async def catch_exceptions(request: Request, call_next):
+        try:
+            return await call_next(request)
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"detail": f"Internal server error: {str(e)}"})
+
+    @app.middleware("http")
+    async def sql_instrumentation(request: Request, call_next):
+        stats = query_stats.start()
+        started = time.perf_counter()
+        response = await call_next(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        response.headers["X-DB-Queries"] = str(stats.count)
+        response.headers["Server-Timing"] = (
+            f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+        )
+        return response
+
+    @app.middleware("http")
+    async def prometheus_metrics(request: Request, call_next):
+        started = time.perf_counter()
+        status_code = 500
+        metrics.IN_FLIGHT.inc()
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            metrics.IN_FLIGHT.dec()
+            route = request.scope.get("route")
+            metrics.observe_request(
+                request.method, getattr(route, "path", "unmatched"), status_code, time.perf_counter() - started
+            )
+
+    @app.middleware("http")
+    async def request_profiler(request: Request, call_next):
+        # Profiling is never requested here, so only the check runs
+        profiler.profile_requested(request.headers, request.query_params)
+        return await call_next(request)
+
+
+def add_asgi_middleware(app: FastAPI) -> None:
+    """The stack app.main installs"""
+    app.add_middleware(CatchExceptionsMiddleware)
+    app.add_middleware(QueryTimingMiddleware)
+    app.add_middleware(LoadSheddingMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(ProfilerMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+
+
+def make_app(stack: str) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["https://brandfx.biz"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    if stack == "http":
+        add_http_middleware(app)
+    elif stack == "asgi":
+        add_asgi_middleware(app)
+
+    @app.get("/")
+    def read_root():
+        return {"message": f"Welcome to {settings.PROJECT_NAME}", "version": settings.PROJECT_VERSION, "status": "running"}
+
+    @app.get("/async")
+    async def read_root_async():
+        return {"message": f"Welcome to {settings.PROJECT_NAME}", "version": settings.PROJECT_VERSION, "status": "running"}
+
+    return app
+
+
+async def request(app: FastAPI, path: str) -> int:
+    """One GET through the ASGI interface; returns the status code"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"testserver"), (b"accept", b"application/json")],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    status = 0
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        # Like a server: the (empty) body once, then a disconnect after the response
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+async def timed(app: FastAPI, path: str, requests: int, repeat: int = 3) -> float:
+    """Best mean seconds per request over `repeat` runs of `requests` sequential requests"""
+    for _ in range(min(requests, 200)):
+        assert await request(app, path) == 200
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(requests):
+            await request(app, path)
+        best = min(best, (time.perf_counter() - started) / requests)
+    return best
+
+
+async def run(requests: int) -> None:
+    apps = {stack: make_app(stack) for stack in STACKS}
+    print(f"{'route':<8} " + " ".join(f"{stack:>9}" for stack in STACKS) + f" {'http+':>9} {'asgi+':>9}")
+    for path in ["/", "/async"]:
+        times = {stack: await timed(apps[stack], path, requests) for stack in STACKS}
+        overhead = {stack: times[stack] - times["none"] for stack in ("http", "asgi")}
+        print(
+            f"{path:<8} " + " ".join(f"{times[stack] * 1e6:>7.1f}us" for stack in STACKS)
+            + f" {overhead['http'] * 1e6:>7.1f}us {overhead['asgi'] * 1e6:>7.1f}us"
+        )
+    print("times are per request; http+ and asgi+ are the middleware's share over 'none'")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
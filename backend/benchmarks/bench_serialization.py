@@ -0,0 +1,93 @@
+"""
+Compare FastAPI's default response serialization with the fast path in app.utils.responses.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization [rows ...]
+
+No database is needed; rows are plain objects shaped like the ORM models.
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+
+from app.schemas.user import UserListItem, UserResponse
+from app.schemas.withdrawal import WithdrawalResponse
+from app.utils.responses import FastJSONResponse, fast_response
+
+
+def make_user(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=i, username=f"2601{i:06d}", email=f"user{i}@example.com", phone=f"+1555{i:07d}",
+        country="India", full_name=f"User {i}", vantage_username=f"vantage{i}", vantage_password="secret",
+        is_active=i % 3 != 0, is_admin=False, is_superadmin=False,
+        wallet_balance=i * 1.25, total_earned=i * 2.5, total_withdrawn=i * 1.25,
+        referral_code=f"REF{i:05d}", withdrawal_address="0x" + "ab" * 20, withdrawal_qr_code=None,
+        parent_id=i // 3 or None, created_at=datetime(2026, 1, 1) + timedelta(minutes=i)
+    )
+
+
+def make_withdrawal(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=i, user_id=i, amount=10.0 + i, status="PENDING", admin_notes=None,
+        requested_at=datetime(2026, 1, 1) + timedelta(minutes=i), processed_at=None, processed_by=None,
+        user=make_user(i)
+    )
+
+
+def default_path(field, rows) -> bytes:
+    """What FastAPI does for `response_model=...` endpoints: validate, jsonable_encoder, json.dumps"""
+    content = asyncio.run(serialize_response(field=field, response_content=rows))
+    return JSONResponse(content).body
+
+
+def orjson_path(field, rows) -> bytes:
+    """Default path with orjson as the response class (still runs jsonable_encoder)"""
+    content = asyncio.run(serialize_response(field=field, response_content=rows))
+    return FastJSONResponse(content).body
+
+
+def fast_path(adapter, rows) -> bytes:
+    """Precompiled TypeAdapter: validate from attributes and dump JSON in pydantic-core"""
+    return fast_response(None, rows, adapter).body
+
+
+def timed(func, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(row_counts: List[int]):
+    # (name, declared response model, model the fast path serializes with, row factory)
+    cases = [
+        ("users", UserResponse, UserListItem, make_user),
+        ("withdrawals", WithdrawalResponse, WithdrawalResponse, make_withdrawal),
+    ]
+    print(f"{'endpoint':<12} {'rows':>8} {'default':>10} {'orjson':>10} {'fast':>10} {'speedup':>8}")
+    for name, model, fast_model, factory in cases:
+        field = create_response_field(name="response", type_=List[model])
+        adapter = TypeAdapter(List[fast_model])
+        for count in row_counts:
+            rows = [factory(i) for i in range(1, count + 1)]
+            default_time = timed(default_path, field, rows)
+            orjson_time = timed(orjson_path, field, rows)
+            fast_time = timed(fast_path, adapter, rows)
+            print(
+                f"{name:<12} {count:>8} {default_time * 1000:>8.1f}ms {orjson_time * 1000:>8.1f}ms "
+                f"{fast_time * 1000:>8.1f}ms {default_time / fast_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000])
@@ -0,0 +1,182 @@
+"""
+Query-plan regression check: every hot CRUD query must be answered through its index.
+
+Run from the backend directory against a PostgreSQL database that has the
+indexes from app.migrations.add_hot_query_indexes:
+    python -m benchmarks.check_query_plans [scale]
+
+The dataset is seeded inside a transaction that is rolled back at the end, so
+the check leaves the database as it found it. Each check runs the real CRUD
+function, captures the SQL it sends and EXPLAINs it. Exits non-zero if any
+query does not use its expected index.
+"""
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud import deduction as deduction_crud
+from app.crud import deposit as deposit_crud
+from app.crud import income as income_crud
+from app.crud import user as user_crud
+from app.crud import withdrawal as withdrawal_crud
+from app.database import engine
+from app.models.contact import ContactMessage
+from app.routers.admin import get_income_report
+from app.utils.pagination import paginate
+
+INDEX_NODE_TYPES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def seed(conn, scale: int) -> Dict[str, int]:
+    """Insert a referral network with incomes, deposits, withdrawals, deductions and messages spread over two years"""
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+
+    def when() -> datetime:
+        return now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60))
+
+    # Seeded ids start after any existing users
+    base = conn.exec_driver_sql("SELECT COALESCE(MAX(id), 0) FROM users").scalar()
+    user_count = 200 * scale
+    users = []
+    for i in range(1, user_count + 1):
+        users.append({
+            "id": base + i, "username": f"plan{i:07d}", "email": f"plan{i}@example.com", "phone": f"{i}",
+            "country": "India", "full_name": f"Plan User {i}", "password_hash": "x",
+            "referral_code": f"P{i:07d}", "parent_id": base + rng.randrange(1, i) if i > 1 else None,
+            "is_active": rng.random() < 0.8, "is_admin": i == 1, "is_superadmin": i == 1,
+            "wallet_balance": 0.0, "total_earned": 0.0, "total_withdrawn": 0.0, "created_at": when()
+        })
+    conn.execute(insert(models.User), users)
+
+    def user_id() -> int:
+        return base + rng.randrange(1, user_count + 1)
+
+    conn.execute(insert(models.Income), [
+        {
+            "user_id": user_id(), "amount": 1.5, "percentage": 0.02, "level": rng.randrange(1, 6),
+            "income_type": "DAILY", "source_vantage_username": "v", "source_income_amount": 75.0,
+            "created_at": when()
+        }
+        for _ in range(5000 * scale)
+    ])
+    conn.execute(insert(models.DepositTransaction), [
+        {
+            "user_id": user_id(), "amount": 100.0, "usdt_address": "T" * 34, "created_at": when(),
+            # A small pending queue, like production
+            "status": "PENDING" if rng.random() < 0.02 else "COMPLETED"
+        }
+        for _ in range(1000 * scale)
+    ])
+    conn.execute(insert(models.WithdrawalRequest), [
+        {
+            "user_id": user_id(), "amount": 20.0, "requested_at": when(),
+            "status": "PENDING" if rng.random() < 0.02 else "COMPLETED"
+        }
+        for _ in range(1000 * scale)
+    ])
+    conn.execute(insert(models.Deduction), [
+        {"user_id": user_id(), "amount": 5.0, "deduction_type": "MANUAL", "created_at": when()}
+        for _ in range(1000 * scale)
+    ])
+    conn.execute(insert(ContactMessage), [
+        {"name": "n", "email": "n@example.com", "message": "m", "created_at": when()}
+        for _ in range(500 * scale)
+    ])
+
+    for table in ("users", "incomes", "deposit_transactions", "withdrawal_requests", "deductions", "contact_messages"):
+        conn.exec_driver_sql(f"ANALYZE {table}")
+
+    return {"admin_id": base + 1, "user_id": base + user_count // 2}
+
+
+def plan_indexes(plan: dict) -> List[str]:
+    """Names of the indexes scanned anywhere in an EXPLAIN (FORMAT JSON) plan tree"""
+    names = []
+    if plan.get("Node Type") in INDEX_NODE_TYPES:
+        names.append(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names.extend(plan_indexes(child))
+    return names
+
+
+def run_check(db: Session, conn, run: Callable[[Session], object], expected_index: str) -> Tuple[bool, List[str]]:
+    """Run a CRUD call, EXPLAIN every statement it sent and look for the expected index"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(conn, "before_cursor_execute", capture)
+    try:
+        run(db)
+    finally:
+        event.remove(conn, "before_cursor_execute", capture)
+
+    used = []
+    for statement, parameters in statements:
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        used.extend(plan_indexes(plan[0]["Plan"]))
+    return expected_index in used, used
+
+
+def main(scale: int = 10) -> int:
+    if engine.dialect.name != "postgresql":
+        print("Query-plan checks need PostgreSQL")
+        return 1
+
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            ids = seed(conn, scale)
+            db = Session(bind=conn, join_transaction_mode="create_savepoint")
+            admin = db.get(models.User, ids["admin_id"])
+            user_id = ids["user_id"]
+            now = datetime.now(timezone.utc)
+
+            checks = [
+                ("user incomes", lambda db: income_crud.get_user_incomes(db, user_id),
+                 "ix_incomes_user_id_created_at"),
+                ("income report", lambda db: get_income_report(
+                    start_date=now - timedelta(days=30), end_date=now, current_user=admin, db=db),
+                 "ix_incomes_created_at"),
+                ("direct referrals", lambda db: user_crud.get_direct_referrals_count(db, ids["admin_id"]),
+                 "ix_users_parent_id"),
+                ("user deposits", lambda db: deposit_crud.get_user_deposits(db, user_id),
+                 "ix_deposit_transactions_user_id_status"),
+                ("user deposit summary", lambda db: deposit_crud.get_user_deposit_summary(db, user_id),
+                 "ix_deposit_transactions_user_id_status"),
+                ("pending deposits", lambda db: deposit_crud.get_all_deposits(db, status="PENDING"),
+                 "ix_deposit_transactions_pending_created_at"),
+                ("user withdrawals", lambda db: withdrawal_crud.get_user_withdrawals(db, user_id),
+                 "ix_withdrawal_requests_user_id_status"),
+                ("pending withdrawals", lambda db: withdrawal_crud.get_all_withdrawals(db, status="PENDING"),
+                 "ix_withdrawal_requests_pending_requested_at"),
+                ("user deductions", lambda db: deduction_crud.get_user_deductions(db, user_id),
+                 "ix_deductions_user_id_created_at"),
+                ("contact messages", lambda db: paginate(
+                    db, db.query(ContactMessage), ContactMessage.created_at, ContactMessage.id),
+                 "ix_contact_messages_created_at"),
+            ]
+
+            failures = 0
+            for name, run, expected_index in checks:
+                ok, used = run_check(db, conn, run, expected_index)
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {name:<22} expected {expected_index}; used {', '.join(used) or 'no index'}")
+            db.close()
+        finally:
+            transaction.rollback()
+
+    print(f"\n{len(checks) - failures}/{len(checks)} queries use their index")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
@@ -0,0 +1,353 @@
+"""
+Synthetic referral network and workload generator.
+
+Run from the backend directory:
+    python -m benchmarks.generate --users 1000000 --reset [options]
+
+Generates users in a referral network, their deposit and withdrawal histories,
+and income upload sheets, and loads them into BENCH_DATABASE_URL (see
+benchmarks/__init__.py) using the tables defined in app/models. Rows are
+generated in chunks with numpy and bulk-loaded in a single transaction: COPY on
+PostgreSQL, executemany on SQLite.
+
+Referral shape: the first --roots users have no referrer. Each later user picks
+a referrer by preferential attachment (proportional to 1 + referrals made so
+far) with probability --preferential, or uniformly among earlier users
+otherwise. Referrers already --max-depth levels deep are not picked.
+
+The target tables must be empty unless --reset is given, which drops and
+recreates every table. The sheets (--sheet-rows, --sheet-format) are written to
+--out and can be uploaded as they are. They name random users, so about
+1 - --vantage-ratio of their rows hit users without a vantage account and fail.
+"""
+import os
+import sys
+
+from benchmarks import use_bench_database
+
+use_bench_database()
+
+import argparse
+import csv
+import io
+import random
+import tempfile
+import time
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Table, func, select
+from sqlalchemy.schema import CreateIndex, DropIndex
+
+from app import models
+from app.crud.wallet import open_ledger
+from app.money import micros_array
+from app.database import Base, SessionLocal, engine
+from app.utils.security import get_password_hash
+
+# Rows generated and loaded per batch
+CHUNK_SIZE = 100000
+
+# Deposits go to one of the platform's receiving addresses
+PLATFORM_ADDRESSES = ["T" + format(n, "033x") for n in (0xA11CE, 0xB0B, 0xC0FFEE)]
+COUNTRIES = ["India", "Indonesia", "Nigeria", "Philippines", "Vietnam", "Pakistan", "Brazil"]
+COUNTRY_WEIGHTS = [0.45, 0.15, 0.12, 0.1, 0.08, 0.06, 0.04]
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Siti", "Chinedu", "Maria", "Minh", "Ayesha", "Lucas", "Ananya"]
+LAST_NAMES = ["Sharma", "Patel", "Wijaya", "Okafor", "Santos", "Nguyen", "Khan", "Silva", "Reddy", "Gupta"]
+
+DEPOSIT_STATUSES = ["PENDING", "CONFIRMING", "COMPLETED", "FAILED", "EXPIRED"]
+DEPOSIT_STATUS_WEIGHTS = [0.03, 0.02, 0.85, 0.05, 0.05]
+WITHDRAWAL_STATUSES = ["PENDING", "APPROVED", "REJECTED", "COMPLETED"]
+WITHDRAWAL_STATUS_WEIGHTS = [0.05, 0.05, 0.05, 0.85]
+INCOME_TYPES = ["DAILY", "WEEKLY", "MONTHLY"]
+INCOME_TYPE_WEIGHTS = [0.9, 0.08, 0.02]
+
+
+def referral_network(users: int, roots: int, preferential: float, max_depth: int, seed: int):
+    """Parent id (0 for none) and depth of every user, indexed by user id (index 0 unused)"""
+    rng = random.Random(seed)
+    parents = [0] * (users + 1)
+    depths = [0] * (users + 1)
+    # Every user appears once, plus once per referral: a uniform pick from this
+    # list is a pick proportional to 1 + referrals
+    attachment: List[int] = []
+
+    for user_id in range(1, users + 1):
+        if user_id > roots:
+            for _ in range(10):
+                if rng.random() < preferential:
+                    parent = attachment[rng.randrange(len(attachment))]
+                else:
+                    parent = rng.randrange(1, user_id)
+                if depths[parent] < max_depth:
+                    break
+            else:
+                parent = rng.randrange(1, roots + 1)
+            parents[user_id] = parent
+            depths[user_id] = depths[parent] + 1
+            attachment.append(parent)
+        attachment.append(user_id)
+    return np.array(parents, dtype=np.int64), np.array(depths, dtype=np.int64)
+
+
+class BulkLoader:
+    """Loads column-oriented chunks into a table through the raw DBAPI connection"""
+
+    def __init__(self, connection, dialect: str):
+        self.connection = connection
+        self.dialect = dialect
+        self.timestamp_format = "%Y-%m-%d %H:%M:%S+00" if dialect == "postgresql" else "%Y-%m-%d %H:%M:%S.%f"
+        self.counts: Dict[str, int] = {}
+
+    def timestamps(self, epoch_seconds: np.ndarray, mask: np.ndarray = None) -> List:
+        """Timestamps formatted for the driver; None where `mask` is False"""
+        values = pd.to_datetime(epoch_seconds, unit="s", utc=True).strftime(self.timestamp_format).tolist()
+        if mask is not None:
+            values = [value if keep else None for value, keep in zip(values, mask.tolist())]
+        return values
+
+    def load(self, table: Table, columns: Dict[str, Sequence]) -> None:
+        unknown = set(columns) - set(table.c.keys())
+        if unknown:
+            raise ValueError(f"{table.name} has no column(s) {', '.join(sorted(unknown))}")
+        names = list(columns)
+        values = [column.tolist() if isinstance(column, np.ndarray) else column for column in columns.values()]
+        cursor = self.connection.cursor()
+        try:
+            if self.dialect == "postgresql":
+                # None is written as an unquoted empty field, which COPY reads as NULL
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(zip(*values))
+                buffer.seek(0)
+                cursor.copy_expert(f"COPY {table.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            else:
+                placeholders = ", ".join("?" * len(names))
+                cursor.executemany(
+                    f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({placeholders})", zip(*values)
+                )
+        finally:
+            cursor.close()
+        self.counts[table.name] = self.counts.get(table.name, 0) + len(values[0])
+
+
+def load_network(loader: BulkLoader, args: argparse.Namespace, parents: np.ndarray) -> None:
+    """Generate and load users with their deposits and withdrawals, one chunk of users at a time"""
+    rng = np.random.default_rng(args.seed)
+    now = time.time()
+    history_start = now - args.days * 86400
+    password_hash = get_password_hash(args.password)
+    deposit_id = withdrawal_id = 0
+
+    for start in range(1, args.users + 1, CHUNK_SIZE):
+        ids = np.arange(start, min(start + CHUNK_SIZE, args.users + 1))
+        n = len(ids)
+        # Sign-ups spread evenly over the history, in id order, so referrers always joined first
+        joined = history_start + (ids - 1) * (args.days * 86400 / args.users) + rng.uniform(0, 60, n)
+        active = rng.random(n) < args.active_ratio
+        active[ids == 1] = True
+        has_vantage = rng.random(n) < args.vantage_ratio
+        earned = np.where(active, rng.lognormal(4, 1.2, n), 0.0)
+
+        # Deposits: inactive users mostly never pay
+        deposit_counts = rng.poisson(np.where(active, args.deposits_per_user, args.deposits_per_user * 0.2))
+        deposit_users = np.repeat(ids, deposit_counts)
+        deposit_joined = np.repeat(joined, deposit_counts)
+        m = len(deposit_users)
+        deposit_ids = np.arange(deposit_id + 1, deposit_id + m + 1)
+        deposit_id += m
+        deposit_status = rng.choice(DEPOSIT_STATUSES, m, p=DEPOSIT_STATUS_WEIGHTS)
+        deposit_created = deposit_joined + rng.random(m) * (now - deposit_joined)
+        settled = deposit_status == "COMPLETED"
+        hashed = settled | (deposit_status == "CONFIRMING")
+        hash_bits = rng.integers(0, 2 ** 63, (m, 3))
+        transaction_hashes = [
+            f"{a:016x}{b:016x}{c:016x}{d:016x}" if keep else None
+            for (a, b, c), d, keep in zip(hash_bits.tolist(), deposit_ids.tolist(), hashed.tolist())
+        ]
+
+        # Withdrawals: active users only, each a slice of what they earned
+        withdrawal_counts = rng.poisson(np.where(active, args.withdrawals_per_user, 0.0))
+        withdrawal_users = np.repeat(ids, withdrawal_counts)
+        withdrawal_joined = np.repeat(joined, withdrawal_counts)
+        k = len(withdrawal_users)
+        withdrawal_ids = np.arange(withdrawal_id + 1, withdrawal_id + k + 1)
+        withdrawal_id += k
+        withdrawal_status = rng.choice(WITHDRAWAL_STATUSES, k, p=WITHDRAWAL_STATUS_WEIGHTS)
+        withdrawal_amount = micros_array(np.round(np.repeat(earned, withdrawal_counts) * rng.uniform(0.05, 0.3, k) + 10, 2))
+        requested = withdrawal_joined + rng.random(k) * (now - withdrawal_joined)
+        processed = withdrawal_status != "PENDING"
+        paid = (withdrawal_status == "APPROVED") | (withdrawal_status == "COMPLETED")
+
+        # Money is written as int64 micro-units, so balances add up exactly
+        withdrawn = np.zeros(n, dtype=np.int64)
+        np.add.at(withdrawn, withdrawal_users - start, np.where(paid, withdrawal_amount, 0))
+        earned = np.maximum(micros_array(np.round(earned, 2)), withdrawn)
+        first_names = rng.choice(FIRST_NAMES, n)
+        last_names = rng.choice(LAST_NAMES, n)
+        id_list = ids.tolist()
+
+        loader.load(models.User.__table__, {
+            "id": ids,
+            "username": [f"gen{i:07d}" for i in id_list],
+            "email": [f"gen{i:07d}@example.com" for i in id_list],
+            "phone": [f"+91{i:010d}" for i in id_list],
+            "country": rng.choice(COUNTRIES, n, p=COUNTRY_WEIGHTS),
+            "full_name": [f"{first} {last}" for first, last in zip(first_names.tolist(), last_names.tolist())],
+            "vantage_username": [f"v{i:07d}" if keep else None for i, keep in zip(id_list, has_vantage.tolist())],
+            "vantage_password": ["vantage-password" if keep else None for keep in has_vantage.tolist()],
+            "password_hash": [password_hash] * n,
+            "referral_code": [f"G{i:07d}" for i in id_list],
+            "parent_id": [parent or None for parent in parents[ids].tolist()],
+            "is_active": active,
+            "is_admin": ids == 1,
+            "is_superadmin": ids == 1,
+            "wallet_balance": earned - withdrawn,
+            "total_earned": earned,
+            "total_withdrawn": withdrawn,
+            "created_at": loader.timestamps(joined),
+        })
+        if m:
+            loader.load(models.DepositTransaction.__table__, {
+                "id": deposit_ids,
+                "user_id": deposit_users,
+                "amount": micros_array(np.round(rng.lognormal(5, 1, m), 2)),
+                "status": deposit_status,
+                "usdt_address": rng.choice(PLATFORM_ADDRESSES, m),
+                "transaction_hash": transaction_hashes,
+                "created_at": loader.timestamps(deposit_created),
+                "confirmed_at": loader.timestamps(deposit_created + rng.uniform(60, 86400, m), settled),
+            })
+        if k:
+            loader.load(models.WithdrawalRequest.__table__, {
+                "id": withdrawal_ids,
+                "user_id": withdrawal_users,
+                "amount": withdrawal_amount,
+                "status": withdrawal_status,
+                "processed_by": [1 if done else None for done in processed.tolist()],
+                "requested_at": loader.timestamps(requested),
+                "processed_at": loader.timestamps(requested + rng.uniform(3600, 3 * 86400, k), processed),
+            })
+        print(f"  {ids[-1]:>10,} / {args.users:,} users")
+
+
+def write_sheets(args: argparse.Namespace) -> List[str]:
+    """Income upload sheets naming random users by vantage username"""
+    rng = np.random.default_rng(args.seed)
+    paths = []
+    os.makedirs(args.out, exist_ok=True)
+    for rows in args.sheet_rows:
+        ids = rng.integers(1, args.users + 1, rows)
+        frame = pd.DataFrame({
+            "vantage_username": [f"v{i:07d}" for i in ids.tolist()],
+            "amount": np.round(rng.lognormal(3, 1, rows), 2),
+            "income_type": rng.choice(INCOME_TYPES, rows, p=INCOME_TYPE_WEIGHTS),
+        })
+        for sheet_format in args.sheet_format:
+            path = os.path.join(args.out, f"income_sheet_{rows}.{sheet_format}")
+            if sheet_format == "xlsx":
+                frame.to_excel(path, index=False)
+            else:
+                frame.to_csv(path, index=False)
+            paths.append(path)
+    return paths
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--roots", type=int, default=10, help="users without a referrer")
+    parser.add_argument("--preferential", type=float, default=0.8,
+                        help="share of referrers picked by preferential attachment (the rest uniformly)")
+    parser.add_argument("--max-depth", type=int, default=30, help="deepest referral level")
+    parser.add_argument("--active-ratio", type=float, default=0.7)
+    parser.add_argument("--vantage-ratio", type=float, default=0.9, help="share of users with a vantage username")
+    parser.add_argument("--deposits-per-user", type=float, default=1.5, help="mean deposits per active user")
+    parser.add_argument("--withdrawals-per-user", type=float, default=0.5, help="mean withdrawals per active user")
+    parser.add_argument("--days", type=int, default=365, help="length of the generated history")
+    parser.add_argument("--password", default="password", help="password of every generated user")
+    parser.add_argument("--sheet-rows", type=int, nargs="*", default=[1000, 10000], help="rows per income sheet")
+    parser.add_argument("--sheet-format", nargs="+", choices=["xlsx", "csv"], default=["xlsx"])
+    parser.add_argument("--out", default=os.path.join(tempfile.gettempdir(), "vantage_sheets"),
+                        help="directory for the income sheets")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate every table first")
+    args = parser.parse_args(argv)
+    if args.users < 1 or not 1 <= args.roots <= args.users:
+        parser.error("need at least one user, and between 1 and --users roots")
+
+    dialect = engine.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        parser.error(f"bulk loading supports PostgreSQL and SQLite, not {dialect}")
+    if args.reset:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    # Indexes are dropped on the bulk-loaded tables, and open_ledger writes the ledger
+    tables = [models.User.__table__, models.DepositTransaction.__table__, models.WithdrawalRequest.__table__]
+    with engine.connect() as conn:
+        not_empty = [
+            table.name for table in tables + [models.WalletLedgerEntry.__table__]
+            if conn.execute(select(func.count()).select_from(table)).scalar()
+        ]
+    if not_empty:
+        print(f"{', '.join(not_empty)} not empty; pass --reset to recreate the tables")
+        return 1
+
+    started = time.perf_counter()
+    parents, depths = referral_network(args.users, args.roots, args.preferential, args.max_depth, args.seed)
+    referrals = np.bincount(parents[1:], minlength=args.users + 1)[1:]
+    print(
+        f"Referral network: max depth {depths.max()}, mean depth {depths[1:].mean():.1f}, "
+        f"most referrals {referrals.max()} ({time.perf_counter() - started:.1f}s)"
+    )
+
+    # Secondary indexes are built once after the load instead of row by row
+    indexes = [index for table in tables for index in table.indexes]
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        for index in indexes:
+            cursor.execute(str(DropIndex(index).compile(dialect=engine.dialect)))
+        loader = BulkLoader(connection, dialect)
+        load_network(loader, args, parents)
+        print(f"Building {len(indexes)} indexes...")
+        for index in indexes:
+            cursor.execute(str(CreateIndex(index).compile(dialect=engine.dialect)))
+        if dialect == "postgresql":
+            # Explicit ids leave the sequences behind
+            for table in tables:
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {table.name}), false)"
+                )
+        cursor.close()
+        connection.commit()
+    finally:
+        connection.close()
+
+    # Generated wallets start the ledger with an opening balance each
+    db = SessionLocal()
+    try:
+        opened = open_ledger(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Opened {opened:,} wallet ledgers")
+
+    if dialect == "postgresql":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE")
+
+    elapsed = time.perf_counter() - started
+    rows = sum(loader.counts.values())
+    for table, count in loader.counts.items():
+        print(f"{table:<22} {count:>12,} rows")
+    print(f"Loaded {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+    for path in write_sheets(args):
+        print(f"Wrote {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
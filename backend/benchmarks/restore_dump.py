@@ -0,0 +1,261 @@
+"""
+Restore a production dump into the benchmark database with its PII anonymized.
+
+Run from the backend directory:
+    python -m benchmarks.restore_dump --list
+    python -m benchmarks.restore_dump "../RemoteDB Backup/13-03-2026/neondb.backup" [--fixture FILE]
+    python -m benchmarks.restore_dump FILE.fixture
+
+The target is BENCH_DATABASE_URL (see benchmarks/__init__.py) and must be a
+PostgreSQL database you can throw away: its public schema is dropped first.
+The dumps are pg_dump custom-format archives (the .sql ones too) written by
+PostgreSQL 17, so pg_restore must be version 17 or newer; point --pg-bin (or
+PG_BIN) at its directory if it is not on PATH.
+
+After pg_restore, the PII columns are rewritten in place by set-based UPDATEs,
+one per table, in a single transaction. Ids, referral links, amounts, statuses
+and timestamps are kept as they are. Every user's password becomes --password.
+The schema is then brought up to date with app/models (money columns in
+micro-units, missing tables, the daily income rollup, opening wallet ledger
+balances and the hot query indexes) and analyzed.
+
+--fixture writes the anonymized database to a custom-format dump. Restoring
+that file later skips the anonymization, since it is marked as already done.
+"""
+import os
+import sys
+
+from benchmarks import use_bench_database
+
+use_bench_database()
+
+import argparse
+import glob
+import secrets
+import shutil
+import subprocess
+import time
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.database import Base, SessionLocal, engine
+from app.utils.security import get_password_hash
+
+BACKUP_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "RemoteDB Backup")
+
+# Created in anonymized databases, so fixtures made from them are not anonymized twice
+MARKER_TABLE = "benchmark_fixture"
+
+FIRST_NAMES = ["Aarav", "Priya", "Rahul", "Siti", "Chinedu", "Maria", "Minh", "Ayesha", "Lucas", "Ananya"]
+LAST_NAMES = ["Sharma", "Patel", "Wijaya", "Okafor", "Santos", "Nguyen", "Khan", "Silva", "Reddy", "Gupta"]
+
+
+def _names(values: List[str]) -> str:
+    return "(ARRAY[" + ", ".join(f"'{value}'" for value in values) + "])"
+
+
+def _hex(column: str, length: int) -> str:
+    """A salted pseudonym of `column`: equal inputs stay equal, but the original cannot be looked up"""
+    return f"left(md5(:salt || {column}) || md5({column} || :salt), {length})"
+
+
+# Column -> replacement expression, evaluated against the row being updated.
+# NULLs are kept NULL, so optional fields keep their fill rate.
+ANONYMIZE: Dict[str, Dict[str, str]] = {
+    "users": {
+        "email": "'user' || id || '@example.com'",
+        "phone": "'+0' || lpad(id::text, 10, '0')",
+        "full_name": f"{_names(FIRST_NAMES)}[1 + id % 10] || ' ' || {_names(LAST_NAMES)}[1 + (id / 10) % 10]",
+        "vantage_username": "'v' || lpad(id::text, 7, '0')",
+        "vantage_password": "'vantage-password'",
+        "password_hash": ":password_hash",
+        "withdrawal_address": f"'T' || {_hex('withdrawal_address', 33)}",
+        "withdrawal_qr_code": "'anonymized/qr_' || id || '.png'",
+    },
+    "deposit_transactions": {
+        "usdt_address": f"'T' || {_hex('usdt_address', 33)}",
+        "transaction_hash": _hex("id::text", 64),
+        "payment_screenshot": "'anonymized/deposit_' || id || '.png'",
+        "notes": "'[redacted]'",
+        "admin_notes": "'[redacted]'",
+    },
+    "withdrawal_requests": {
+        "admin_notes": "'[redacted]'",
+    },
+    "deductions": {
+        "description": "'[redacted]'",
+        "admin_notes": "'[redacted]'",
+    },
+    "contact_messages": {
+        "name": "'Contact ' || id",
+        "email": "'contact' || id || '@example.com'",
+        "subject": "'[redacted]'",
+        "message": "'[redacted]'",
+        "ip_address": "'192.0.2.' || (id % 254 + 1)",
+        "user_agent": "'Mozilla/5.0 (anonymized)'",
+    },
+}
+
+# Unique columns are moved to placeholder values first, so a new value never
+# collides with an old value that has not been rewritten yet. Their replacements
+# must therefore be derived from the id, not from the original value.
+UNIQUE_COLUMNS = {"users": ["email", "vantage_username"], "deposit_transactions": ["transaction_hash"]}
+
+
+def list_dumps() -> List[str]:
+    return sorted(
+        path for path in glob.glob(os.path.join(BACKUP_DIR, "*", "*"))
+        if path.endswith((".sql", ".backup"))
+    )
+
+
+def pg_tool(name: str, pg_bin: Optional[str]) -> str:
+    path = os.path.join(pg_bin, name) if pg_bin else shutil.which(name)
+    if not path or not os.path.exists(path):
+        raise SystemExit(f"{name} not found; install the PostgreSQL 17 client tools or pass --pg-bin")
+    return path
+
+
+def libpq_url() -> str:
+    """The engine URL in the form pg_restore and pg_dump accept (no +driver suffix)"""
+    return engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+def existing_columns(conn: Connection) -> Dict[str, set]:
+    rows = conn.execute(text(
+        "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = 'public'"
+    )).all()
+    columns: Dict[str, set] = {}
+    for table, column in rows:
+        columns.setdefault(table, set()).add(column)
+    return columns
+
+
+def anonymize(conn: Connection, password: str, source: str) -> Dict[str, int]:
+    """Rewrite every PII column that exists in the restored schema. Returns rows updated per table."""
+    columns = existing_columns(conn)
+    params = {"salt": secrets.token_hex(16), "password_hash": get_password_hash(password)}
+
+    # Incomes name their source by vantage username; keep them pointing at the same users
+    if "source_vantage_username" in columns.get("incomes", set()) and "vantage_username" in columns.get("users", set()):
+        conn.execute(text(
+            "CREATE TEMP TABLE vantage_pseudonyms ON COMMIT DROP AS "
+            "SELECT vantage_username AS original, 'v' || lpad(id::text, 7, '0') AS pseudonym "
+            "FROM users WHERE vantage_username IS NOT NULL"
+        ))
+        conn.execute(text("CREATE UNIQUE INDEX ON vantage_pseudonyms (original)"))
+        conn.execute(text(
+            "UPDATE incomes SET source_vantage_username = COALESCE("
+            "(SELECT pseudonym FROM vantage_pseudonyms WHERE original = source_vantage_username), "
+            f"'unknown_' || {_hex('source_vantage_username', 12)})"
+        ), params)
+
+    updated = {}
+    for table, replacements in ANONYMIZE.items():
+        present = {column: expression for column, expression in replacements.items() if column in columns.get(table, set())}
+        if not present:
+            continue
+        placeholders = [column for column in UNIQUE_COLUMNS.get(table, []) if column in present]
+        if placeholders:
+            conn.execute(text(
+                f"UPDATE {table} SET "
+                + ", ".join(f"{column} = CASE WHEN {column} IS NULL THEN NULL ELSE '#' || id END" for column in placeholders)
+            ))
+        assignments = ", ".join(
+            f"{column} = CASE WHEN {column} IS NULL THEN NULL ELSE {expression} END"
+            for column, expression in present.items()
+        )
+        updated[table] = conn.execute(text(f"UPDATE {table} SET {assignments}"), params).rowcount
+
+    conn.execute(text(f"CREATE TABLE {MARKER_TABLE} (source TEXT NOT NULL, anonymized_at TIMESTAMPTZ NOT NULL)"))
+    conn.execute(text(f"INSERT INTO {MARKER_TABLE} VALUES (:source, now())"), {"source": source})
+    return updated
+
+
+def main(argv: Sequence[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("dump", nargs="?", help="pg_dump custom-format archive or fixture")
+    parser.add_argument("--list", action="store_true", help=f"list the dumps in {BACKUP_DIR}")
+    parser.add_argument("--fixture", help="write the anonymized database to this file")
+    parser.add_argument("--password", default="password", help="password given to every user")
+    parser.add_argument("--jobs", type=int, default=4, help="parallel pg_restore jobs")
+    parser.add_argument("--pg-bin", default=os.getenv("PG_BIN"), help="directory of pg_restore and pg_dump")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for path in list_dumps():
+            print(os.path.relpath(path))
+        return 0
+    if not args.dump:
+        parser.error("give a dump to restore, or --list")
+    if engine.dialect.name != "postgresql":
+        parser.error("dumps can only be restored into PostgreSQL; set BENCH_DATABASE_URL")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+
+    print(f"Restoring {args.dump}...")
+    restore = subprocess.run([
+        pg_tool("pg_restore", args.pg_bin), "--no-owner", "--no-privileges", "--exit-on-error",
+        f"--jobs={args.jobs}", f"--dbname={libpq_url()}", args.dump
+    ])
+    if restore.returncode:
+        # "unsupported version (1.16) in file header" means pg_restore is older than 17
+        print("pg_restore failed; see its output above")
+        return 1
+    print(f"  restored in {time.perf_counter() - started:.1f}s")
+
+    with engine.begin() as conn:
+        fixture = bool(conn.execute(text("SELECT to_regclass(:name)"), {"name": MARKER_TABLE}).scalar())
+        if fixture:
+            print("Already anonymized (fixture)")
+        else:
+            step = time.perf_counter()
+            updated = anonymize(conn, args.password, os.path.basename(args.dump))
+            summary = ", ".join(f"{table} {count:,}" for table, count in updated.items())
+            print(f"Anonymized rows: {summary} ({time.perf_counter() - step:.1f}s)")
+
+    # Bring the restored schema up to date with the models
+    from app.crud.income import rebuild_daily_rollup
+    from app.crud.wallet import open_ledger
+    from app.migrations import add_hot_query_indexes, convert_money_to_micros
+
+    convert_money_to_micros.upgrade()
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    try:
+        print(f"Rebuilt {rebuild_daily_rollup(db)} daily income rollup rows")
+        opened = open_ledger(db)
+        db.commit()
+        print(f"Opened {opened} wallet ledgers")
+    finally:
+        db.close()
+    add_hot_query_indexes.upgrade()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+        counts = {
+            table: conn.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+            for table in ("users", "incomes", "deposit_transactions", "withdrawal_requests")
+        }
+    print(", ".join(f"{table} {count:,}" for table, count in counts.items()))
+
+    if args.fixture:
+        dump = subprocess.run([
+            pg_tool("pg_dump", args.pg_bin), "--format=custom", "--no-owner", "--no-privileges",
+            f"--file={args.fixture}", libpq_url()
+        ])
+        if dump.returncode:
+            print("pg_dump failed; see its output above")
+            return 1
+        print(f"Wrote fixture {args.fixture}")
+
+    print(f"Done in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Benchmark suite for the income and referral hot paths.
+
+Run from the backend directory:
+    python -m benchmarks.suite [--large] [--only NAME ...] [--update-baseline] [--threshold 0.25]
+
+The suite runs against BENCH_DATABASE_URL (a throwaway SQLite file by default,
+or a dedicated local Postgres database). Its tables are dropped and re-seeded
+with a generated referral network on every run, so never point it at a real
+database. Cases that write (income distribution, Excel processing) run inside
+a transaction that is rolled back, so every timed run starts from the same data.
+
+For each case the suite reports the best wall time of the timed runs, the
+number of SQL statements and the peak Python memory (tracemalloc), and compares
+them with benchmarks/baseline.json for the same database dialect. It exits non-zero when
+a case runs more queries than its baseline, or is slower or uses more memory
+than the baseline by more than the threshold. --update-baseline records the
+current numbers instead. The default run processes a 1k-row Excel sheet;
+--large adds the 10k and 100k-row sheets, which take minutes per run.
+"""
+import os
+import sys
+
+from benchmarks import use_bench_database
+
+use_bench_database()
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import logging
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from fastapi.testclient import TestClient
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app import models
+from app.crud import deposit as deposit_crud
+from app.crud import user as user_crud
+from app.database import Base, engine
+from app.main import app
+from app.utils.excel_processor import ExcelProcessor
+from app.utils.income_calculator import IncomeCalculator
+from app.utils.security import create_access_token, get_password_hash
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Generated dataset: a 5-ary referral tree, so the root's 5-level tree holds 3905 users
+USER_COUNT = 5000
+BRANCHING = 5
+DEPOSIT_COUNT = 20000
+DISTRIBUTIONS_PER_RUN = 100
+PASSWORD = "bench-password"
+
+# Differences below these are noise whatever the threshold
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA_KB = 256
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[], object]
+    repeat: int = 5
+    # Run inside a rolled-back transaction; `run` then receives the session
+    writes: bool = False
+    # Fills caches (compiled statements, lazy imports) before anything is measured; defaults to `run`
+    warmup: Optional[Callable[[], object]] = None
+    # Runs before every run, untimed (e.g. to empty an application cache the case must not hit)
+    setup: Optional[Callable[[], object]] = None
+
+
+@dataclass
+class Result:
+    seconds: float
+    queries: int
+    peak_kb: int
+
+
+def seed() -> Dict[str, object]:
+    """Recreate the tables and insert the referral network and deposits"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    password_hash = get_password_hash(PASSWORD)
+
+    users = []
+    for i in range(1, USER_COUNT + 1):
+        users.append({
+            "id": i, "username": f"bench{i:06d}", "email": f"bench{i}@example.com", "phone": f"{i}",
+            "country": "India", "full_name": f"Bench User {i}", "vantage_username": f"vbench{i:06d}",
+            "password_hash": password_hash, "referral_code": f"B{i:07d}",
+            "parent_id": (i - 2) // BRANCHING + 1 if i > 1 else None,
+            "is_active": i == 1 or rng.random() < 0.9, "is_admin": i == 1, "is_superadmin": i == 1,
+            "wallet_balance": 0.0, "total_earned": 0.0, "total_withdrawn": 0.0,
+            "created_at": now - timedelta(minutes=USER_COUNT - i)
+        })
+    statuses = ["PENDING", "CONFIRMING", "COMPLETED", "FAILED"]
+    deposits = [
+        {
+            "user_id": rng.randrange(1, USER_COUNT + 1), "amount": float(rng.randrange(10, 1000)),
+            "usdt_address": "T" * 34, "status": rng.choice(statuses),
+            "created_at": now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        }
+        for _ in range(DEPOSIT_COUNT)
+    ]
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), users)
+        conn.execute(insert(models.DepositTransaction), deposits)
+        if engine.dialect.name == "postgresql":
+            # Explicit ids leave the sequence behind
+            conn.exec_driver_sql("SELECT setval('users_id_seq', (SELECT max(id) FROM users))")
+            conn.exec_driver_sql("ANALYZE")
+
+    # Users at least five levels deep, so income climbs the full five levels
+    first_deep = sum(BRANCHING ** level for level in range(5)) + 1
+    return {
+        "admin": users[0],
+        "sources": [user["vantage_username"] for user in users[first_deep - 1:]],
+    }
+
+
+def excel_sheet(sources: List[str], rows: int) -> bytes:
+    """An income upload with `rows` rows; about 1% name unknown users"""
+    rng = random.Random(rows)
+    frame = pd.DataFrame({
+        "vantage_username": [
+            rng.choice(sources) if rng.random() < 0.99 else f"unknown{i}" for i in range(rows)
+        ],
+        "amount": [round(rng.uniform(10, 500), 2) for _ in range(rows)],
+        "income_type": ["DAILY"] * rows,
+    })
+    buffer = io.BytesIO()
+    frame.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def build_cases(data: Dict[str, object], large: bool) -> List[Case]:
+    client = TestClient(app)
+    admin = data["admin"]
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': admin['username']})}"}
+    sources = data["sources"]
+
+    def get(url: str) -> Callable[[], object]:
+        def run():
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, f"GET {url}: {response.status_code} {response.text[:200]}"
+        return run
+
+    def login():
+        response = client.post("/auth/login", data={"username": admin["username"], "password": PASSWORD})
+        assert response.status_code == 200, f"login: {response.status_code} {response.text[:200]}"
+
+    def distribute(db: Session):
+        rng = random.Random(0)
+        for _ in range(DISTRIBUTIONS_PER_RUN):
+            IncomeCalculator.distribute_income(db, rng.choice(sources), 100.0, "DAILY", None)
+
+    def process_excel(rows: int) -> Callable[[Session], object]:
+        sheet = excel_sheet(sources, rows)
+
+        def run(db: Session):
+            upload = models.ExcelUpload(filename=f"bench_{rows}.xlsx", uploaded_by=admin["id"])
+            db.add(upload)
+            db.flush()
+            ExcelProcessor.process_excel_sync(db, sheet, admin["id"], upload.id)
+        return run
+
+    warm_excel = process_excel(10)
+
+    def referral_tree():
+        with Session(engine) as db:
+            user_crud.get_referral_tree(db, admin["id"])
+
+    cases = [
+        Case(f"distribute_income x{DISTRIBUTIONS_PER_RUN}", distribute, repeat=3, writes=True),
+        Case("process_excel_sync 1k", process_excel(1000), repeat=1, writes=True, warmup=warm_excel),
+        Case("get_referral_tree", referral_tree),
+        Case("GET /users/{id}/referral-stats", get(f"/users/{admin['id']}/referral-stats")),
+        Case("GET /users/search", get("/users/search?q=bench00")),
+        # Every run computes the stats: a cache hit would only measure the auth lookup
+        Case("GET /deposit/admin/stats", get("/deposit/admin/stats"), setup=deposit_crud.deposit_stats_cache.invalidate),
+        Case("POST /auth/login", login),
+    ]
+    if large:
+        cases[2:2] = [
+            Case("process_excel_sync 10k", process_excel(10000), repeat=1, writes=True, warmup=warm_excel),
+            Case("process_excel_sync 100k", process_excel(100000), repeat=1, writes=True, warmup=warm_excel),
+        ]
+    return cases
+
+
+def run_once(case: Case, run: Optional[Callable[[], object]] = None) -> None:
+    run = run or case.run
+    if not case.writes:
+        run()
+        return
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            run(db)
+        finally:
+            db.close()
+            transaction.rollback()
+
+
+def measure(case: Case) -> Result:
+    """A warm-up run, one traced run for query count and peak memory, then `repeat` timed runs"""
+    queries = 0
+
+    def setup():
+        if case.setup is not None:
+            case.setup()
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        nonlocal queries
+        queries += 1
+
+    # The processors print per row; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        setup()
+        run_once(case, case.warmup)
+        gc.collect()
+        setup()
+        event.listen(engine, "before_cursor_execute", count)
+        tracemalloc.start()
+        try:
+            run_once(case)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            event.remove(engine, "before_cursor_execute", count)
+
+        timings = []
+        for _ in range(case.repeat):
+            gc.collect()
+            setup()
+            started = time.perf_counter()
+            run_once(case)
+            timings.append(time.perf_counter() - started)
+
+    return Result(seconds=min(timings), queries=queries, peak_kb=peak // 1024)
+
+
+def regressions(result: Result, baseline: Dict[str, float], threshold: float) -> List[str]:
+    problems = []
+    if result.queries > baseline["queries"]:
+        problems.append(f"queries {baseline['queries']} -> {result.queries}")
+    if (result.seconds > baseline["seconds"] * (1 + threshold)
+            and result.seconds - baseline["seconds"] > MIN_TIME_DELTA):
+        problems.append(f"time {baseline['seconds']:.4f}s -> {result.seconds:.4f}s")
+    if (result.peak_kb > baseline["peak_kb"] * (1 + threshold)
+            and result.peak_kb - baseline["peak_kb"] > MIN_MEMORY_DELTA_KB):
+        problems.append(f"peak memory {baseline['peak_kb']} KB -> {result.peak_kb} KB")
+    return problems
+
+
+def load_baseline() -> Dict[str, Dict[str, Dict[str, float]]]:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def change(current: float, previous: Optional[float]) -> str:
+    if not previous:
+        return ""
+    return f"{(current - previous) / previous:+.0%}"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--large", action="store_true", help="include the 10k and 100k-row Excel cases")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="run cases whose name contains NAME")
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown / memory growth (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    # TestClient logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    dialect = engine.dialect.name
+    print(f"Seeding {USER_COUNT} users and {DEPOSIT_COUNT} deposits on {dialect}...")
+    cases = build_cases(seed(), args.large)
+    if args.only:
+        cases = [case for case in cases if any(name in case.name for name in args.only)]
+
+    all_baselines = load_baseline()
+    baselines = all_baselines.get(dialect, {})
+    results: Dict[str, Result] = {}
+    failures: List[Tuple[str, List[str]]] = []
+
+    print(f"\n{'case':<34} {'time':>10} {'Δ':>6} {'queries':>8} {'Δ':>6} {'peak KB':>9} {'Δ':>6}")
+    for case in cases:
+        result = measure(case)
+        results[case.name] = result
+        baseline = baselines.get(case.name)
+        print(
+            f"{case.name:<34} {result.seconds:>9.4f}s {change(result.seconds, baseline and baseline['seconds']):>6} "
+            f"{result.queries:>8} {change(result.queries, baseline and baseline['queries']):>6} "
+            f"{result.peak_kb:>9} {change(result.peak_kb, baseline and baseline['peak_kb']):>6}"
+        )
+        if baseline and not args.update_baseline:
+            problems = regressions(result, baseline, args.threshold)
+            if problems:
+                failures.append((case.name, problems))
+
+    if args.update_baseline:
+        baselines.update({
+            name: {"seconds": round(result.seconds, 4), "queries": result.queries, "peak_kb": result.peak_kb}
+            for name, result in results.items()
+        })
+        all_baselines[dialect] = baselines
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(all_baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline for {dialect} written to {BASELINE_PATH}")
+        return 0
+
+    missing = [case.name for case in cases if case.name not in baselines]
+    if missing:
+        print(f"\nNo {dialect} baseline for: {', '.join(missing)} (run with --update-baseline)")
+    if failures:
+        print(f"\n{len(failures)} regression(s) beyond {args.threshold:.0%}:")
+        for name, problems in failures:
+            print(f"  {name}: {'; '.join(problems)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models  # noqa: F401 (registers the tables on Base)
+from app.database import Base, LazySession
+
+
+@pytest.fixture
+def db():
+    """A session on a fresh in-memory SQLite database with every table created"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(class_=LazySession, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
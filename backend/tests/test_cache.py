@@ -0,0 +1,26 @@
+from app.utils.cache import TTLCache
+
+
+def test_get_or_set_caches():
+    cache = TTLCache(60)
+    assert cache.get_or_set("k", lambda: 1) == 1
+    assert cache.get_or_set("k", lambda: 2) == 1
+
+
+def test_invalidate_during_compute_wins():
+    cache = TTLCache(60)
+
+    def compute():
+        # A write invalidates the cache while the old value is being computed
+        cache.invalidate()
+        return "stale"
+
+    assert cache.get_or_set("k", compute) == "stale"
+    assert cache.get("k") is None
+    assert cache.get_or_set("k", lambda: "fresh") == "fresh"
+
+
+def test_zero_ttl_disables_caching():
+    cache = TTLCache(0)
+    cache.set("k", 1)
+    assert cache.get("k") is None
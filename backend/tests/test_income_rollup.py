@@ -0,0 +1,45 @@
+from datetime import date, datetime
+
+from app import models
+from app.crud import income as income_crud
+
+
+def rollup_rows(db):
+    Rollup = models.IncomeDailyRollup
+    return sorted(
+        (row.user_id, row.day, row.income_type, row.level, row.amount_sum, row.count)
+        for row in db.query(Rollup)
+    )
+
+
+def add_income(db, user_id, amount, created_at=None):
+    data = {
+        "user_id": user_id, "amount": amount, "percentage": 10.0, "level": 1,
+        "income_type": models.IncomeType.DAILY, "source_vantage_username": "v1", "source_income_amount": amount * 10
+    }
+    if created_at is not None:
+        data["created_at"] = created_at
+    income_crud.create_income(db, data)
+
+
+def test_rebuild_matches_incremental_rollup(db):
+    user = models.User(
+        username="u1", email="u1@example.com", phone="1", country="c", full_name="U", password_hash="x",
+        referral_code="U1"
+    )
+    db.add(user)
+    db.commit()
+
+    add_income(db, user.id, 1.5, datetime(2026, 1, 1, 23, 59))
+    add_income(db, user.id, 2.0, datetime(2026, 1, 2, 0, 1))
+    add_income(db, user.id, 3.0, datetime(2026, 1, 2, 12, 0))
+    add_income(db, user.id, 4.0)
+    incremental = rollup_rows(db)
+    days = {row[1] for row in incremental}
+    assert {date(2026, 1, 1), date(2026, 1, 2)} <= days
+
+    income_crud.rebuild_daily_rollup(db)
+    assert rollup_rows(db) == incremental
+
+    daily = income_crud.get_daily_income(db, user.id, date(2026, 1, 1), date(2026, 1, 2))
+    assert [(row["day"], row["count"]) for row in daily] == [(date(2026, 1, 1), 1), (date(2026, 1, 2), 2)]
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+from app import models
+from app.utils.pagination import decode_cursor, encode_cursor, paginate
+
+
+@pytest.fixture
+def uploads(db):
+    """Ten uploads, three of them with no uploaded_at"""
+    user = models.User(
+        username="admin", email="admin@example.com", phone="1", country="c", full_name="Admin",
+        password_hash="x", referral_code="ADMIN"
+    )
+    db.add(user)
+    db.flush()
+    start = datetime(2026, 1, 1)
+    db.add_all([
+        models.ExcelUpload(filename=f"{i}.xlsx", uploaded_by=user.id, uploaded_at=start + timedelta(days=i % 4))
+        for i in range(10)
+    ])
+    db.flush()
+    db.execute(
+        update(models.ExcelUpload).where(models.ExcelUpload.id.in_([2, 5, 9])).values(uploaded_at=None)
+    )
+    db.commit()
+    return db
+
+
+def all_pages(db, descending):
+    ids, cursor = [], None
+    while True:
+        page = paginate(
+            db, db.query(models.ExcelUpload), models.ExcelUpload.uploaded_at, models.ExcelUpload.id,
+            cursor=cursor, limit=2, descending=descending
+        )
+        ids.extend(upload.id for upload in page)
+        if not page.next_cursor:
+            return ids
+        cursor = page.next_cursor
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_pages_cover_rows_with_null_keys(uploads, descending):
+    ids = all_pages(uploads, descending)
+    assert sorted(ids) == list(range(1, 11))
+    nulls = [9, 5, 2] if descending else [2, 5, 9]
+    assert (ids[:3] if descending else ids[-3:]) == nulls
+
+
+def test_cursor_round_trips_null():
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    assert decode_cursor(encode_cursor(datetime(2026, 1, 2, 3, 4), 7)) == (datetime(2026, 1, 2, 3, 4), 7)
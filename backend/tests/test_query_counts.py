@@ -0,0 +1,81 @@
+from contextvars import copy_context
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import models
+from app.crud import deposit as deposit_crud
+from app.crud import withdrawal as withdrawal_crud
+from app.routers.deposit import deposit_admin_list_adapter
+from app.routers.withdrawal import withdrawal_list_adapter
+from app.utils import query_stats
+
+
+def add_users_with_requests(db, count=10):
+    for i in range(count):
+        user = models.User(
+            username=f"u{i}", email=f"u{i}@example.com", phone=str(i), country="c", full_name=f"User {i}",
+            password_hash="x", referral_code=f"U{i}"
+        )
+        user.deposits.append(models.DepositTransaction(amount=10 + i, usdt_address="addr"))
+        user.withdrawal_requests.append(models.WithdrawalRequest(amount=1 + i))
+        db.add(user)
+    db.commit()
+
+
+def test_admin_deposit_list_loads_users_in_one_query(db):
+    add_users_with_requests(db)
+    db.expunge_all()
+
+    with query_stats.assert_max_queries(1, engine=db.get_bind()):
+        page = deposit_crud.get_all_deposits(db, limit=50)
+        deposit_admin_list_adapter.dump_json(page.items)
+
+    assert len(page.items) == 10
+
+
+def test_admin_withdrawal_list_loads_users_in_one_query(db):
+    add_users_with_requests(db)
+    db.expunge_all()
+
+    with query_stats.assert_max_queries(1, engine=db.get_bind()):
+        page = withdrawal_crud.get_all_withdrawals(db, limit=50)
+        withdrawal_list_adapter.dump_json(page.items)
+
+    assert len(page.items) == 10
+
+
+def test_user_deposit_summary_is_one_query(db):
+    add_users_with_requests(db, count=1)
+    user_id = db.query(models.User.id).scalar()
+
+    with query_stats.assert_max_queries(1, engine=db.get_bind()):
+        summary = deposit_crud.get_user_deposit_summary(db, user_id)
+
+    assert summary["status_counts"]["PENDING"] == 1
+
+
+def test_assert_max_queries_fails_over_the_limit(db):
+    with pytest.raises(AssertionError):
+        with query_stats.assert_max_queries(1, engine=db.get_bind()):
+            db.query(models.User).all()
+            db.query(models.DepositTransaction).all()
+
+
+def test_failed_statement_is_counted_and_popped(db):
+    engine = db.get_bind()
+    query_stats.install(engine)
+
+    def run():
+        stats = query_stats.start()
+        with engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM no_such_table"))
+            conn.execute(text("SELECT 1"))
+            assert not conn.info["query_start_time"]
+        return stats
+
+    # A copied context keeps the collector from leaking into other tests
+    stats = copy_context().run(run)
+    assert stats.count == 2
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app import models
+from app.database import Base
+from app.utils import metrics
+from app.utils.sandbox import sandbox_session
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file database, so the sandbox and the checks below use separate connections
+    engine = create_engine(f"sqlite:///{tmp_path / 'sandbox.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert().values(
+            id=1, username="u1", email="u1@example.com", phone="1", country="c", full_name="U", password_hash="x",
+            referral_code="U1", wallet_balance=10.0
+        ))
+    yield engine
+    engine.dispose()
+
+
+def balance(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT wallet_balance FROM users WHERE id = 1")).scalar()
+
+
+def test_sandbox_writes_never_reach_the_real_tables(engine):
+    real_balance = balance(engine)
+
+    with sandbox_session(engine, ["users"], ["wallet_ledger"]) as db:
+        db.execute(text("UPDATE users SET wallet_balance = wallet_balance + 5000000 WHERE id = 1"))
+        db.execute(models.WalletLedgerEntry.__table__.insert().values(
+            user_id=1, entry_type=models.LedgerEntryType.INCOME, balance_delta=5.0, earned_delta=0.0,
+            withdrawn_delta=0.0
+        ))
+        db.commit()
+        assert db.execute(text("SELECT count(*) FROM users")).scalar() == 1
+        assert db.execute(text("SELECT count(*) FROM wallet_ledger")).scalar() == 1
+        assert balance(engine) == real_balance
+
+    assert balance(engine) == real_balance
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM wallet_ledger")).scalar() == 0
+
+    # The copies were dropped, so the pooled connection can make them again
+    with sandbox_session(engine, ["users"], ["wallet_ledger"]) as db:
+        assert db.execute(text("SELECT count(*) FROM wallet_ledger")).scalar() == 0
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="set TEST_POSTGRES_URL to a scratch PostgreSQL database")
+def test_sandbox_inserts_leave_the_real_sequences_alone():
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(engine)
+
+    def sequence_state():
+        with engine.connect() as conn:
+            sequence = conn.execute(text("SELECT pg_get_serial_sequence('users', 'id')")).scalar()
+            return conn.execute(text(f"SELECT last_value, is_called FROM {sequence}")).one()
+
+    try:
+        before = sequence_state()
+        with sandbox_session(engine, ["users"]) as db:
+            user = models.User(
+                username="sandboxed", email="sandboxed@example.com", phone="1", country="c", full_name="S",
+                password_hash="x", referral_code="SANDBOXED"
+            )
+            db.add(user)
+            db.commit()
+            assert user.id is not None
+            assert sequence_state() == before
+        assert sequence_state() == before
+    finally:
+        engine.dispose()
+
+
+def test_suppressed_metrics_are_not_recorded():
+    processed = metrics.UPLOAD_ROWS.labels("processed")
+    before = processed._value.get()
+
+    with metrics.suppressed():
+        metrics.observe_upload(7, 0, 1.0)
+    assert processed._value.get() == before
+
+    metrics.observe_upload(7, 0, 1.0)
+    assert processed._value.get() == before + 7
@@ -0,0 +1,86 @@
+"""Storage backends against a local directory and a moto-stubbed S3 bucket (standing in for MinIO)"""
+import io
+
+import pytest
+
+from app.utils.storage import LocalStorage, StorageBackend
+
+boto3 = pytest.importorskip("boto3")
+moto = pytest.importorskip("moto")
+requests = pytest.importorskip("requests")
+
+from app.utils.storage import S3Storage  # noqa: E402
+
+BUCKET = "uploads"
+
+
+@pytest.fixture
+def s3_storage():
+    with moto.mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Storage(
+            bucket=BUCKET,
+            endpoint_url="",
+            region="us-east-1",
+            access_key_id="test",
+            secret_access_key="test",
+            public_url="",
+            expires_in=600
+        )
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_local_save_read_delete(tmp_path):
+    storage = LocalStorage(root=str(tmp_path), base_url="/static/uploads/")
+    assert storage.save("deposits/1/a.png", io.BytesIO(b"png")) == "deposits/1/a.png"
+    assert storage.exists("deposits/1/a.png")
+    assert storage.read("deposits/1/a.png") == b"png"
+    assert storage.url("deposits/1/a.png") == "/static/uploads/deposits/1/a.png"
+    storage.delete("deposits/1/a.png")
+    storage.delete("deposits/1/a.png")
+    assert not storage.exists("deposits/1/a.png")
+    assert not storage.supports_direct_upload
+
+
+def test_local_rejects_keys_outside_root(tmp_path):
+    storage = LocalStorage(root=str(tmp_path / "uploads"))
+    with pytest.raises(ValueError):
+        storage.save("../escape.txt", io.BytesIO(b"x"))
+
+
+def test_s3_save_read_delete(s3_storage):
+    s3_storage.save("deposits/1/a.png", io.BytesIO(b"png"), "image/png")
+    assert s3_storage.exists("deposits/1/a.png")
+    assert s3_storage.read("deposits/1/a.png") == b"png"
+    head = s3_storage.client.head_object(Bucket=BUCKET, Key="deposits/1/a.png")
+    assert head["ContentType"] == "image/png"
+    s3_storage.delete("deposits/1/a.png")
+    assert not s3_storage.exists("deposits/1/a.png")
+
+
+def test_s3_url_is_presigned_get(s3_storage):
+    s3_storage.save("deposits/1/a.png", io.BytesIO(b"png"))
+    url = s3_storage.url("deposits/1/a.png")
+    assert f"/{BUCKET}/deposits/1/a.png?" in url
+    assert "X-Amz-Signature=" in url
+    assert requests.get(url).content == b"png"
+
+
+def test_s3_url_uses_public_base(s3_storage):
+    s3_storage.public_url = "https://cdn.example.com"
+    assert s3_storage.url("deposits/1/a.png") == "https://cdn.example.com/deposits/1/a.png"
+
+
+def test_s3_presigned_upload(s3_storage):
+    upload = s3_storage.create_upload_url("deposits/1/b.png", "image/png")
+    assert upload["method"] == "PUT"
+    assert upload["headers"] == {"Content-Type": "image/png"}
+    assert upload["expires_in"] == 600
+
+    response = requests.put(upload["upload_url"], data=b"direct", headers=upload["headers"])
+    assert response.status_code == 200
+    assert s3_storage.read("deposits/1/b.png") == b"direct"
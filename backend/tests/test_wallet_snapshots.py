@@ -0,0 +1,29 @@
+from app import models
+from app.crud import wallet as wallet_crud
+from app.models.wallet_ledger import LedgerEntryType
+
+
+def test_wallet_is_the_same_before_and_after_snapshots(db):
+    user = models.User(
+        username="u1", email="u1@example.com", phone="1", country="c", full_name="U", password_hash="x",
+        referral_code="U1"
+    )
+    db.add(user)
+    db.commit()
+    user_id = user.id
+
+    wallet_crud.credit(db, user_id, 10.0, LedgerEntryType.INCOME, earned=True)
+    wallet_crud.debit(db, user_id, 4.0, LedgerEntryType.WITHDRAWAL_HOLD)
+    db.commit()
+    before = wallet_crud.get_wallet(db, user_id)
+
+    assert wallet_crud.take_snapshots(db) == 1
+    db.commit()
+    assert wallet_crud.get_wallet(db, user_id) == before
+
+    wallet_crud.credit(db, user_id, 2.5, LedgerEntryType.INCOME, earned=True)
+    db.commit()
+    assert wallet_crud.take_snapshots(db) == 1
+    db.commit()
+    assert wallet_crud.get_wallet(db, user_id) == (8.5, 12.5, 0.0)
+    assert wallet_crud.take_snapshots(db) == 0
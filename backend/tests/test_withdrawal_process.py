@@ -0,0 +1,53 @@
+from app import models, schemas
+from app.crud import withdrawal as withdrawal_crud
+from app.models.withdrawal import WithdrawalStatus
+
+
+def add_request(db, amount=5.0):
+    user = models.User(
+        username="u1", email="u1@example.com", phone="1", country="c", full_name="U", password_hash="x",
+        referral_code="U1", wallet_balance=0.0, total_earned=0.0, total_withdrawn=0.0
+    )
+    user.withdrawal_requests.append(models.WithdrawalRequest(amount=amount))
+    db.add(user)
+    db.commit()
+    return user.id, user.withdrawal_requests[0].id
+
+
+def process(db, withdrawal_id, status):
+    return withdrawal_crud.process_withdrawal(db, withdrawal_id, schemas.WithdrawalUpdate(status=status), admin_id=None)
+
+
+def test_repeated_reject_refunds_once(db):
+    user_id, withdrawal_id = add_request(db)
+
+    withdrawal, outcome = process(db, withdrawal_id, WithdrawalStatus.REJECTED)
+    assert outcome["outcome"] == "processed"
+    assert withdrawal.status == WithdrawalStatus.REJECTED
+
+    withdrawal, outcome = process(db, withdrawal_id, WithdrawalStatus.REJECTED)
+    assert withdrawal is None
+    assert outcome == {"id": withdrawal_id, "outcome": "skipped", "detail": "status is REJECTED"}
+
+    db.expire_all()
+    assert db.get(models.User, user_id).wallet_balance == 5.0
+    assert db.query(models.WalletLedgerEntry).count() == 1
+
+
+def test_repeated_complete_counts_once(db):
+    user_id, withdrawal_id = add_request(db)
+
+    assert process(db, withdrawal_id, WithdrawalStatus.COMPLETED)[1]["outcome"] == "processed"
+    assert process(db, withdrawal_id, WithdrawalStatus.COMPLETED)[1]["outcome"] == "skipped"
+    # A completed request cannot be rejected (and refunded) afterwards either
+    assert process(db, withdrawal_id, WithdrawalStatus.REJECTED)[1]["outcome"] == "skipped"
+
+    db.expire_all()
+    user = db.get(models.User, user_id)
+    assert (user.wallet_balance, user.total_withdrawn) == (0.0, 5.0)
+
+
+def test_unknown_request_is_not_found(db):
+    withdrawal, outcome = process(db, 999, WithdrawalStatus.APPROVED)
+    assert withdrawal is None
+    assert outcome["outcome"] == "not_found"
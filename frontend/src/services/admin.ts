@@ -32,4 +32,19 @@ export const getIncomeReport = async (params?: {
 }): Promise<any> => {
   const response = await api.get('/admin/reports/income', { params })
   return response.data
-}
\ No newline at end of file
+}
+
+export const exportReport = async (
+  report: 'users' | 'income' | 'deposits' | 'withdrawals',
+  params?: {
+    format?: 'csv' | 'xlsx'
+    start_date?: string
+    end_date?: string
+  }
+): Promise<Blob> => {
+  const response = await api.get(`/admin/reports/${report}/export`, {
+    params,
+    responseType: 'blob',
+  })
+  return response.data
+}
@@ -1,4 +1,5 @@
 import api from './api'
+import { type DepositSummary } from '../types'
 
 export interface Deduction {
   id: number
@@ -15,6 +16,12 @@ export interface DeductionSummary {
   total_deducted: number
   deduction_count: number
   recent_deductions: Deduction[]
+  by_type: Record<string, { count: number; amount: number }>
+}
+
+export interface DepositOverview {
+  deposit_summary: DepositSummary
+  deduction_summary: DeductionSummary
 }
 
 export const depositService = {
@@ -26,6 +33,10 @@ export const depositService = {
   getDeductionSummary: () =>
     api.get<DeductionSummary>('/deposit/deductions/deduction-summary'),
 
+  // Get deposit and deduction summaries in one request
+  getMyOverview: () =>
+    api.get<DepositOverview>('/deposit/my-overview'),
+
   // Admin: Get user's deductions
   getUserDeductions: (userId: number) =>
     api.get<Deduction[]>(`/deposit/admin/deductions/${userId}`),